@@ -0,0 +1,161 @@
+"""Compare the cost of building a page of posts, per 1k rows, before and after
+the row-tuple serialization path.
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 1000] [--repeat 30]
+
+Every path reads the same page from a freshly seeded SQLite file using the
+production engine profile. It then renders the JSON body the API sends. The
+load and serialize steps are timed separately:
+
+- jsonable_encoder: ORM entities, validated through ``from_attributes`` and
+  walked by ``jsonable_encoder`` (a route without ``response_model``).
+- response_model: ORM entities, validated and dumped the way FastAPI handles
+  a ``response_model``.
+- row tuples: column tuples turned into dicts, validated and dumped by the
+  precompiled page adapter (``PydanticJSONResponse``).
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from src.database import Base, apply_engine_profile
+from src.models import Post, User
+from src.schemas import PostSchemas
+from src.services import PostServices
+from src.utils import logger
+from src.utils.responses import PydanticJSONResponse
+
+# What FastAPI builds per response_model, without its request plumbing.
+_response_model = TypeAdapter(PostSchemas.PostPage)
+
+
+def load_entities(db, limit):
+    posts = (
+        db.query(Post)
+        .options(joinedload(Post.author))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return {"items": posts, "next_cursor": None}
+
+
+def load_rows(db, limit):
+    posts, next_cursor = PostServices.get_all_posts(db, limit=limit)
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+def dump_jsonable(page):
+    items = [PostSchemas.PostOut.model_validate(p) for p in page["items"]]
+    content = jsonable_encoder({"items": items, "next_cursor": page["next_cursor"]})
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def dump_response_model(page):
+    value = _response_model.validate_python(page, from_attributes=True)
+    return _response_model.dump_json(value)
+
+
+def dump_adapter(page):
+    return PydanticJSONResponse(page, adapter=PostSchemas.POST_PAGE).body
+
+
+PATHS = [
+    ("before: ORM + jsonable_encoder", load_entities, dump_jsonable),
+    ("before: ORM + response_model", load_entities, dump_response_model),
+    ("after: row tuples + TypeAdapter", load_rows, dump_adapter),
+]
+
+
+def seed(session_factory, rows: int):
+    db = session_factory()
+    db.add_all(
+        User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            hashed_password="x",
+            first_name="Bench",
+            last_name=str(i),
+        )
+        for i in range(50)
+    )
+    db.flush()
+    db.add_all(
+        Post(
+            title=f"Post {i}",
+            content="Benchmark post body " * 10,
+            author_id=1 + i % 50,
+            upvote_count=i % 7,
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    db.close()
+
+
+def run(session_factory, load, dump, rows, repeat):
+    load_s, dump_s, size = [], [], 0
+    for _ in range(repeat + 1):
+        db = session_factory()
+        start = time.perf_counter()
+        page = load(db, rows)
+        loaded = time.perf_counter()
+        body = dump(page)
+        load_s.append(loaded - start)
+        dump_s.append(time.perf_counter() - loaded)
+        size = len(body)
+        db.close()
+    # The first round warms up caches and compiled statements.
+    per_1k = 1000 / rows * 1000
+    return {
+        "load_ms": statistics.median(load_s[1:]) * per_1k,
+        "dump_ms": statistics.median(dump_s[1:]) * per_1k,
+        "bytes": size,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = apply_engine_profile(
+            create_engine(
+                f"sqlite:///{Path(tmp) / 'bench.sqlite3'}",
+                connect_args={"check_same_thread": False},
+            )
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+        seed(session_factory, args.rows)
+
+        print(
+            f"one page of {args.rows} posts, median of {args.repeat} runs, per 1k rows"
+        )
+        for name, load, dump in PATHS:
+            r = run(session_factory, load, dump, args.rows, args.repeat)
+            print(
+                f"{name:<34} load {r['load_ms']:7.2f} ms  "
+                f"serialize {r['dump_ms']:7.2f} ms  "
+                f"total {r['load_ms'] + r['dump_ms']:7.2f} ms  {r['bytes']} bytes"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Measure cold start and fail when it exceeds the startup budget.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--max-import-ms 1500]
+        [--max-first-request-ms 3000]
+
+Every run starts from a fresh interpreter against a throwaway SQLite file:
+
+- import: wall time of ``import src.main``;
+- first request: from spawning uvicorn until ``GET /posts/`` is answered,
+  which includes the import, schema creation and the first query;
+- openapi: latency of the first ``GET /openapi.json``, served from the
+  document prebuilt with ``src.commands.build_openapi``.
+
+Medians are compared with the budget; exits with code 1 if one is over.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import src.main; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.split()[-1])
+
+
+def measure_first_request(env: Dict[str, str], timeout: float = 30) -> Dict[str, float]:
+    port = free_port()
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "src.main:app",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            deadline = time.monotonic() + timeout
+            while True:
+                if server.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not answer in time")
+                try:
+                    response = client.get("/posts/", params={"limit": 1})
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            first_request = time.perf_counter() - started
+            response.raise_for_status()
+
+            openapi_started = time.perf_counter()
+            client.get("/openapi.json").raise_for_status()
+            openapi = time.perf_counter() - openapi_started
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"first_request": first_request, "openapi": openapi}
+
+
+def check_budget(results: Dict[str, float], limits: Dict[str, float]) -> List[str]:
+    """One line per measurement over its limit, in milliseconds."""
+    return [
+        f"{name}: {results[name]:.0f} ms > {limit:.0f} ms"
+        for name, limit in limits.items()
+        if results[name] > limit
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=1500)
+    parser.add_argument("--max-first-request-ms", type=float, default=3000)
+    args = parser.parse_args(argv)
+
+    samples = {"import": [], "first_request": [], "openapi": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            LOG_LEVEL="WARNING",
+            LOG_DIR=str(Path(tmp) / "logs"),
+            HOT_REDECAY_INTERVAL_S="0",
+            OPENAPI_SCHEMA_PATH=str(Path(tmp) / "openapi.json"),
+        )
+        subprocess.run(
+            [sys.executable, "-m", "src.commands.build_openapi"],
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+        for run in range(args.runs):
+            env["DATABASE_URL"] = f"sqlite:///{Path(tmp) / f'{run}.sqlite3'}"
+            samples["import"].append(measure_import(env))
+            for name, value in measure_first_request(env).items():
+                samples[name].append(value)
+
+    results = {name: statistics.median(v) * 1000 for name, v in samples.items()}
+    print(f"cold start, median of {args.runs} runs")
+    for name, value in results.items():
+        print(f"{name:<14} {value:8.1f} ms")
+
+    over = check_budget(
+        results,
+        {"import": args.max_import_ms, "first_request": args.max_first_request_ms},
+    )
+    for line in over:
+        print(f"over budget: {line}")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Compare the per-vote cost of the original vote path and the upsert path.
+
+Usage:
+    python -m benchmarks.bench_vote_path [--votes 2000] [--users 200] [--posts 50]
+
+Both paths run against identical, freshly seeded SQLite files using the
+production engine profile, and replay the same random sequence of votes
+(new votes, repeats and flips). Reports SQL statements per vote and latency.
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src import config
+from src.database import Base, apply_engine_profile
+from src.models import Post, User, Vote
+from src.schemas import PostSchemas, VoteSchemas
+from src.services import PostServices
+from src.utils import logger
+
+
+def legacy_vote(post_id, vote, current_user, db):
+    """The vote path as it was before the upsert rewrite, kept for comparison."""
+    post = db.query(Post).filter(Post.id == post_id).first()
+    db.query(Post).filter(Post.id == post_id).first()
+    existing_vote = (
+        db.query(Vote)
+        .filter(Vote.post_id == post_id, Vote.user_id == current_user.id)
+        .first()
+    )
+    if existing_vote:
+        if existing_vote.vote_type != vote:
+            existing_vote.vote_type = vote
+            db.commit()
+    else:
+        db.add(Vote(post_id=post_id, user_id=current_user.id, vote_type=vote))
+        db.commit()
+
+    upvotes = (
+        db.query(Vote)
+        .filter(
+            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.upvote
+        )
+        .count()
+    )
+    downvotes = (
+        db.query(Vote)
+        .filter(
+            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.downvote
+        )
+        .count()
+    )
+    return PostSchemas.PostOut(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        author=post.author,
+        upvotes=upvotes,
+        downvotes=downvotes,
+        created_at=post.created_at,
+    )
+
+
+def seed(session_factory, users: int, posts: int):
+    db = session_factory()
+    db.add_all(
+        User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            hashed_password="x",
+            first_name="Bench",
+            last_name=str(i),
+        )
+        for i in range(users)
+    )
+    db.flush()
+    db.add_all(
+        Post(title=f"Post {i}", content="Benchmark post", author_id=1 + i % users)
+        for i in range(posts)
+    )
+    db.commit()
+    user_rows = db.query(User).all()
+    db.expunge_all()
+    db.close()
+    return user_rows
+
+
+def run(path_name, vote_fn, workload, db_file, users, posts):
+    engine = apply_engine_profile(
+        create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    user_rows = seed(session_factory, users, posts)
+
+    statements = 0
+
+    def count_statement(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    latencies = []
+    for user_index, post_id, vote in workload:
+        db = session_factory()
+        start = time.perf_counter()
+        vote_fn(post_id, vote, user_rows[user_index], db)
+        latencies.append(time.perf_counter() - start)
+        db.close()
+    event.remove(engine, "before_cursor_execute", count_statement)
+    engine.dispose()
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "path": path_name,
+        "statements_per_vote": statements / len(workload),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[len(ms) // 2],
+        "p95_ms": ms[int(len(ms) * 0.95) - 1],
+        "votes_per_s": len(workload) / sum(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    logger.setLevel(logging.WARNING)
+    config.VOTE_INGEST_MODE = "direct"
+
+    rng = random.Random(args.seed)
+    choices = list(VoteSchemas.VoteTypeEnum)
+    workload = [
+        (rng.randrange(args.users), rng.randint(1, args.posts), rng.choice(choices))
+        for _ in range(args.votes)
+    ]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in [
+            ("before (select + insert/update + 2x COUNT)", legacy_vote),
+            ("after (upsert + one joined select)", PostServices.vote_on_post_service),
+        ]:
+            db_file = Path(tmp) / f"{len(results)}.sqlite3"
+            results.append(run(name, fn, workload, db_file, args.users, args.posts))
+
+    print(f"{args.votes} votes, {args.users} users, {args.posts} posts")
+    for r in results:
+        print(
+            f"{r['path']:<45} {r['statements_per_vote']:5.2f} stmt/vote  "
+            f"mean {r['mean_ms']:6.3f} ms  p50 {r['p50_ms']:6.3f} ms  "
+            f"p95 {r['p95_ms']:6.3f} ms  {r['votes_per_s']:8.0f} votes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
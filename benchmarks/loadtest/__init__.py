@@ -0,0 +1,12 @@
+"""End-to-end load test of the API.
+
+Seeds a SQLite file with users, posts and votes, replays a weighted mix of
+feed reads, post reads, votes, searches and logins against the real app and
+reports latency percentiles and throughput per endpoint:
+
+    python -m benchmarks.loadtest --requests 5000 --concurrency 16 \\
+        --out results.json [--baseline baseline.json]
+
+See ``python -m benchmarks.loadtest --help`` for the dataset, mix and target
+(in-process ASGI or a local uvicorn) options.
+"""
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from . import __doc__ as package_doc
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest", description=package_doc.splitlines()[0]
+    )
+    data = parser.add_argument_group("dataset")
+    data.add_argument("--users", type=int, default=500)
+    data.add_argument("--posts", type=int, default=5000)
+    data.add_argument("--votes", type=int, default=50000)
+    data.add_argument(
+        "--db",
+        type=Path,
+        help="SQLite file to seed and serve (default: a temporary file)",
+    )
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--requests", type=int, default=5000)
+    load.add_argument("--warmup", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument(
+        "--mix",
+        default=None,
+        help="operation weights, default feed=35,post=35,vote=15,search=13,login=2",
+    )
+    load.add_argument("--seed", type=int, default=42)
+
+    target = parser.add_argument_group("target")
+    target.add_argument(
+        "--target", choices=["inprocess", "uvicorn"], default="inprocess"
+    )
+    target.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    target.add_argument("--port", type=int, default=8765)
+    target.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    target.add_argument(
+        "--db-profile",
+        action="store_true",
+        help="serve with the per-request query profiler on (DB_PROFILE=1)",
+    )
+
+    output = parser.add_argument_group("output")
+    output.add_argument("--out", type=Path, help="write the results as JSON")
+    output.add_argument("--baseline", type=Path, help="JSON results to compare with")
+    output.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative change that counts as a regression (default 0.15)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = args.db or Path(tmp) / "loadtest.sqlite3"
+        if db_file.exists():
+            print(f"{db_file} already exists; pass a new path", file=sys.stderr)
+            return 2
+
+        # The app binds its engines at import time, so configure it first.
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+        os.environ["DB_MODE"] = args.db_mode
+        os.environ["DB_PROFILE"] = "1" if args.db_profile else "0"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+        from .report import compare, format_table, summarize
+        from .runner import run_in_process, run_over_uvicorn
+        from .seed import seed_database
+        from .workload import DEFAULT_MIX, build_operations, parse_mix
+
+        mix = parse_mix(args.mix or DEFAULT_MIX)
+        started = time.perf_counter()
+        data = seed_database(
+            os.environ["DATABASE_URL"], args.users, args.posts, args.votes, args.seed
+        )
+        print(
+            f"Seeded {data.users} users, {data.posts} posts, {data.votes} votes "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+        warmup = build_operations(args.warmup, mix, data, args.seed + 1)
+        operations = build_operations(args.requests, mix, data, args.seed)
+        if args.target == "uvicorn":
+            samples, wall_s = run_over_uvicorn(
+                operations, warmup, args.concurrency, args.port, args.workers
+            )
+        else:
+            samples, wall_s = run_in_process(operations, warmup, args.concurrency)
+
+    result = {
+        "meta": {
+            "target": args.target,
+            "db_mode": args.db_mode,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "users": args.users,
+            "posts": args.posts,
+            "votes": data.votes,
+            "mix": mix,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "wall_s": wall_s,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        **summarize(samples, wall_s),
+    }
+    print(format_table(result))
+
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Results written to {args.out}")
+
+    if args.baseline:
+        regressions = compare(
+            result, json.loads(args.baseline.read_text()), args.threshold
+        )
+        if regressions:
+            print(f"Regressions against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Summaries of a load-test run and comparison against a saved baseline."""
+
+import statistics
+from collections import defaultdict
+from typing import Dict, List
+
+from .runner import Sample
+
+# Metrics compared against the baseline: (name, True if higher is worse)
+COMPARED = (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("rps", False))
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summarize(latencies: List[float], errors: int, wall_s: float) -> dict:
+    ms = sorted(value * 1000 for value in latencies)
+    return {
+        "count": len(ms),
+        "errors": errors,
+        "rps": len(ms) / wall_s if wall_s else 0.0,
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": ms[-1] if ms else 0.0,
+    }
+
+
+def summarize(samples: List[Sample], wall_s: float) -> dict:
+    """Per-endpoint and overall latency percentiles and throughput.
+
+    Responses with a 4xx/5xx status count as errors but still contribute
+    their latency.
+    """
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for endpoint, seconds, status in samples:
+        by_endpoint[endpoint].append(seconds)
+        errors[endpoint] += status >= 400
+
+    return {
+        "overall": _summarize(
+            [seconds for _, seconds, _ in samples], sum(errors.values()), wall_s
+        ),
+        "endpoints": {
+            endpoint: _summarize(latencies, errors[endpoint], wall_s)
+            for endpoint, latencies in sorted(by_endpoint.items())
+        },
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than
+    ``threshold`` (a fraction, 0.1 = 10%)."""
+    regressions = []
+    sections: Dict[str, dict] = {"overall": current["overall"], **current["endpoints"]}
+    base_sections = {"overall": baseline["overall"], **baseline["endpoints"]}
+    for name, stats in sections.items():
+        base = base_sections.get(name)
+        if base is None:
+            continue
+        for metric, higher_is_worse in COMPARED:
+            old, new = base[metric], stats[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append(
+                    f"{name} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def format_table(result: dict) -> str:
+    header = (
+        f"{'endpoint':<30} {'count':>7} {'err':>5} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    rows = [header, "-" * len(header)]
+    sections = {**result["endpoints"], "overall": result["overall"]}
+    for name, s in sections.items():
+        rows.append(
+            f"{name:<30} {s['count']:>7} {s['errors']:>5} {s['rps']:>8.1f} "
+            f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}"
+        )
+    return "\n".join(rows)
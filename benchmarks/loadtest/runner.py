@@ -0,0 +1,134 @@
+"""Drive the app with a list of operations and time every request."""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from .workload import Operation
+
+# (endpoint, seconds, status code)
+Sample = Tuple[str, float, int]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    operations: List[Operation],
+    concurrency: int,
+    tokens: Dict[int, str],
+) -> Tuple[List[Sample], float]:
+    """Replay ``operations`` with ``concurrency`` closed-loop clients.
+
+    Returns one sample per request and the wall time of the whole run.
+    """
+    samples: List[Sample] = []
+    pending = iter(operations)
+
+    async def client_loop():
+        for op in pending:
+            headers = {}
+            if op.user is not None:
+                headers["Authorization"] = f"Bearer {tokens[op.user]}"
+            started = time.perf_counter()
+            response = await client.request(
+                op.method, op.path, params=op.params, json=op.json, headers=headers
+            )
+            samples.append(
+                (op.endpoint, time.perf_counter() - started, response.status_code)
+            )
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def issue_tokens(operations: List[Operation]) -> Dict[int, str]:
+    """Access tokens for every user that votes, minted without logging in."""
+    from src.services import AuthServices
+
+    return {
+        op.user: AuthServices.create_access_token({"sub": str(op.user + 1)})
+        for op in operations
+        if op.user is not None
+    }
+
+
+def run_in_process(
+    operations: List[Operation], warmup: List[Operation], concurrency: int
+) -> Tuple[List[Sample], float]:
+    """Call the ASGI app directly: no sockets, no HTTP parsing."""
+    from src.main import app
+    from src.services.password_hasher import password_hasher
+    from src.services.vote_buffer import vote_buffer
+
+    tokens = issue_tokens(warmup + operations)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+            await drive(c, warmup, concurrency, tokens)
+            return await drive(c, operations, concurrency, tokens)
+
+    try:
+        return asyncio.run(main())
+    finally:
+        vote_buffer.close()
+        password_hasher.close()
+
+
+def run_over_uvicorn(
+    operations: List[Operation],
+    warmup: List[Operation],
+    concurrency: int,
+    port: int,
+    workers: int,
+) -> Tuple[List[Sample], float]:
+    """Start uvicorn on ``port`` with the current environment and drive it."""
+    tokens = issue_tokens(warmup + operations)
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "src.main:app",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+    server = subprocess.Popen(command, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{port}"
+
+    async def main():
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits) as c:
+            await wait_until_ready(c, server)
+            await drive(c, warmup, concurrency, tokens)
+            return await drive(c, operations, concurrency, tokens)
+
+    try:
+        return asyncio.run(main())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def wait_until_ready(
+    client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 30
+):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not start in time")
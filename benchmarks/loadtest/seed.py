@@ -0,0 +1,100 @@
+"""Deterministic dataset for the load test."""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from passlib.hash import bcrypt
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from src import config
+from src.database import Base, apply_engine_profile
+from src.models import Post, User, Vote
+from src.models.votes import VoteType
+
+PASSWORD = "benchmark-password"
+WORDS = (
+    "python sqlite async cache index query latency vote feed search token "
+    "worker thread pool batch commit cursor page trigger schema profile "
+    "metric request response stream bytes json router endpoint"
+).split()
+CHUNK = 5000
+
+
+@dataclass
+class Dataset:
+    users: int
+    posts: int
+    votes: int
+
+    def username(self, index: int) -> str:
+        return f"bench{index}"
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_database(url: str, users: int, posts: int, votes: int, seed: int) -> Dataset:
+    """Create the schema at ``url`` and fill it; ``url`` must be empty.
+
+    Every user shares one bcrypt hash of ``PASSWORD`` at the configured cost,
+    so seeding stays fast while logins pay the real verification price.
+    Votes are bulk inserted, the counter and search triggers do the rest.
+    """
+    rng = random.Random(seed)
+    engine = apply_engine_profile(create_engine(url))
+    Base.metadata.create_all(bind=engine)
+    hashed = bcrypt.using(rounds=config.BCRYPT_ROUNDS).hash(PASSWORD)
+    start = datetime.now(timezone.utc) - timedelta(seconds=posts)
+
+    with Session(engine) as db:
+        for offset in range(0, users, CHUNK):
+            db.execute(
+                insert(User),
+                [
+                    {
+                        "username": f"bench{i}",
+                        "email": f"bench{i}@example.com",
+                        "hashed_password": hashed,
+                        "first_name": rng.choice(WORDS).title(),
+                        "last_name": f"User{i}",
+                    }
+                    for i in range(offset, min(offset + CHUNK, users))
+                ],
+            )
+        for offset in range(0, posts, CHUNK):
+            db.execute(
+                insert(Post),
+                [
+                    {
+                        "title": _text(rng, 5),
+                        "content": _text(rng, 40),
+                        "author_id": rng.randint(1, users),
+                        "created_at": start + timedelta(seconds=i),
+                    }
+                    for i in range(offset, min(offset + CHUNK, posts))
+                ],
+            )
+
+        votes = min(votes, users * posts)
+        pairs = set()
+        while len(pairs) < votes:
+            pairs.add((rng.randint(1, users), rng.randint(1, posts)))
+        pairs = sorted(pairs)
+        for offset in range(0, len(pairs), CHUNK):
+            db.execute(
+                insert(Vote),
+                [
+                    {
+                        "user_id": user_id,
+                        "post_id": post_id,
+                        "vote_type": rng.choice(list(VoteType)),
+                    }
+                    for user_id, post_id in pairs[offset : offset + CHUNK]
+                ],
+            )
+        db.commit()
+    engine.dispose()
+    return Dataset(users=users, posts=posts, votes=votes)
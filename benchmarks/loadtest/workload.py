@@ -0,0 +1,90 @@
+"""The request mix replayed by the load test."""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .seed import PASSWORD, WORDS, Dataset
+
+DEFAULT_MIX = "feed=35,post=35,vote=15,search=13,login=2"
+
+
+@dataclass
+class Operation:
+    endpoint: str  # route template, used to group results
+    method: str
+    path: str
+    params: Dict = field(default_factory=dict)
+    json: Optional[Dict] = None
+    user: Optional[int] = None  # index of the user whose token to send
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in BUILDERS:
+            raise ValueError(
+                f"Unknown operation {name!r}; choose from {sorted(BUILDERS)}"
+            )
+        mix[name] = float(weight)
+    return mix
+
+
+def _feed(rng: random.Random, data: Dataset) -> Operation:
+    return Operation("GET /posts/", "GET", "/posts/", params={"limit": 20})
+
+
+def _post(rng: random.Random, data: Dataset) -> Operation:
+    # Reads concentrate on recent posts, like a real front page.
+    post_id = max(1, data.posts - int(rng.expovariate(1 / 50)))
+    if rng.random() < 0.5:
+        return Operation("GET /posts/{post_id}", "GET", f"/posts/{post_id}")
+    return Operation("GET /posts/{post_id}/votes", "GET", f"/posts/{post_id}/votes")
+
+
+def _vote(rng: random.Random, data: Dataset) -> Operation:
+    return Operation(
+        "POST /posts/{post_id}/vote",
+        "POST",
+        f"/posts/{rng.randint(1, data.posts)}/vote",
+        json={"vote": rng.choice(["upvote", "downvote"])},
+        user=rng.randrange(data.users),
+    )
+
+
+def _search(rng: random.Random, data: Dataset) -> Operation:
+    q = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+    return Operation("GET /posts/search", "GET", "/posts/search", params={"q": q})
+
+
+def _login(rng: random.Random, data: Dataset) -> Operation:
+    username = data.username(rng.randrange(data.users))
+    return Operation(
+        "POST /users/login",
+        "POST",
+        "/users/login",
+        json={"username": username, "password": PASSWORD},
+    )
+
+
+BUILDERS = {
+    "feed": _feed,
+    "post": _post,
+    "vote": _vote,
+    "search": _search,
+    "login": _login,
+}
+
+
+def build_operations(
+    count: int, mix: Dict[str, float], data: Dataset, seed: int
+) -> List[Operation]:
+    """``count`` operations drawn from ``mix``; the same seed gives the same list."""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    return [
+        BUILDERS[name](rng, data)
+        for name in rng.choices(names, weights=weights, k=count)
+    ]
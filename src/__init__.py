@@ -1,2 +1,16 @@
-from .database import DATABASE_URL, engine, SessionLocal, Base, get_db
+from .database import (
+    DATABASE_URL,
+    engine,
+    SessionLocal,
+    Base,
+    get_db,
+    get_async_db,
+)
 from .utils import logger
+
+
+def __getattr__(name):
+    # The async engine is only created when something asks for it.
+    if name in ("async_engine", "AsyncSessionLocal"):
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,36 @@
+"""Write the OpenAPI document to OPENAPI_SCHEMA_PATH for the API to serve.
+
+Run at image build time so workers load the document from disk instead of
+generating it on the first /docs hit.
+
+Usage:
+    python -m src.commands.build_openapi [--output openapi.json]
+"""
+
+import argparse
+import json
+import sys
+
+from src import config
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--output",
+        default=config.OPENAPI_SCHEMA_PATH,
+        help="where to write the document (default: OPENAPI_SCHEMA_PATH)",
+    )
+    args = parser.parse_args(argv)
+
+    from src.main import build_openapi_schema
+
+    schema = build_openapi_schema()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(schema, f, separators=(",", ":"))
+    print(f"wrote the OpenAPI document ({len(schema['paths'])} paths) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Delete the votes, posts and rows of deleted user accounts.
+
+Deleting an account queues a job that purges it; this purges every deleted
+account at once, e.g. to catch up after the job runner was down.
+
+Usage:
+    python -m src.commands.purge_deleted_users
+"""
+
+import argparse
+import sys
+
+from src.database import SessionLocal
+from src.services import PurgeServices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        purged = PurgeServices.purge_deleted_users(db)
+    finally:
+        db.close()
+
+    print(f"purged {purged} deleted user(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
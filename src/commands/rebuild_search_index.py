@@ -0,0 +1,47 @@
+"""Rebuild the full-text search index from the source tables.
+
+Usage:
+    python -m src.commands.rebuild_search_index [--enqueue]
+"""
+
+import argparse
+import sys
+
+from src.database import SessionLocal
+from src.services import JobServices, SearchServices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="queue the rebuild for the job runner instead",
+    )
+    args = parser.parse_args(argv)
+
+    if args.enqueue:
+        db = SessionLocal()
+        try:
+            job_id = JobServices.enqueue(
+                "rebuild_search_index", db, idempotency_key="rebuild_search_index"
+            )
+            db.commit()
+        finally:
+            db.close()
+        print(f"queued job {job_id}")
+        return 0
+
+    db = SessionLocal()
+    try:
+        posts = SearchServices.rebuild_post_index(db)
+        users = SearchServices.rebuild_user_index(db)
+    finally:
+        db.close()
+
+    print(f"indexed {posts} post(s) and {users} user(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
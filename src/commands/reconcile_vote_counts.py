@@ -0,0 +1,61 @@
+"""Recompute the denormalized post vote counters from the votes table.
+
+Usage:
+    python -m src.commands.reconcile_vote_counts [--dry-run] [--enqueue]
+"""
+
+import argparse
+import sys
+
+from src.database import SessionLocal
+from src.services import JobServices, PostServices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="report drift without rewriting the stored counters",
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="queue the reconciliation for the job runner instead",
+    )
+    args = parser.parse_args(argv)
+
+    if args.enqueue:
+        db = SessionLocal()
+        try:
+            job_id = JobServices.enqueue(
+                "reconcile_vote_counts",
+                db,
+                payload={"fix": not args.dry_run},
+                idempotency_key="reconcile_vote_counts",
+            )
+            db.commit()
+        finally:
+            db.close()
+        print(f"queued job {job_id}")
+        return 0
+
+    db = SessionLocal()
+    try:
+        drift = PostServices.reconcile_vote_counts(db, fix=not args.dry_run)
+    finally:
+        db.close()
+
+    for item in drift:
+        print(
+            f"post {item.post_id}: "
+            f"upvotes {item.stored_upvotes} -> {item.actual_upvotes}, "
+            f"downvotes {item.stored_downvotes} -> {item.actual_downvotes}"
+        )
+    action = "found" if args.dry_run else "fixed"
+    print(f"{action} drift on {len(drift)} post(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
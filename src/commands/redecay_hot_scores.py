@@ -0,0 +1,32 @@
+"""Recompute the hot feed scores of all posts for their current age.
+
+The API does this every HOT_REDECAY_INTERVAL_S; run this from cron instead
+when that is set to 0.
+
+Usage:
+    python -m src.commands.redecay_hot_scores
+"""
+
+import argparse
+import sys
+
+from src.database import SessionLocal
+from src.services import RankingServices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        rewritten = RankingServices.redecay_hot_scores(db)
+    finally:
+        db.close()
+
+    print(f"recomputed the hot score of {rewritten} post(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""Run background jobs from the jobs table until interrupted.
+
+A sidecar for deployments that set JOB_WORKERS=0 on the API processes.
+
+Usage:
+    python -m src.commands.run_jobs [--workers N]
+"""
+
+import argparse
+import signal
+import sys
+import threading
+
+from src import config
+from src.services.jobs import JobRunner
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(config.JOB_WORKERS, 1),
+        help="worker threads (default: JOB_WORKERS, at least 1)",
+    )
+    args = parser.parse_args(argv)
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    runner = JobRunner(workers=args.workers)
+    runner.start()
+    print(f"running jobs on {args.workers} worker(s)")
+    stopped.wait()
+    # Running jobs finish, or stop at their next safe point.
+    runner.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
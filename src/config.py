@@ -0,0 +1,197 @@
+import os
+
+# Database file will be created in the current directory by default
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./db.sqlite3")
+
+# "sync" serves every route from FastAPI's threadpool with a blocking Session;
+# "async" serves them on the event loop with an aiosqlite-backed AsyncSession.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# --- SQLite engine profile, applied to every new connection ---
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, positive values are pages (SQLite convention)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+
+# --- Connection pools ---
+# GET routes read through their own pool of query-only connections; all
+# mutations share a single writer connection so they queue in-process instead
+# of fighting over SQLite's write lock.
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+DB_READ_POOL_OVERFLOW = int(os.getenv("DB_READ_POOL_OVERFLOW", "8"))
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+
+# --- Vote ingestion ---
+# "direct" commits every vote in its own transaction. "ack" and "optimistic"
+# queue votes and group-commit them in batches; "ack" answers once the batch
+# holding the vote is committed, "optimistic" answers immediately with the
+# projected totals.
+VOTE_INGEST_MODE = os.getenv("VOTE_INGEST_MODE", "direct").lower()
+VOTE_BATCH_MAX_SIZE = int(os.getenv("VOTE_BATCH_MAX_SIZE", "256"))
+VOTE_FLUSH_INTERVAL_MS = float(os.getenv("VOTE_FLUSH_INTERVAL_MS", "5"))
+VOTE_ACK_TIMEOUT_S = float(os.getenv("VOTE_ACK_TIMEOUT_S", "5"))
+
+# --- Password hashing ---
+# bcrypt runs in a dedicated process pool so logins neither hold the GIL nor
+# occupy the request threadpool. Requests beyond HASH_POOL_MAX_PENDING queued
+# or running hashes are turned away with a 503. Changing BCRYPT_ROUNDS
+# rehashes each user's password the next time they log in.
+# In sync mode every pending hash also blocks one of the REQUEST_THREADS
+# threads AnyIO runs sync endpoints on (its default of 40), so the cap is
+# derived from, and kept well below, that: past it logins get a 503 while the
+# other routes still find a free thread.
+REQUEST_THREADS = 40
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+HASH_POOL_MAX_PENDING = int(
+    os.getenv("HASH_POOL_MAX_PENDING", str(REQUEST_THREADS // 2))
+)
+HASH_POOL_RETRY_AFTER_S = int(os.getenv("HASH_POOL_RETRY_AFTER_S", "1"))
+
+# --- Load shedding ---
+# Requests are admitted per route class: "auth" (login and registration, which
+# wait on bcrypt), "write" (every other mutation, which queue on the SQLite
+# writer) and "read". Each class starts at its CONCURRENCY_*_LIMIT concurrent
+# requests and adapts between CONCURRENCY_MIN_LIMIT and CONCURRENCY_MAX_LIMIT:
+# one more slot while requests answer within CONCURRENCY_*_TARGET_MS, 10% fewer
+# when they do not. Requests over the limit wait in a queue of at most
+# CONCURRENCY_QUEUE_SIZE for up to CONCURRENCY_QUEUE_TIMEOUT_MS, then get a 503
+# with Retry-After: LOAD_SHED_RETRY_AFTER_S.
+LOAD_SHEDDING = os.getenv("LOAD_SHEDDING", "1").lower() in ("1", "true", "yes")
+CONCURRENCY_AUTH_LIMIT = int(os.getenv("CONCURRENCY_AUTH_LIMIT", "4"))
+CONCURRENCY_WRITE_LIMIT = int(os.getenv("CONCURRENCY_WRITE_LIMIT", "4"))
+CONCURRENCY_READ_LIMIT = int(os.getenv("CONCURRENCY_READ_LIMIT", "32"))
+CONCURRENCY_AUTH_TARGET_MS = float(os.getenv("CONCURRENCY_AUTH_TARGET_MS", "1000"))
+CONCURRENCY_WRITE_TARGET_MS = float(os.getenv("CONCURRENCY_WRITE_TARGET_MS", "100"))
+CONCURRENCY_READ_TARGET_MS = float(os.getenv("CONCURRENCY_READ_TARGET_MS", "50"))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "1"))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "64"))
+CONCURRENCY_QUEUE_SIZE = int(os.getenv("CONCURRENCY_QUEUE_SIZE", "64"))
+CONCURRENCY_QUEUE_TIMEOUT_MS = float(os.getenv("CONCURRENCY_QUEUE_TIMEOUT_MS", "500"))
+LOAD_SHED_RETRY_AFTER_S = int(os.getenv("LOAD_SHED_RETRY_AFTER_S", "1"))
+# Token bucket per client IP on POST /users/login: LOGIN_RATE_LIMIT_BURST
+# attempts at once, refilled at LOGIN_RATE_LIMIT_PER_MINUTE (0 disables it).
+# Clients past it get a 429. Buckets of the least recently seen of more than
+# LOGIN_RATE_LIMIT_MAX_CLIENTS addresses are forgotten.
+LOGIN_RATE_LIMIT_PER_MINUTE = float(os.getenv("LOGIN_RATE_LIMIT_PER_MINUTE", "10"))
+LOGIN_RATE_LIMIT_BURST = int(os.getenv("LOGIN_RATE_LIMIT_BURST", "5"))
+LOGIN_RATE_LIMIT_MAX_CLIENTS = int(os.getenv("LOGIN_RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+# --- Authentication ---
+# Verified tokens and their user are cached per process for up to
+# AUTH_CACHE_TTL_S (never past the token's own expiry). Profile changes and
+# deletions evict the user's entries in the process that made them; other
+# worker processes catch up within the TTL. AUTH_CACHE_MAX_ENTRIES=0 disables
+# the cache.
+AUTH_CACHE_TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# --- Response cache ---
+# Serialized GET /posts/{id} and /posts/{id}/votes responses, bounded by the
+# total size of the cached bodies. Writes in this process invalidate them
+# right away; RESPONSE_CACHE_TTL_S bounds staleness across worker processes.
+# RESPONSE_CACHE_MAX_BYTES=0 disables the cache.
+RESPONSE_CACHE_MAX_BYTES = int(
+    os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "30"))
+
+# --- Ranked feeds ---
+# hot = score / (age_hours + 2) ** HOT_GRAVITY, and 0 once a post is older
+# than HOT_HORIZON_HOURS. Votes update it right away; every
+# HOT_REDECAY_INTERVAL_S a background job recomputes it for the posts inside
+# the horizon as they age (0 disables the job, e.g. when it runs from cron
+# through src.commands.redecay_hot_scores instead).
+HOT_GRAVITY = float(os.getenv("HOT_GRAVITY", "1.8"))
+HOT_HORIZON_HOURS = float(os.getenv("HOT_HORIZON_HOURS", "48"))
+HOT_REDECAY_INTERVAL_S = float(os.getenv("HOT_REDECAY_INTERVAL_S", "60"))
+
+# --- Account deletion ---
+# Deleting a user only marks the account, which hides it at once, and queues a
+# job that deletes the user's votes, the votes on their posts, their posts and
+# the user row, in transactions of at most USER_PURGE_CHUNK_SIZE rows with a
+# USER_PURGE_PAUSE_MS pause in between, so request writers are never locked
+# out for the whole purge.
+USER_PURGE_CHUNK_SIZE = int(os.getenv("USER_PURGE_CHUNK_SIZE", "500"))
+USER_PURGE_PAUSE_MS = float(os.getenv("USER_PURGE_PAUSE_MS", "10"))
+
+# --- Background jobs ---
+# Maintenance work queued in the jobs table runs on JOB_WORKERS threads of
+# the API process (0 leaves it to a src.commands.run_jobs sidecar). Idle
+# workers look for due jobs with a read-only query after JOB_POLL_INTERVAL_S,
+# doubling the wait while they find none, up to JOB_POLL_MAX_INTERVAL_S; jobs
+# queued by this process wake them at once.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "1"))
+JOB_POLL_MAX_INTERVAL_S = float(os.getenv("JOB_POLL_MAX_INTERVAL_S", "10"))
+# A failed job is retried after JOB_RETRY_BACKOFF_S, doubling with every
+# attempt, until it has run JOB_MAX_ATTEMPTS times.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF_S = float(os.getenv("JOB_RETRY_BACKOFF_S", "5"))
+# A job still running after this long without renewing its lease is presumed
+# lost with its worker process and queued again. Long jobs renew it between
+# transactions, so this only has to outlast the longest single transaction.
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "600"))
+# Finished jobs stay readable through GET /jobs/{id} for this long.
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+
+# --- Exports ---
+# Rows fetched per round trip by the NDJSON exports; each batch is encoded and
+# sent as one chunk, so memory stays bounded by this regardless of table size.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Comma-separated usernames allowed to run the exports, which carry every
+# vote's user id. Empty means nobody.
+EXPORT_USERS = frozenset(
+    name.strip() for name in os.getenv("EXPORT_USERS", "").split(",") if name.strip()
+)
+
+# --- Query profiling ---
+# Count the statements, database time and rows of every request and report
+# them in a Server-Timing response header. Off by default: it adds work to
+# every statement of every request.
+DB_PROFILE = os.getenv("DB_PROFILE", "0").lower() in ("1", "true", "yes")
+# Log statements that take at least this long (0 = never)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))
+
+# --- Logging ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" for human-readable lines, "json" for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Share of INFO records kept per logger, e.g. "yaballe_app.reads=0.01" keeps
+# 1% of the per-request messages of the read endpoints.
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+# Created on the first log record written to it
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+# Also write LOG_DIR/app.log. src.server turns this off when it runs several
+# workers, which would each rotate the same file under the others.
+LOG_TO_FILE = os.getenv("LOG_TO_FILE", "1").lower() in ("1", "true", "yes")
+
+# --- Startup ---
+# Create missing tables when the app starts (create_all is a no-op on an
+# existing schema). Turn off where a deploy step owns the schema.
+DB_INIT_SCHEMA = os.getenv("DB_INIT_SCHEMA", "1").lower() in ("1", "true", "yes")
+# Run the hot score decay and the job runner in this process. src.server runs
+# them once, in its supervisor, and turns them off in the workers it starts.
+BACKGROUND_TASKS = os.getenv("BACKGROUND_TASKS", "1").lower() in ("1", "true", "yes")
+# OpenAPI document written at build time by src.commands.build_openapi and
+# served as is; generated on the first /docs hit when the file is missing.
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", "openapi.json")
+
+# --- Server ---
+# Used by the production launcher, src.server.
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+# A worker is replaced after serving this many requests (0 = never), plus a
+# random 0..SERVER_MAX_REQUESTS_JITTER so workers do not all restart at once.
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "10000"))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "1000"))
+# On SIGTERM, how long workers may keep finishing in-flight requests
+SERVER_GRACEFUL_TIMEOUT_S = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_S", "30"))
+SERVER_KEEPALIVE_S = int(os.getenv("SERVER_KEEPALIVE_S", "5"))
+# Proxies whose X-Forwarded-For / X-Forwarded-Proto headers are trusted
+SERVER_FORWARDED_ALLOW_IPS = os.getenv("SERVER_FORWARDED_ALLOW_IPS", "127.0.0.1")
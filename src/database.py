@@ -1,16 +1,160 @@
-from sqlalchemy import create_engine
+from functools import cache
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = (
-    "sqlite:///./db.sqlite3"  # Database file will be created in the current directory
+from src import config
+from src.config import DATABASE_URL
+from src.utils.query_profiler import instrument
+
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+def connection_pragmas(read_only: bool = False) -> list[str]:
+    """PRAGMAs that make up the engine profile for one connection."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size = {config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size = {config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store = {config.SQLITE_TEMP_STORE}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # The journal mode is persistent in the database file, so only the
+        # writer sets it.
+        pragmas.insert(0, f"PRAGMA journal_mode = {config.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def enforce_foreign_keys(engine):
+    """Turn on foreign key enforcement, and so ON DELETE CASCADE, per connection.
+
+    SQLite leaves it off unless every connection asks for it.
+    """
+
+    @event.listens_for(engine, "connect")
+    def set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+    return engine
+
+
+def apply_engine_profile(engine, read_only: bool = False):
+    """Run the profile PRAGMAs on every connection ``engine`` opens.
+
+    Also enforces foreign keys and times the engine's statements for the
+    query profiler.
+    """
+    pragmas = connection_pragmas(read_only)
+    enforce_foreign_keys(engine)
+    instrument(engine)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+engine = apply_engine_profile(
+    create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=config.DB_WRITE_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    )
 )
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+read_engine = apply_engine_profile(
+    create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=config.DB_READ_POOL_SIZE,
+        max_overflow=config.DB_READ_POOL_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    ),
+    read_only=True,
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+
+@cache
+def _async_database() -> dict:
+    """Create the async engines and session factories on first use.
+
+    DB_MODE=sync never touches them, so it never imports aiosqlite.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=config.DB_WRITE_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    )
+    apply_engine_profile(async_engine.sync_engine)
+
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_size=config.DB_READ_POOL_SIZE,
+        max_overflow=config.DB_READ_POOL_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_S,
+    )
+    apply_engine_profile(async_read_engine.sync_engine, read_only=True)
+
+    # Objects must stay readable after commit: an AsyncSession cannot
+    # lazy-load expired attributes once control is back on the event loop.
+    return {
+        "async_engine": async_engine,
+        "async_read_engine": async_read_engine,
+        "AsyncSessionLocal": async_sessionmaker(
+            bind=async_engine, autoflush=False, expire_on_commit=False
+        ),
+        "AsyncReadSessionLocal": async_sessionmaker(
+            bind=async_read_engine, autoflush=False, expire_on_commit=False
+        ),
+    }
+
+
+_ASYNC_NAMES = (
+    "async_engine",
+    "async_read_engine",
+    "AsyncSessionLocal",
+    "AsyncReadSessionLocal",
+)
+
+
+def __getattr__(name):
+    if name not in _ASYNC_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _async_database()[name]
+
+
 Base = declarative_base()
 
+# The current UTC time in the text format SQLAlchemy stores DateTime values in
+# on SQLite ("YYYY-MM-DD HH:MM:SS.ffffff"), for server defaults and triggers:
+# their values then sort, compare and parse like the ones the ORM writes.
+SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+
+
+def init_db(bind=None):
+    """Create whatever tables, indexes and triggers are missing."""
+    import src.models  # noqa: F401  registers the tables on Base
+
+    Base.metadata.create_all(bind=bind or engine)
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +162,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with _async_database()["AsyncSessionLocal"]() as db:
+        yield db
+
+
+async def get_async_read_db():
+    async with _async_database()["AsyncReadSessionLocal"]() as db:
+        yield db
@@ -1,23 +1,76 @@
-from fastapi import FastAPI
-from fastapi.openapi.utils import get_openapi
-from src.routes import UserRoutes, PostRoutes
-from src.database import engine, Base
-import uvicorn
+import json
+import threading
+from contextlib import asynccontextmanager
+from importlib import import_module
+from fastapi import FastAPI, Response
+from src import config, routes
+from src.config import DB_MODE
+from src.database import init_db
+from src.services.vote_buffer import vote_buffer
+from src.services.password_hasher import password_hasher
+from src.services.jobs import job_runner
+from src.services.ranking import hot_score_decay
+from src.utils import metrics
+from src.utils.load_shedding import LoadSheddingMiddleware
+from src.utils.query_profiler import QueryProfilerMiddleware
+from src.utils.request_metrics import MetricsMiddleware
+
+# Kept off the import path to start serving sooner, then loaded in the
+# background so the first request that needs them does not pay for it.
+DEFERRED_IMPORTS = ("jose.jwt",)
+
+
+def warm_up():
+    for module in DEFERRED_IMPORTS:
+        import_module(module)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.DB_INIT_SCHEMA:
+        init_db()
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    if config.BACKGROUND_TASKS:
+        hot_score_decay.start()
+        job_runner.start()
+    yield
+    job_runner.close()
+    hot_score_decay.close()
+    # Commit votes still waiting in the write-behind buffer before exiting.
+    vote_buffer.close()
+    password_hasher.close()
 
 
 app = FastAPI(
     title="Yaballe blogposts",
     description="This is the API for the blogposts of Yaballee",
     version="1.0.0",
+    lifespan=lifespan,
 )
+if config.LOAD_SHEDDING:
+    # Innermost, so the requests it turns away still show in the metrics.
+    app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(MetricsMiddleware)
+if config.DB_PROFILE:
+    app.add_middleware(QueryProfilerMiddleware)
 
-app.include_router(UserRoutes)
-app.include_router(PostRoutes)
+# DB_MODE picks which implementation serves the API; both expose the same
+# paths and schemas so they can be benchmarked side by side. Only the routers
+# of the selected mode are imported.
+if DB_MODE == "async":
+    app.include_router(routes.AsyncUserRoutes)
+    app.include_router(routes.AsyncPostRoutes)
+    app.include_router(routes.AsyncVoteRoutes)
+else:
+    app.include_router(routes.UserRoutes)
+    app.include_router(routes.PostRoutes)
+    app.include_router(routes.VoteRoutes)
+# Job status is a single primary-key read, served the same way in both modes.
+app.include_router(routes.JobRoutes)
 
 
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
+def build_openapi_schema() -> dict:
+    from fastapi.openapi.utils import get_openapi
 
     openapi_schema = get_openapi(
         title="My Blog API",
@@ -35,7 +88,20 @@ def custom_openapi():
         for operation in path.values():
             operation["security"] = [{"BearerAuth": []}]
 
-    app.openapi_schema = openapi_schema
+    return openapi_schema
+
+
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+
+    # Prebuilt by src.commands.build_openapi; generating it costs a noticeable
+    # pause on the first /docs hit of every new worker.
+    try:
+        with open(config.OPENAPI_SCHEMA_PATH, encoding="utf-8") as f:
+            app.openapi_schema = json.load(f)
+    except FileNotFoundError:
+        app.openapi_schema = build_openapi_schema()
     return app.openapi_schema
 
 
@@ -47,6 +113,14 @@ def root():
     return {"message": "Welcome to the Blog API!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # async: the threadpool gauges are read from the event loop.
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine)
+    import uvicorn
+
+    init_db()
     uvicorn.run("src.main:app", host="0.0.0.0", port=8080, reload=True)
@@ -1,3 +1,5 @@
 from .users import User
 from .posts import Post
 from .votes import Vote
+from .search import posts_fts, users_fts
+from .jobs import Job
@@ -0,0 +1,55 @@
+from sqlalchemy import JSON, Column, DateTime, Enum, Index, Integer, String, Text, text
+from src.database import SQLITE_NOW, Base
+import enum
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # The runner takes the queued job that has been ready the longest.
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        # An idempotency key names at most one unfinished job; once it has
+        # finished the same key can queue the work again.
+        Index(
+            "ux_jobs_idempotency_key_pending",
+            "idempotency_key",
+            unique=True,
+            sqlite_where=text("finished_at IS NULL"),
+        ),
+        # Finished jobs are pruned once they are older than the retention.
+        Index(
+            "ix_jobs_finished_at",
+            "finished_at",
+            sqlite_where=text("finished_at IS NOT NULL"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    idempotency_key = Column(String, nullable=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text(f"({SQLITE_NOW})"),
+    )
+    # Not run before this time: the enqueue time, or the next retry's.
+    run_after = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text(f"({SQLITE_NOW})"),
+    )
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
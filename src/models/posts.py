@@ -1,25 +1,65 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    text,
+)
 from sqlalchemy.orm import relationship
-from src.database import Base
-from datetime import datetime, timezone
+from src.database import SQLITE_NOW, Base
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Keyset pagination walks these in (created_at, id) order, globally and
+        # per author, so deep pages cost the same as the first one.
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+        # Incremental exports resume from the last (updated_at, id) they saw.
+        Index("ix_posts_updated_at_id", "updated_at", "id"),
+        # The ranked feeds read their top N straight off these.
+        Index("ix_posts_score_id", "score", "id"),
+        Index("ix_posts_hot_score_id", "hot_score", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     content = Column(Text)
-    author_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    author_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    # Set by SQLite, so every insert path (ORM, Core, triggers, imports) stamps
+    # posts the same way.
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text(f"({SQLITE_NOW})"),
+    )
+    # Bumped by every edit, and by the vote triggers whenever the counters move.
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text(f"({SQLITE_NOW})"),
+        onupdate=text(SQLITE_NOW),
+    )
 
-    author = relationship("User", back_populates="posts")
-    votes = relationship("Vote", back_populates="post", cascade="all, delete")
-
-    @property
-    def upvotes(self):
-        return len([v for v in self.votes if v.vote_type == "upvote"])
+    # Denormalized vote totals, maintained by the triggers on the votes table
+    # (see src/models/votes.py) in the same transaction as every vote change.
+    upvote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    downvote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Net votes, kept in step with the counters by SQLite itself.
+    score = Column(Integer, Computed("upvote_count - downvote_count", persisted=True))
+    # Time-decayed score of the "hot" feed (see src/services/ranking.py). Set
+    # on every vote and recomputed periodically as posts age.
+    hot_score = Column(Float, nullable=False, default=0.0, server_default="0")
 
-    @property
-    def downvotes(self):
-        return len([v for v in self.votes if v.vote_type == "downvote"])
+    author = relationship("User", back_populates="posts")
+    # SQLite deletes the votes of a deleted post (ON DELETE CASCADE on
+    # votes.post_id); the ORM does not load them to do it.
+    votes = relationship(
+        "Vote", back_populates="post", cascade="all, delete", passive_deletes=True
+    )
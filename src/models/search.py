@@ -0,0 +1,100 @@
+from sqlalchemy import DDL, event
+from sqlalchemy.sql import column, table
+
+from .posts import Post
+from .users import User
+
+# FTS5 index over posts.title / posts.content. It is an external-content table
+# (the text lives only in posts), so it is declared here as a lightweight
+# table construct rather than on Base.metadata and is created and dropped
+# alongside the posts table.
+posts_fts = table("posts_fts", column("rowid"), column("title"), column("content"))
+
+POSTS_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert
+    AFTER INSERT ON posts
+    BEGIN
+        INSERT INTO posts_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title, NEW.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete
+    AFTER DELETE ON posts
+    BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', OLD.id, OLD.title, OLD.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update
+    AFTER UPDATE OF title, content ON posts
+    BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', OLD.id, OLD.title, OLD.content);
+        INSERT INTO posts_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title, NEW.content);
+    END
+    """,
+)
+
+for statement in POSTS_FTS_DDL:
+    event.listen(Post.__table__, "after_create", DDL(statement))
+event.listen(Post.__table__, "before_drop", DDL("DROP TABLE IF EXISTS posts_fts"))
+
+# Trigram index over the searchable user fields. Every 3-character substring
+# is a token, so "%q%" style infix matches of three or more characters are
+# answered from the index instead of scanning users.
+users_fts = table(
+    "users_fts",
+    column("rowid"),
+    column("username"),
+    column("email"),
+    column("first_name"),
+    column("last_name"),
+)
+
+USERS_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        username, email, first_name, last_name,
+        content='users', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert
+    AFTER INSERT ON users
+    BEGIN
+        INSERT INTO users_fts(rowid, username, email, first_name, last_name)
+        VALUES (NEW.id, NEW.username, NEW.email, NEW.first_name, NEW.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete
+    AFTER DELETE ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email, first_name, last_name)
+        VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.first_name, OLD.last_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update
+    AFTER UPDATE OF username, email, first_name, last_name ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, username, email, first_name, last_name)
+        VALUES ('delete', OLD.id, OLD.username, OLD.email, OLD.first_name, OLD.last_name);
+        INSERT INTO users_fts(rowid, username, email, first_name, last_name)
+        VALUES (NEW.id, NEW.username, NEW.email, NEW.first_name, NEW.last_name);
+    END
+    """,
+)
+
+for statement in USERS_FTS_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement))
+event.listen(User.__table__, "before_drop", DDL("DROP TABLE IF EXISTS users_fts"))
@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 from src.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # The few users waiting to be purged, for the purge to find them.
+        Index(
+            "ix_users_deleted_at",
+            "deleted_at",
+            sqlite_where=text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -12,6 +20,15 @@ class User(Base):
     hashed_password = Column(String)
     first_name = Column(String)
     last_name = Column(String)
+    # Set when the account is deleted. The user disappears from the API right
+    # away; their votes, posts and row are purged in the background (see
+    # src/services/purge.py).
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    posts = relationship(
+        "Post", back_populates="author", cascade="all, delete", passive_deletes=True
+    )
+    votes = relationship(
+        "Vote", back_populates="user", cascade="all, delete", passive_deletes=True
+    )
 
-    posts = relationship("Post", back_populates="author", cascade="all, delete")
-    votes = relationship("Vote", back_populates="user", cascade="all, delete")
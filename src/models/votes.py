@@ -1,6 +1,17 @@
-from sqlalchemy import Column, Integer, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Integer,
+    ForeignKey,
+    Enum,
+    Index,
+    UniqueConstraint,
+    event,
+    text,
+)
 from sqlalchemy.orm import relationship
-from src.database import Base
+from src.database import SQLITE_NOW, Base
 import enum
 
 
@@ -11,12 +22,76 @@ class VoteType(str, enum.Enum):
 
 class Vote(Base):
     __tablename__ = "votes"
-    __table_args__ = (UniqueConstraint("user_id", "post_id", name="unique_vote"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="unique_vote"),
+        # Finds the votes of a post (cascading a post delete); reconciling
+        # the counters groups them by type straight off the index.
+        Index("ix_votes_post_id_vote_type", "post_id", "vote_type"),
+        # Incremental exports resume from the last (updated_at, id) they saw.
+        Index("ix_votes_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    post_id = Column(Integer, ForeignKey("posts.id"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"))
     vote_type = Column(Enum(VoteType), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=text(f"({SQLITE_NOW})"),
+        onupdate=text(SQLITE_NOW),
+    )
 
     user = relationship("User", back_populates="votes")
     post = relationship("Post", back_populates="votes")
+
+
+# Keep posts.upvote_count / posts.downvote_count in step with the votes table.
+# Triggers run inside the statement that touches the vote, so the counters are
+# committed (or rolled back) atomically with every insert, flip and delete,
+# including the ones issued by cascading deletes. They also bump the post's
+# updated_at so incremental exports pick up the new totals.
+VOTE_COUNTER_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS votes_counters_insert
+    AFTER INSERT ON votes
+    BEGIN
+        UPDATE posts
+        SET upvote_count = upvote_count + (NEW.vote_type = 'upvote'),
+            downvote_count = downvote_count + (NEW.vote_type = 'downvote'),
+            updated_at = {SQLITE_NOW}
+        WHERE id = NEW.post_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS votes_counters_update
+    AFTER UPDATE OF vote_type, post_id ON votes
+    BEGIN
+        UPDATE posts
+        SET upvote_count = upvote_count - (OLD.vote_type = 'upvote'),
+            downvote_count = downvote_count - (OLD.vote_type = 'downvote'),
+            updated_at = {SQLITE_NOW}
+        WHERE id = OLD.post_id;
+        UPDATE posts
+        SET upvote_count = upvote_count + (NEW.vote_type = 'upvote'),
+            downvote_count = downvote_count + (NEW.vote_type = 'downvote'),
+            updated_at = {SQLITE_NOW}
+        WHERE id = NEW.post_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS votes_counters_delete
+    AFTER DELETE ON votes
+    BEGIN
+        UPDATE posts
+        SET upvote_count = upvote_count - (OLD.vote_type = 'upvote'),
+            downvote_count = downvote_count - (OLD.vote_type = 'downvote'),
+            updated_at = {SQLITE_NOW}
+        WHERE id = OLD.post_id;
+    END
+    """,
+)
+
+for trigger in VOTE_COUNTER_TRIGGERS:
+    # DDL statements are %-formatted; keep strftime's directives intact.
+    event.listen(Vote.__table__, "after_create", DDL(trigger.replace("%", "%%")))
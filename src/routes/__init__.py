@@ -1,2 +1,19 @@
-from .posts import router as PostRoutes
-from .users import router as UserRoutes
+# Routers are imported on first access so an app serving one DB_MODE does not
+# pay for building the other mode's routes.
+from importlib import import_module
+
+_ROUTERS = {
+    "PostRoutes": ".posts",
+    "UserRoutes": ".users",
+    "VoteRoutes": ".votes",
+    "JobRoutes": ".jobs",
+    "AsyncPostRoutes": ".async_posts",
+    "AsyncUserRoutes": ".async_users",
+    "AsyncVoteRoutes": ".async_votes",
+}
+
+
+def __getattr__(name):
+    if name not in _ROUTERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return import_module(_ROUTERS[name], __name__).router
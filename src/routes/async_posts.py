@@ -0,0 +1,141 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import get_async_db, get_async_read_db
+
+from src.services import AsyncAuthServices, AsyncPostServices, ExportServices
+from src.schemas import PostSchemas, SearchSchemas, UserSchemas, VoteSchemas
+from src.utils.logger import logger, read_logger
+from src.utils.responses import PydanticJSONResponse
+from src.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/posts", tags=["Posts"])
+
+
+@router.post("/", response_model=PostSchemas.PostOut)
+async def create_post(
+    post_data: PostSchemas.PostCreate,
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    logger.info(
+        "User %s creating a new post titled '%s'", current_user.id, post_data.title
+    )
+    new_post = await AsyncPostServices.create_post(post_data, current_user, db)
+    logger.info("Post created with ID %s by user %s", new_post.id, current_user.id)
+    return new_post
+
+
+@router.get("/", response_model=PostSchemas.PostPage)
+async def get_all_posts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    sort: PostSchemas.PostSort = Query(PostSchemas.PostSort.new),
+    period: PostSchemas.TopPeriod = Query(PostSchemas.TopPeriod.all),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    read_logger.info("Fetching all posts sorted by %s", sort.value)
+    page = await AsyncPostServices.get_all_posts(
+        db, limit=limit, cursor=cursor, sort=sort, period=period
+    )
+    read_logger.info("Fetched %s posts", len(page.items))
+    return PydanticJSONResponse(page, adapter=PostSchemas.POST_PAGE)
+
+
+@router.get("/search", response_model=PostSchemas.PostSearchPage)
+async def search_posts(
+    q: str = Query(..., min_length=1),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    read_logger.info("Searching posts with query '%s' (%s)", q, mode.value)
+    page = await AsyncPostServices.search_posts(
+        q, db, mode=mode, limit=limit, cursor=cursor
+    )
+    read_logger.info("Search returned %s posts", len(page.items))
+    return PydanticJSONResponse(page, adapter=PostSchemas.POST_SEARCH_PAGE)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_posts(
+    updated_since: Optional[datetime] = Query(None),
+    after_id: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+):
+    logger.info(
+        "Exporting posts (updated_since=%s, after_id=%s)", updated_since, after_id
+    )
+    ExportServices.check_export_access(current_user)
+    stmt = ExportServices.posts_query(updated_since, after_id)
+    return StreamingResponse(
+        ExportServices.stream_rows_async(stmt, db), media_type="application/x-ndjson"
+    )
+
+
+@router.get("/{post_id}", response_model=PostSchemas.PostOut)
+async def get_post_by_id(post_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    read_logger.info("Fetching post with ID %s", post_id)
+    body = await AsyncPostServices.get_post_json(post_id, db)
+
+    if body is None:
+        logger.warning("Post with ID %s not found", post_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+        )
+
+    read_logger.info("Post with ID %s retrieved successfully", post_id)
+    return Response(content=body, media_type="application/json")
+
+
+@router.put("/{post_id}", response_model=PostSchemas.PostOut)
+async def edit_post_by_id(
+    post_id: int,
+    post_data: PostSchemas.PostBase,
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    logger.info("User %s editing post %s", current_user.id, post_id)
+    updated_post = await AsyncPostServices.edit_post_by_id(
+        post_id, post_data, current_user.id, db
+    )
+    logger.info("Post %s updated successfully by user %s", post_id, current_user.id)
+    return updated_post
+
+
+@router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_post(
+    post_id: int,
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    logger.info("User %s deleting post %s", current_user.id, post_id)
+    await AsyncPostServices.delete_post_by_id(post_id, current_user, db)
+    logger.info("Post %s deleted successfully by user %s", post_id, current_user.id)
+
+
+@router.get("/{post_id}/votes", response_model=VoteSchemas.VoteCount)
+async def get_post_votes(post_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    read_logger.info("Fetching votes for post %s", post_id)
+    body = await AsyncPostServices.get_vote_counts_json(post_id, db)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/{post_id}/vote", response_model=PostSchemas.PostOut)
+async def vote_on_post(
+    post_id: int,
+    vote: VoteSchemas.VoteRequest,
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    logger.info("User %s voting '%s' on post %s", current_user.id, vote.vote, post_id)
+    post_response = await AsyncPostServices.vote_on_post_service(
+        post_id, vote.vote, current_user, db
+    )
+    logger.info("User %s completed voting on post %s", current_user.id, post_id)
+    return post_response
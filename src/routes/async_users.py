@@ -0,0 +1,181 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.schemas import UserSchemas, PostSchemas, SearchSchemas
+from src.database import get_async_db, get_async_read_db
+from src.schemas.auth import LoginRequest, TokenResponse
+from src.services import (
+    AsyncAuthServices,
+    AsyncPostServices,
+    AsyncUserServices,
+    AuthServices,
+)
+from src.utils.logger import logger, read_logger
+from src.utils.responses import PydanticJSONResponse
+from src.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter(prefix="/users", tags=["Users"])
+
+
+@router.post("/register", response_model=UserSchemas.UserOut)
+async def register(
+    user: UserSchemas.UserCreateRequest,
+    db: AsyncSession = Depends(get_async_read_db),
+    write_db: AsyncSession = Depends(get_async_db),
+):
+    logger.info(
+        "Registration attempt | Email: '%s' | Username: '%s'", user.email, user.username
+    )
+    user_with_username = await AsyncUserServices.get_user_by_username(user.username, db)
+
+    if user_with_username:
+        logger.warning("Username taken: '%s'", user.username)
+        raise HTTPException(status_code=400, detail="Username already taken.")
+
+    user_with_email = await AsyncUserServices.get_user_by_email(user.email, db)
+
+    if user_with_email:
+        logger.warning("Email taken: '%s'", user.email)
+        raise HTTPException(status_code=400, detail="Email already taken.")
+
+    new_user = await AsyncUserServices.create_user(user, write_db)
+    logger.info(
+        "User registered successfully | ID: %s | Username: '%s'",
+        new_user.id,
+        new_user.username,
+    )
+    return new_user
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login(
+    request: LoginRequest,
+    db: AsyncSession = Depends(get_async_read_db),
+    write_db: AsyncSession = Depends(get_async_db),
+):
+    logger.info("Login attempt for username: %s", request.username)
+
+    user = await AsyncUserServices.get_active_user_by_username(request.username, db)
+
+    verified, new_hash = (
+        await AsyncAuthServices.verify_and_update_password(
+            request.password, user.hashed_password
+        )
+        if user
+        else (False, None)
+    )
+    if not verified:
+        logger.warning("Failed login for username: %s", request.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if new_hash:
+        # The bcrypt cost changed since this password was stored.
+        await AsyncUserServices.update_password_hash(user.id, new_hash, write_db)
+
+    logger.info("Login successful for user ID: %s", user.id)
+    token_data = {"sub": str(user.id)}  # put user ID in JWT
+    token = AuthServices.create_access_token(data=token_data)
+    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.get("/", response_model=UserSchemas.UserPage)
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    read_logger.info("Fetching all users")
+    page = await AsyncUserServices.get_all_users(db, limit=limit, cursor=cursor)
+    read_logger.info("Returned %s users", len(page.items))
+    return PydanticJSONResponse(page, adapter=UserSchemas.USER_PAGE)
+
+
+@router.get("/me", response_model=UserSchemas.UserOut)
+async def get_current_user_data(
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+):
+    read_logger.info("Fetching data for current user ID: %s", current_user.id)
+    return current_user
+
+
+@router.get("/search", response_model=UserSchemas.UserPage)
+async def search_users(
+    q: str = Query(..., min_length=1),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    read_logger.info("Searching users with query: '%s'", q)
+    page = await AsyncUserServices.query_users(
+        q, db, mode=mode, limit=limit, cursor=cursor
+    )
+    read_logger.info("Found %s users matching query: '%s'", len(page.items), q)
+    return PydanticJSONResponse(page, adapter=UserSchemas.USER_PAGE)
+
+
+@router.get("/{user_id}", response_model=UserSchemas.UserOut)
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    read_logger.info("Fetching user by ID: %s", user_id)
+    user = await AsyncUserServices.get_user_by_id(user_id, db)
+    if not user:
+        logger.warning("User ID %s not found", user_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return user
+
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+):
+    logger.info(
+        "Delete user attempt by user ID: %s for user ID: %s", current_user.id, user_id
+    )
+    if user_id != current_user.id:
+        logger.warning(
+            "Unauthorized delete attempt by user ID: %s for user ID: %s",
+            current_user.id,
+            user_id,
+        )
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized"
+        )
+
+    await AsyncUserServices.delete_user_by_id(user_id, db)
+    logger.info("User ID %s deleted successfully", user_id)
+
+
+@router.put("/me", response_model=UserSchemas.UserOut)
+async def edit_user(
+    new_user_data: UserSchemas.UserEditRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSchemas.Principal = Depends(AsyncAuthServices.get_current_user),
+):
+    logger.info("Edit profile request for user ID: %s", current_user.id)
+    return await AsyncUserServices.update_user_info(new_user_data, current_user.id, db)
+
+
+@router.get("/{user_id}/posts", response_model=PostSchemas.PostPage)
+async def get_my_posts(
+    user_id: int,
+    q: Optional[str] = Query(None),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    read_logger.info("Fetching posts for user ID: %s with query: %s", user_id, q)
+    page = await AsyncPostServices.query_user_posts(
+        user_id, db, query=q, limit=limit, cursor=cursor, mode=mode
+    )
+    read_logger.info("Found %s posts for user ID: %s", len(page.items), user_id)
+    return PydanticJSONResponse(page, adapter=PostSchemas.POST_PAGE)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from src.database import get_read_db
+from src.schemas import JobSchemas, UserSchemas
+from src.services import AuthServices, JobServices
+from src.utils.logger import read_logger
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobSchemas.JobOut)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
+):
+    read_logger.info("Fetching job by ID: %s", job_id)
+    return JobServices.get_job(job_id, db)
@@ -1,12 +1,16 @@
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import datetime
+from typing import Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from src.database import get_db
-from src.models.users import User
-from src.services import AuthServices, PostServices
-from src.schemas import PostSchemas, VoteSchemas
-from src.utils.logger import logger
+from src.database import get_db, get_read_db
+
+from src.services import AuthServices, ExportServices, PostServices, SearchServices
+from src.schemas import PostSchemas, SearchSchemas, UserSchemas, VoteSchemas
+from src.utils.logger import logger, read_logger
+from src.utils.responses import PydanticJSONResponse
+from src.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
@@ -14,92 +18,132 @@ router = APIRouter(prefix="/posts", tags=["Posts"])
 @router.post("/", response_model=PostSchemas.PostOut)
 def create_post(
     post_data: PostSchemas.PostCreate,
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
     db: Session = Depends(get_db),
 ):
     logger.info(
-        f"User {current_user.id} creating a new post titled '{post_data.title}'"
+        "User %s creating a new post titled '%s'", current_user.id, post_data.title
     )
     new_post = PostServices.create_post(post_data, current_user, db)
-    logger.info(f"Post created with ID {new_post.id} by user {current_user.id}")
+    logger.info("Post created with ID %s by user %s", new_post.id, current_user.id)
     return new_post
 
 
-@router.get("/")
-def get_all_posts(db: Session = Depends(get_db)):
-    logger.info("Fetching all posts")
-    posts = PostServices.get_all_posts(db)
-    logger.info(f"Fetched {len(posts)} posts")
-    return posts
+@router.get("/", response_model=PostSchemas.PostPage)
+def get_all_posts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    sort: PostSchemas.PostSort = Query(PostSchemas.PostSort.new),
+    period: PostSchemas.TopPeriod = Query(PostSchemas.TopPeriod.all),
+    db: Session = Depends(get_read_db),
+):
+    read_logger.info("Fetching all posts sorted by %s", sort.value)
+    posts, next_cursor = PostServices.get_all_posts(
+        db, limit=limit, cursor=cursor, sort=sort, period=period
+    )
+    read_logger.info("Fetched %s posts", len(posts))
+    return PydanticJSONResponse(
+        {"items": posts, "next_cursor": next_cursor}, adapter=PostSchemas.POST_PAGE
+    )
+
+
+@router.get("/search", response_model=PostSchemas.PostSearchPage)
+def search_posts(
+    q: str = Query(..., min_length=1),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    read_logger.info("Searching posts with query '%s' (%s)", q, mode.value)
+    if mode == SearchSchemas.SearchMode.fts:
+        posts, next_cursor = SearchServices.search_posts(
+            q, db, limit=limit, cursor=cursor
+        )
+    else:
+        posts, next_cursor = PostServices.query_all_posts(
+            q, db, limit=limit, cursor=cursor
+        )
+    read_logger.info("Search returned %s posts", len(posts))
+    return PydanticJSONResponse(
+        {"items": posts, "next_cursor": next_cursor},
+        adapter=PostSchemas.POST_SEARCH_PAGE,
+    )
 
 
-@router.get("/search", response_model=list[PostSchemas.PostOut])
-def search_posts(q: str = Query(..., min_length=1), db: Session = Depends(get_db)):
-    logger.info(f"Searching posts with query '{q}'")
-    posts = PostServices.query_all_posts(q, db)
-    logger.info(f"Search returned {len(posts)} posts")
-    return posts
+@router.get("/export", response_class=StreamingResponse)
+def export_posts(
+    updated_since: Optional[datetime] = Query(None),
+    after_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
+):
+    logger.info(
+        "Exporting posts (updated_since=%s, after_id=%s)", updated_since, after_id
+    )
+    ExportServices.check_export_access(current_user)
+    stmt = ExportServices.posts_query(updated_since, after_id)
+    return StreamingResponse(
+        ExportServices.stream_rows(stmt, db), media_type="application/x-ndjson"
+    )
 
 
 @router.get("/{post_id}", response_model=PostSchemas.PostOut)
-def get_post_by_id(post_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Fetching post with ID {post_id}")
-    post = PostServices.get_post_by_id(post_id, db)
+def get_post_by_id(post_id: int, db: Session = Depends(get_read_db)):
+    read_logger.info("Fetching post with ID %s", post_id)
+    body = PostServices.get_post_json(post_id, db)
 
-    if not post:
-        logger.warning(f"Post with ID {post_id} not found")
+    if body is None:
+        logger.warning("Post with ID %s not found", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
-    logger.info(f"Post with ID {post_id} retrieved successfully")
-    return post
+    read_logger.info("Post with ID %s retrieved successfully", post_id)
+    return Response(content=body, media_type="application/json")
 
 
-@router.put("/{post_id}")
+@router.put("/{post_id}", response_model=PostSchemas.PostOut)
 def edit_post_by_id(
     post_id: int,
     post_data: PostSchemas.PostBase,
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
     db: Session = Depends(get_db),
 ):
-    logger.info(f"User {current_user.id} editing post {post_id}")
+    logger.info("User %s editing post %s", current_user.id, post_id)
     updated_post = PostServices.edit_post_by_id(post_id, post_data, current_user.id, db)
-    logger.info(f"Post {post_id} updated successfully by user {current_user.id}")
+    logger.info("Post %s updated successfully by user %s", post_id, current_user.id)
     return updated_post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_post(
     post_id: int,
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
     db: Session = Depends(get_db),
 ):
-    logger.info(f"User {current_user.id} deleting post {post_id}")
+    logger.info("User %s deleting post %s", current_user.id, post_id)
     PostServices.delete_post_by_id(post_id, current_user, db)
-    logger.info(f"Post {post_id} deleted successfully by user {current_user.id}")
+    logger.info("Post %s deleted successfully by user %s", post_id, current_user.id)
 
 
 @router.get("/{post_id}/votes", response_model=VoteSchemas.VoteCount)
-def get_post_votes(post_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Fetching votes for post {post_id}")
-    votes = PostServices.get_vote_counts_for_post(post_id, db)
-    logger.info(
-        f"Post {post_id} has {votes['upvotes']} upvotes and {votes['downvotes']} downvotes"
-    )
-    return votes
+def get_post_votes(post_id: int, db: Session = Depends(get_read_db)):
+    read_logger.info("Fetching votes for post %s", post_id)
+    body = PostServices.get_vote_counts_json(post_id, db)
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("/{post_id}/vote", response_model=PostSchemas.PostOut)
 def vote_on_post(
     post_id: int,
     vote: VoteSchemas.VoteRequest,
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
     db: Session = Depends(get_db),
 ):
-    logger.info(f"User {current_user.id} voting '{vote.vote}' on post {post_id}")
+    logger.info("User %s voting '%s' on post %s", current_user.id, vote.vote, post_id)
     post_response = PostServices.vote_on_post_service(
         post_id, vote.vote, current_user, db
     )
-    logger.info(f"User {current_user.id} completed voting on post {post_id}")
+    logger.info("User %s completed voting on post %s", current_user.id, post_id)
     return post_response
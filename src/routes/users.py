@@ -1,92 +1,131 @@
-from typing import List, Optional
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from src.schemas import UserSchemas, PostSchemas
-from src.models import User
-from src.database import get_db
+from src.schemas import UserSchemas, PostSchemas, SearchSchemas
+from src.database import get_db, get_read_db
 from src.schemas.auth import LoginRequest, TokenResponse
-from src.services import UserServices, AuthServices, PostServices
-from src.utils import logger
+from src.services import UserServices, AuthServices, PostServices, SearchServices
+from src.utils.logger import logger, read_logger
+from src.utils.responses import PydanticJSONResponse
+from src.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/register", response_model=UserSchemas.UserOut)
-def register(user: UserSchemas.UserCreateRequest, db: Session = Depends(get_db)):
+def register(
+    user: UserSchemas.UserCreateRequest,
+    db: Session = Depends(get_read_db),
+    write_db: Session = Depends(get_db),
+):
     logger.info(
-        f"Registration attempt | Email: '{user.email}' | Username: '{user.username}'"
+        "Registration attempt | Email: '%s' | Username: '%s'", user.email, user.username
     )
     user_with_username = UserServices.get_user_by_username(user.username, db)
 
     if user_with_username:
-        logger.warning(f"Username taken: '{user.username}'")
+        logger.warning("Username taken: '%s'", user.username)
         raise HTTPException(status_code=400, detail="Username already taken.")
 
     user_with_email = UserServices.get_user_by_email(user.email, db)
 
     if user_with_email:
-        logger.warning(f"Email taken: '{user.email}'")
+        logger.warning("Email taken: '%s'", user.email)
         raise HTTPException(status_code=400, detail="Email already taken.")
 
-    new_user = UserServices.create_user(user, db)
+    new_user = UserServices.create_user(user, write_db)
     logger.info(
-        f"User registered successfully | ID: {new_user.id} | Username: '{new_user.username}'"
+        "User registered successfully | ID: %s | Username: '%s'",
+        new_user.id,
+        new_user.username,
     )
     return new_user
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    logger.info(f"Login attempt for username: {request.username}")
+def login(
+    request: LoginRequest,
+    db: Session = Depends(get_read_db),
+    write_db: Session = Depends(get_db),
+):
+    logger.info("Login attempt for username: %s", request.username)
 
-    user = db.query(User).filter(User.username == request.username).first()
+    user = UserServices.get_active_user_by_username(request.username, db)
 
-    if not user or not AuthServices.verify_password(
-        request.password, user.hashed_password
-    ):
-        logger.warning(f"Failed login for username: {request.username}")
+    verified, new_hash = (
+        AuthServices.verify_and_update_password(request.password, user.hashed_password)
+        if user
+        else (False, None)
+    )
+    if not verified:
+        logger.warning("Failed login for username: %s", request.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    logger.info(f"Login successful for user ID: {user.id}")
+    if new_hash:
+        # The bcrypt cost changed since this password was stored.
+        UserServices.update_password_hash(user.id, new_hash, write_db)
+
+    logger.info("Login successful for user ID: %s", user.id)
     token_data = {"sub": str(user.id)}  # put user ID in JWT
     token = AuthServices.create_access_token(data=token_data)
     return {"access_token": token, "token_type": "bearer"}
 
 
-@router.get("/", response_model=list[UserSchemas.UserOut])
-def get_all_users(db: Session = Depends(get_db)):
-    logger.info("Fetching all users")
-    users = UserServices.get_all_users(db)
-    logger.info(f"Returned {len(users)} users")
-    return users
+@router.get("/", response_model=UserSchemas.UserPage)
+def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    read_logger.info("Fetching all users")
+    users, next_cursor = UserServices.get_all_users(db, limit=limit, cursor=cursor)
+    read_logger.info("Returned %s users", len(users))
+    return PydanticJSONResponse(
+        {"items": users, "next_cursor": next_cursor}, adapter=UserSchemas.USER_PAGE
+    )
 
 
 @router.get("/me", response_model=UserSchemas.UserOut)
-def get_current_user_data(current_user: User = Depends(AuthServices.get_current_user)):
-    logger.info(f"Fetching data for current user ID: {current_user.id}")
+def get_current_user_data(
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
+):
+    read_logger.info("Fetching data for current user ID: %s", current_user.id)
     return current_user
 
 
-@router.get("/search", response_model=list[UserSchemas.UserOut])
-def search_users(q: str = Query(..., min_length=1), db: Session = Depends(get_db)):
-    logger.info(f"Searching users with query: '{q}'")
-    users = UserServices.query_users(q, db)
-    logger.info(f"Found {len(users)} users matching query: '{q}'")
-    return users
+@router.get("/search", response_model=UserSchemas.UserPage)
+def search_users(
+    q: str = Query(..., min_length=1),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+):
+    read_logger.info("Searching users with query: '%s'", q)
+    if mode == SearchSchemas.SearchMode.fts:
+        users, next_cursor = SearchServices.search_users(
+            q, db, limit=limit, cursor=cursor
+        )
+    else:
+        users, next_cursor = UserServices.query_users(q, db, limit=limit, cursor=cursor)
+    read_logger.info("Found %s users matching query: '%s'", len(users), q)
+    return PydanticJSONResponse(
+        {"items": users, "next_cursor": next_cursor}, adapter=UserSchemas.USER_PAGE
+    )
 
 
 @router.get("/{user_id}", response_model=UserSchemas.UserOut)
-def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    logger.info(f"Fetching user by ID: {user_id}")
-    user = db.query(User).filter(User.id == user_id).first()
+def get_user_by_id(user_id: int, db: Session = Depends(get_read_db)):
+    read_logger.info("Fetching user by ID: %s", user_id)
+    user = UserServices.get_user_by_id(user_id, db)
     if not user:
-        logger.warning(f"User ID {user_id} not found")
+        logger.warning("User ID %s not found", user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
@@ -97,38 +136,49 @@ def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
 ):
     logger.info(
-        f"Delete user attempt by user ID: {current_user.id} for user ID: {user_id}"
+        "Delete user attempt by user ID: %s for user ID: %s", current_user.id, user_id
     )
     if user_id != current_user.id:
         logger.warning(
-            f"Unauthorized delete attempt by user ID: {current_user.id} for user ID: {user_id}"
+            "Unauthorized delete attempt by user ID: %s for user ID: %s",
+            current_user.id,
+            user_id,
         )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized"
         )
 
     UserServices.delete_user_by_id(user_id, db)
-    logger.info(f"User ID {user_id} deleted successfully")
+    logger.info("User ID %s deleted successfully", user_id)
 
 
 @router.put("/me", response_model=UserSchemas.UserOut)
 def edit_user(
     new_user_data: UserSchemas.UserEditRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(AuthServices.get_current_user),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
 ):
-    logger.info(f"Edit profile request for user ID: {current_user.id}")
+    logger.info("Edit profile request for user ID: %s", current_user.id)
     return UserServices.update_user_info(new_user_data, current_user.id, db)
 
 
-@router.get("/{user_id}/posts", response_model=List[PostSchemas.PostOut])
+@router.get("/{user_id}/posts", response_model=PostSchemas.PostPage)
 def get_my_posts(
-    user_id: int, q: Optional[str] = Query(None), db: Session = Depends(get_db)
+    user_id: int,
+    q: Optional[str] = Query(None),
+    mode: SearchSchemas.SearchMode = Query(SearchSchemas.SearchMode.fts),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
 ):
-    logger.info(f"Fetching posts for user ID: {user_id} with query: {q}")
-    posts = PostServices.query_user_posts(user_id, db, query=q)
-    logger.info(f"Found {len(posts)} posts for user ID: {user_id}")
-    return posts
+    read_logger.info("Fetching posts for user ID: %s with query: %s", user_id, q)
+    posts, next_cursor = PostServices.query_user_posts(
+        user_id, db, query=q, limit=limit, cursor=cursor, mode=mode
+    )
+    read_logger.info("Found %s posts for user ID: %s", len(posts), user_id)
+    return PydanticJSONResponse(
+        {"items": posts, "next_cursor": next_cursor}, adapter=PostSchemas.POST_PAGE
+    )
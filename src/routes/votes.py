@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from src.database import get_read_db
+
+from src.schemas import UserSchemas
+from src.services import AuthServices, ExportServices
+from src.utils.logger import logger
+
+router = APIRouter(prefix="/votes", tags=["Votes"])
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_votes(
+    updated_since: Optional[datetime] = Query(None),
+    after_id: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: UserSchemas.Principal = Depends(AuthServices.get_current_user),
+):
+    logger.info(
+        "Exporting votes (updated_since=%s, after_id=%s)", updated_since, after_id
+    )
+    ExportServices.check_export_access(current_user)
+    stmt = ExportServices.votes_query(updated_since, after_id)
+    return StreamingResponse(
+        ExportServices.stream_rows(stmt, db), media_type="application/x-ndjson"
+    )
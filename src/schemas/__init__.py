@@ -1,3 +1,5 @@
 from . import posts as PostSchemas
 from . import users as UserSchemas
 from . import votes as VoteSchemas
+from . import search as SearchSchemas
+from . import jobs as JobSchemas
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from enum import Enum
+
+
+class JobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class JobOut(BaseModel):
+    # Any authenticated user can read any job, so errors and results, which
+    # may name other users or internals, stay in the table and the logs.
+    id: int
+    kind: str
+    status: JobStatusEnum
+    attempts: int
+    max_attempts: int
+    created_at: datetime
+    run_after: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,8 +1,22 @@
-from pydantic import BaseModel, ConfigDict
+from enum import Enum
+from typing import Optional
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, TypeAdapter
 from datetime import datetime
 from .users import UserBrief
 
 
+class PostSort(str, Enum):
+    new = "new"
+    hot = "hot"
+    top = "top"
+
+
+class TopPeriod(str, Enum):
+    day = "day"
+    week = "week"
+    all = "all"
+
+
 class PostBase(BaseModel):
     title: str
     content: str
@@ -16,6 +30,30 @@ class PostOut(PostBase):
     id: int
     created_at: datetime
     author: UserBrief
-    upvotes: int = 0
-    downvotes: int = 0
+    upvotes: int = Field(
+        default=0, validation_alias=AliasChoices("upvote_count", "upvotes")
+    )
+    downvotes: int = Field(
+        default=0, validation_alias=AliasChoices("downvote_count", "downvotes")
+    )
     model_config = ConfigDict(from_attributes=True)
+
+
+class PostPage(BaseModel):
+    items: list[PostOut]
+    next_cursor: Optional[str] = None
+
+
+class PostSearchHit(PostOut):
+    score: Optional[float] = None
+    snippet: Optional[str] = None
+
+
+class PostSearchPage(BaseModel):
+    items: list[PostSearchHit]
+    next_cursor: Optional[str] = None
+
+
+# Built once: list routes validate and dump whole pages through these.
+POST_PAGE = TypeAdapter(PostPage)
+POST_SEARCH_PAGE = TypeAdapter(PostSearchPage)
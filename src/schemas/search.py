@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class SearchMode(str, Enum):
+    fts = "fts"
+    substring = "substring"
@@ -1,5 +1,5 @@
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, EmailStr, constr
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter, constr
 from datetime import datetime
 
 
@@ -37,3 +37,19 @@ class UserOut(BaseModel):
     first_name: str
     last_name: str
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: Optional[str] = None
+
+
+# Built once: list routes validate and dump whole pages through this.
+USER_PAGE = TypeAdapter(UserPage)
+
+
+class Principal(UserOut):
+    """The authenticated user, detached from any session and safe to share
+    between requests."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -14,3 +14,11 @@ class VoteRequest(BaseModel):
 class VoteCount(BaseModel):
     upvotes: int
     downvotes: int
+
+
+class VoteCountDrift(BaseModel):
+    post_id: int
+    stored_upvotes: int
+    stored_downvotes: int
+    actual_upvotes: int
+    actual_downvotes: int
@@ -0,0 +1,120 @@
+"""Production launcher: a supervisor process and SERVER_WORKERS preforked workers.
+
+The supervisor creates the schema once, then starts the workers, which share
+its listening socket. It replaces a worker that dies or that retires after
+serving SERVER_MAX_REQUESTS requests, which bounds per-process memory growth.
+On SIGTERM or SIGINT each worker stops accepting connections and gets up to
+SERVER_GRACEFUL_TIMEOUT_S to finish the requests it is serving.
+
+The periodic hot score decay and the background job runner run once, in the
+supervisor, instead of in every worker. Caches stay per worker, though; see
+"Several workers" in the README for the staleness that allows.
+
+uvloop and httptools are used when they are installed. With more than one
+worker, logs go to the console only: the workers cannot share a rotating file.
+
+Usage:
+    python -m src.server [--host 0.0.0.0] [--port 8080] [--workers N]
+
+``python -m src.main`` stays the single-process development server with
+auto-reload.
+"""
+
+import argparse
+import os
+import sys
+from importlib.util import find_spec
+
+from src import config
+
+APP = "src.main:app"
+
+
+def event_loop() -> str:
+    return "uvloop" if find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if find_spec("httptools") else "h11"
+
+
+def uvicorn_options(host: str, port: int, workers: int) -> dict:
+    return {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "limit_max_requests": config.SERVER_MAX_REQUESTS or None,
+        # Spreads the recycling of workers started together.
+        "limit_max_requests_jitter": config.SERVER_MAX_REQUESTS_JITTER,
+        "timeout_graceful_shutdown": config.SERVER_GRACEFUL_TIMEOUT_S,
+        "timeout_keep_alive": config.SERVER_KEEPALIVE_S,
+        "proxy_headers": True,
+        "forwarded_allow_ips": config.SERVER_FORWARDED_ALLOW_IPS,
+    }
+
+
+def prepare_schema():
+    """Create missing tables here, once, and keep the workers from doing it."""
+    if config.DB_INIT_SCHEMA:
+        from src.database import init_db
+
+        init_db()
+    # Workers are spawned, so they read this when they import src.config.
+    os.environ["DB_INIT_SCHEMA"] = "0"
+
+
+def prepare_logging(workers: int):
+    """Keep several workers from sharing, and rotating, one log file."""
+    if workers > 1:
+        # Workers are spawned, so they read this when they import src.config.
+        os.environ["LOG_TO_FILE"] = "0"
+
+
+def start_background_tasks(workers: int) -> list:
+    """Run the periodic tasks here, once, rather than in each of ``workers``.
+
+    Returns the tasks started, to close once the workers have exited. A
+    single worker is served in this process and starts them itself.
+    """
+    if workers <= 1 or not config.BACKGROUND_TASKS:
+        return []
+    # Workers are spawned, so they read this when they import src.config.
+    os.environ["BACKGROUND_TASKS"] = "0"
+    from src.services.jobs import job_runner
+    from src.services.ranking import hot_score_decay
+
+    tasks = [hot_score_decay, job_runner]
+    for task in tasks:
+        task.start()
+    return tasks
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.SERVER_WORKERS,
+        help="worker processes (default: SERVER_WORKERS)",
+    )
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    prepare_schema()
+    prepare_logging(args.workers)
+    tasks = start_background_tasks(args.workers)
+    try:
+        uvicorn.run(APP, **uvicorn_options(args.host, args.port, args.workers))
+    finally:
+        for task in reversed(tasks):
+            task.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
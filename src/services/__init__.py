@@ -1,3 +1,25 @@
+from importlib import import_module
+
 from . import auth as AuthServices
+from . import search as SearchServices
+from . import votes as VoteServices
+from . import ranking as RankingServices
 from . import posts as PostServices
+from . import purge as PurgeServices
+from . import jobs as JobServices
 from . import users as UserServices
+from . import exports as ExportServices
+
+# The async services are imported on first access, as the async routers are,
+# so DB_MODE=sync does not load aiosqlite.
+_ASYNC_SERVICES = {
+    "AsyncAuthServices": ".async_auth",
+    "AsyncPostServices": ".async_posts",
+    "AsyncUserServices": ".async_users",
+}
+
+
+def __getattr__(name):
+    if name not in _ASYNC_SERVICES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return import_module(_ASYNC_SERVICES[name], __name__)
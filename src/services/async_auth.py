@@ -0,0 +1,57 @@
+import asyncio
+from typing import Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import get_async_read_db
+from src.models import User
+from src.schemas import UserSchemas
+from src.services.password_hasher import password_hasher
+from src.services.principal_cache import principal_cache
+from src.utils import logger
+from . import AuthServices
+
+
+async def hash_password(password: str) -> str:
+    # The hash runs in the password pool; only the wait happens on the loop.
+    return await asyncio.wrap_future(password_hasher.hash(password))
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    result, new_hash = await asyncio.wrap_future(
+        password_hasher.verify_and_update(plain_password, hashed_password)
+    )
+    if not result:
+        logger.warning("Password verification failed")
+    return result, new_hash
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return (await verify_and_update_password(plain_password, hashed_password))[0]
+
+
+async def get_current_user(
+    token: str = Depends(AuthServices.oauth2_scheme),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> UserSchemas.Principal:
+    logger.debug("Getting current user from token")
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation()
+    payload = AuthServices.decode_token(token)
+    user_id = int(payload["sub"])
+
+    user = await db.get(User, user_id)
+    if user is None or user.deleted_at is not None:
+        logger.warning("User not found for id %s from token", user_id)
+        raise AuthServices.credentials_exception()
+
+    logger.debug("User %s (id %s) authenticated successfully", user.username, user.id)
+    principal = UserSchemas.Principal.model_validate(user)
+    principal_cache.put(token, principal, payload.get("exp"), generation)
+    return principal
@@ -0,0 +1,178 @@
+"""Async counterparts of the post services.
+
+Each call runs the sync service inside ``AsyncSession.run_sync`` so the query
+logic lives in one place, and returns fully built schemas: ORM objects cannot
+lazy-load once they are back on the event loop.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import config
+from src.schemas import PostSchemas, SearchSchemas, UserSchemas, VoteSchemas
+from src.utils.pagination import DEFAULT_PAGE_SIZE
+from . import PostServices, SearchServices
+from .response_cache import POST, VOTES, response_cache
+
+
+async def create_post(
+    post_data: PostSchemas.PostCreate, user: UserSchemas.Principal, db: AsyncSession
+) -> PostSchemas.PostOut:
+    def run(session):
+        post = PostServices.create_post(post_data, user, session)
+        return PostSchemas.PostOut.model_validate(post)
+
+    return await db.run_sync(run)
+
+
+async def get_all_posts(
+    db: AsyncSession,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    sort: PostSchemas.PostSort = PostSchemas.PostSort.new,
+    period: PostSchemas.TopPeriod = PostSchemas.TopPeriod.all,
+) -> PostSchemas.PostPage:
+    def run(session):
+        posts, next_cursor = PostServices.get_all_posts(
+            session, limit=limit, cursor=cursor, sort=sort, period=period
+        )
+        return PostSchemas.PostPage(items=posts, next_cursor=next_cursor)
+
+    return await db.run_sync(run)
+
+
+async def search_posts(
+    q: str,
+    db: AsyncSession,
+    mode: SearchSchemas.SearchMode = SearchSchemas.SearchMode.fts,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> PostSchemas.PostSearchPage:
+    def run(session):
+        if mode == SearchSchemas.SearchMode.fts:
+            posts, next_cursor = SearchServices.search_posts(
+                q, session, limit=limit, cursor=cursor
+            )
+        else:
+            posts, next_cursor = PostServices.query_all_posts(
+                q, session, limit=limit, cursor=cursor
+            )
+        return PostSchemas.PostSearchPage(items=posts, next_cursor=next_cursor)
+
+    return await db.run_sync(run)
+
+
+async def get_post_by_id(
+    post_id: int, db: AsyncSession
+) -> Optional[PostSchemas.PostOut]:
+    def run(session):
+        post = PostServices.get_post_by_id(post_id, session)
+        return PostSchemas.PostOut.model_validate(post) if post else None
+
+    return await db.run_sync(run)
+
+
+async def get_post_json(post_id: int, db: AsyncSession) -> Optional[bytes]:
+    # Serve hits without entering run_sync.
+    body = response_cache.get(POST, post_id)
+    if body is not None:
+        return body
+    return await db.run_sync(
+        lambda session: PostServices.load_post_json(post_id, session)
+    )
+
+
+async def get_vote_counts_json(post_id: int, db: AsyncSession) -> bytes:
+    body = response_cache.get(VOTES, post_id)
+    if body is not None:
+        return body
+    return await db.run_sync(
+        lambda session: PostServices.load_vote_counts_json(post_id, session)
+    )
+
+
+async def delete_post_by_id(
+    post_id: int, current_user: UserSchemas.Principal, db: AsyncSession
+):
+    await db.run_sync(
+        lambda session: PostServices.delete_post_by_id(post_id, current_user, session)
+    )
+
+
+async def get_vote_counts_for_post(post_id: int, db: AsyncSession) -> dict:
+    return await db.run_sync(
+        lambda session: PostServices.get_vote_counts_for_post(post_id, session)
+    )
+
+
+async def vote_on_post_service(
+    post_id: int,
+    vote: VoteSchemas.VoteTypeEnum,
+    current_user: UserSchemas.Principal,
+    db: AsyncSession,
+) -> PostSchemas.PostOut:
+    if config.VOTE_INGEST_MODE == "direct":
+        return await db.run_sync(
+            lambda session: PostServices.vote_on_post_service(
+                post_id, vote, current_user, session
+            )
+        )
+
+    # Buffered modes: wait for the flush on the event loop, not in run_sync.
+    response, flushed = await db.run_sync(
+        lambda session: PostServices.queue_vote(post_id, vote, current_user, session)
+    )
+    if config.VOTE_INGEST_MODE == "optimistic":
+        return response
+    try:
+        await asyncio.wait_for(
+            asyncio.wrap_future(flushed), timeout=config.VOTE_ACK_TIMEOUT_S
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vote not yet recorded, try again.",
+        )
+    except Exception as e:
+        raise PostServices.vote_flush_error(e, post_id)
+    post = await get_post_by_id(post_id, db)
+    if post is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+        )
+    return post
+
+
+async def edit_post_by_id(
+    post_id: int,
+    post_data: PostSchemas.PostBase,
+    current_user_id: int,
+    db: AsyncSession,
+) -> PostSchemas.PostOut:
+    def run(session):
+        post = PostServices.edit_post_by_id(
+            post_id, post_data, current_user_id, session
+        )
+        return PostSchemas.PostOut.model_validate(post)
+
+    return await db.run_sync(run)
+
+
+async def query_user_posts(
+    user_id: int,
+    db: AsyncSession,
+    query: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    mode: SearchSchemas.SearchMode = SearchSchemas.SearchMode.fts,
+) -> PostSchemas.PostPage:
+    def run(session):
+        posts, next_cursor = PostServices.query_user_posts(
+            user_id, session, query=query, limit=limit, cursor=cursor, mode=mode
+        )
+        return PostSchemas.PostPage(items=posts, next_cursor=next_cursor)
+
+    return await db.run_sync(run)
@@ -0,0 +1,114 @@
+"""Async counterparts of the user services.
+
+See src/services/async_posts.py: the sync services run inside
+``AsyncSession.run_sync`` and results leave as schemas. Password hashing is
+done before entering the session so bcrypt never runs on the event loop.
+"""
+
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import User
+from src.schemas import SearchSchemas, UserSchemas
+from src.utils.pagination import DEFAULT_PAGE_SIZE
+from . import AsyncAuthServices, SearchServices, UserServices
+
+
+async def get_user_by_email(email: str, db: AsyncSession) -> Optional[User]:
+    return await db.run_sync(
+        lambda session: UserServices.get_user_by_email(email, session)
+    )
+
+
+async def get_user_by_username(username: str, db: AsyncSession) -> Optional[User]:
+    return await db.run_sync(
+        lambda session: UserServices.get_user_by_username(username, session)
+    )
+
+
+async def get_active_user_by_username(
+    username: str, db: AsyncSession
+) -> Optional[User]:
+    return await db.run_sync(
+        lambda session: UserServices.get_active_user_by_username(username, session)
+    )
+
+
+async def get_user_by_id(id: int, db: AsyncSession) -> Optional[User]:
+    return await db.run_sync(lambda session: UserServices.get_user_by_id(id, session))
+
+
+async def get_all_users(
+    db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> UserSchemas.UserPage:
+    def run(session):
+        users, next_cursor = UserServices.get_all_users(
+            session, limit=limit, cursor=cursor
+        )
+        return UserSchemas.UserPage(items=users, next_cursor=next_cursor)
+
+    return await db.run_sync(run)
+
+
+async def query_users(
+    q: str,
+    db: AsyncSession,
+    mode: SearchSchemas.SearchMode = SearchSchemas.SearchMode.fts,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> UserSchemas.UserPage:
+    def run(session):
+        if mode == SearchSchemas.SearchMode.fts:
+            users, next_cursor = SearchServices.search_users(
+                q, session, limit=limit, cursor=cursor
+            )
+        else:
+            users, next_cursor = UserServices.query_users(
+                q, session, limit=limit, cursor=cursor
+            )
+        return UserSchemas.UserPage(items=users, next_cursor=next_cursor)
+
+    return await db.run_sync(run)
+
+
+async def delete_user_by_id(user_id: int, db: AsyncSession):
+    await db.run_sync(lambda session: UserServices.delete_user_by_id(user_id, session))
+
+
+async def create_user(
+    user: UserSchemas.UserCreateRequest, db: AsyncSession
+) -> UserSchemas.UserOut:
+    hashed_password = await AsyncAuthServices.hash_password(user.password)
+
+    def run(session):
+        new_user = UserServices.create_user(
+            user, session, hashed_password=hashed_password
+        )
+        return UserSchemas.UserOut.model_validate(new_user)
+
+    return await db.run_sync(run)
+
+
+async def update_user_info(
+    user_new_data: UserSchemas.UserEditRequest, user_id: int, db: AsyncSession
+) -> UserSchemas.UserOut:
+    hashed_password = None
+    if user_new_data.password is not None:
+        hashed_password = await AsyncAuthServices.hash_password(user_new_data.password)
+
+    def run(session):
+        user = UserServices.update_user_info(
+            user_new_data, user_id, session, hashed_password=hashed_password
+        )
+        return UserSchemas.UserOut.model_validate(user)
+
+    return await db.run_sync(run)
+
+
+async def update_password_hash(user_id: int, hashed_password: str, db: AsyncSession):
+    await db.run_sync(
+        lambda session: UserServices.update_password_hash(
+            user_id, hashed_password, session
+        )
+    )
@@ -1,14 +1,16 @@
 import logging
+from typing import Optional, Tuple
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
 
 from src.models import User
-from src.database import get_db
+from src.schemas import UserSchemas
+from src.database import get_read_db
 from src.utils import logger
+from src.services.password_hasher import password_hasher
+from src.services.principal_cache import principal_cache
 
 
 # Config
@@ -16,62 +18,102 @@ SECRET_KEY = "yaballe"  # replace with env var in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
 
 def hash_password(password: str) -> str:
     logger.debug("Hashing password")
-    hashed = pwd_context.hash(password)
+    hashed = password_hasher.hash(password).result()
     logger.debug("Password hashed successfully")
     return hashed
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if its cost is outdated."""
     logger.debug("Verifying password")
-    result = pwd_context.verify(plain_password, hashed_password)
+    result, new_hash = password_hasher.verify_and_update(
+        plain_password, hashed_password
+    ).result()
     if result:
         logger.debug("Password verification succeeded")
     else:
         logger.warning("Password verification failed")
-    return result
+    return result, new_hash
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return verify_and_update_password(plain_password, hashed_password)[0]
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
-    logger.info(f"Creating access token for data: {data}")
+    logger.info("Creating access token for data: %s", data)
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     to_encode.update({"exp": expire})
+    from jose import jwt  # deferred: python-jose is slow to import
+
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     logger.info("Access token created successfully")
     return token
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    logger.debug("Getting current user from token")
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def decode_token(token: str) -> dict:
+    """Verify ``token`` and return its claims; ``sub`` is guaranteed present."""
+    from jose import JWTError, jwt  # deferred: python-jose is slow to import
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        if payload.get("sub") is None:
             logger.warning("Token payload missing 'sub' claim")
-            raise credentials_exception
+            raise credentials_exception()
     except JWTError as e:
-        logger.warning(f"JWT decode error: {e}")
-        raise credentials_exception
+        logger.warning("JWT decode error: %s", e)
+        raise credentials_exception()
+    return payload
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+
+def decode_user_id(token: str) -> int:
+    """Verify ``token`` and return the user id in its ``sub`` claim."""
+    return int(decode_token(token)["sub"])
+
+
+def evict_principal(user_id: int):
+    """Drop cached authentications of ``user_id`` after it changed."""
+    principal_cache.evict_user(user_id)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)
+) -> UserSchemas.Principal:
+    logger.debug("Getting current user from token")
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation()
+    payload = decode_token(token)
+    user_id = int(payload["sub"])
+
+    user = (
+        db.query(User).filter(User.id == user_id, User.deleted_at.is_(None)).first()
+    )
     if user is None:
-        logger.warning(f"User not found for id {user_id} from token")
-        raise credentials_exception
+        logger.warning("User not found for id %s from token", user_id)
+        raise credentials_exception()
 
-    logger.debug(f"User {user.username} (id {user.id}) authenticated successfully")
-    return user
+    logger.debug("User %s (id %s) authenticated successfully", user.username, user.id)
+    principal = UserSchemas.Principal.model_validate(user)
+    principal_cache.put(token, principal, payload.get("exp"), generation)
+    return principal
@@ -0,0 +1,492 @@
+"""Background jobs persisted in the ``jobs`` table.
+
+Work too slow for a request (purging a deleted account, reconciling the vote
+counters, rebuilding the search indexes) is queued with ``enqueue`` in the
+caller's transaction, so it is committed, or rolled back, with the change
+that needs it. ``JobRunner`` threads in every API process, or a
+``src.commands.run_jobs`` sidecar, then take due jobs one at a time:
+
+- a job is claimed by a single UPDATE, so two workers (threads or
+  processes) never run the same job;
+- a job that raises is retried with exponential backoff until it has run
+  ``max_attempts`` times, then marked failed; handlers must therefore be
+  safe to run again;
+- a job whose worker disappears mid-run is queued again once its lease
+  (``JOB_LEASE_S``) has expired. Long handlers renew the lease between
+  transactions (``JobLease.renew``); a run whose lease expired anyway finds
+  out at its next renewal and stops, leaving the job to the run that took
+  it over;
+- an idempotency key names at most one unfinished job: enqueueing the same
+  key again returns the pending job instead of adding another one.
+
+``GET /jobs/{id}`` reports the state of a job.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src import config
+from src.database import ReadSessionLocal, SessionLocal
+from src.models import Job
+from src.models.jobs import JobStatus
+from src.utils import logger
+from src.utils.metrics import Counter, Gauge, Histogram
+from . import PostServices, PurgeServices, RankingServices, SearchServices
+
+JOB_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+jobs_enqueued = Counter("jobs_enqueued", "Jobs added to the queue", ["kind"])
+jobs_finished = Counter(
+    "jobs_finished", "Job runs by how they ended", ["kind", "outcome"]
+)
+job_queue_seconds = Histogram(
+    "job_queue_latency_seconds",
+    "Time from a job being due to a worker starting it",
+    ["kind"],
+    buckets=JOB_SECONDS_BUCKETS,
+)
+job_run_seconds = Histogram(
+    "job_run_duration_seconds",
+    "Time taken to run a job",
+    ["kind"],
+    buckets=JOB_SECONDS_BUCKETS,
+)
+jobs_backlog = Gauge("jobs_backlog", "Due jobs waiting for a worker")
+
+# Lease expiry and pruning run at most this often.
+MAINTENANCE_INTERVAL_S = 60
+
+
+class JobInterrupted(Exception):
+    """Raised by a handler that stopped early because the runner is closing.
+
+    The job is queued again without counting the attempt.
+    """
+
+
+class LeaseLost(Exception):
+    """The job's lease expired mid-run and the job was queued again.
+
+    Another run owns the job now; this one stops without recording anything.
+    """
+
+
+class JobLease:
+    """What a handler gets to cooperate with its runner.
+
+    ``stop`` is set when the runner is closing. ``renew`` extends the lease
+    inside the caller's transaction, so it is committed with the work done so
+    far; handlers call it between transactions.
+    """
+
+    def __init__(self, job, stop: threading.Event):
+        self.job = job
+        self.stop = stop
+
+    def renew(self, db: Session):
+        """Restart the lease. Raises ``LeaseLost`` if it already expired."""
+        renewed = db.execute(
+            update(Job)
+            .where(
+                Job.id == self.job.id,
+                Job.status == JobStatus.running,
+                Job.attempts == self.job.attempts,
+            )
+            .values(started_at=RankingServices.utcnow())
+        ).rowcount
+        if not renewed:
+            raise LeaseLost
+
+
+JobHandler = Callable[[dict, Session, JobLease], Optional[dict]]
+
+
+def _purge_user(payload: dict, db: Session, lease: JobLease) -> dict:
+    if not PurgeServices.purge_user(
+        payload["user_id"], db, stop=lease.stop, on_chunk=lease.renew
+    ):
+        raise JobInterrupted
+    return {"user_id": payload["user_id"]}
+
+
+def _reconcile_vote_counts(payload: dict, db: Session, lease: JobLease) -> dict:
+    drift = PostServices.reconcile_vote_counts(db, fix=payload.get("fix", True))
+    return {"drifted_posts": len(drift)}
+
+
+def _rebuild_search_index(payload: dict, db: Session, lease: JobLease) -> dict:
+    posts = SearchServices.rebuild_post_index(db)
+    lease.renew(db)
+    db.commit()
+    return {"posts": posts, "users": SearchServices.rebuild_user_index(db)}
+
+
+HANDLERS: Dict[str, JobHandler] = {
+    "purge_user": _purge_user,
+    "reconcile_vote_counts": _reconcile_vote_counts,
+    "rebuild_search_index": _rebuild_search_index,
+}
+
+
+def enqueue(
+    kind: str,
+    db: Session,
+    payload: Optional[dict] = None,
+    idempotency_key: Optional[str] = None,
+    max_attempts: int = config.JOB_MAX_ATTEMPTS,
+) -> int:
+    """Queue a ``kind`` job and return its id. Does not commit.
+
+    With an ``idempotency_key`` that already names an unfinished job, that
+    job's id is returned and nothing is queued.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job_id = db.scalar(
+        insert(Job)
+        .values(
+            kind=kind,
+            payload=payload or {},
+            idempotency_key=idempotency_key,
+            status=JobStatus.queued,
+            attempts=0,
+            max_attempts=max_attempts,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[Job.idempotency_key],
+            index_where=Job.finished_at.is_(None),
+        )
+        .returning(Job.id)
+    )
+    if job_id is None:
+        job_id = db.scalar(
+            select(Job.id).where(
+                Job.idempotency_key == idempotency_key, Job.finished_at.is_(None)
+            )
+        )
+        logger.debug("Job %s already queued as %s", idempotency_key, job_id)
+        return job_id
+    jobs_enqueued.labels(kind).inc()
+    logger.debug("Queued %s job %s", kind, job_id)
+    return job_id
+
+
+def get_job(job_id: int, db: Session) -> Job:
+    job = db.get(Job, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+def count_due_jobs(db: Session) -> int:
+    return db.scalar(
+        select(func.count(Job.id)).where(
+            Job.status == JobStatus.queued, Job.run_after <= RankingServices.utcnow()
+        )
+    )
+
+
+def has_due_job(db: Session) -> bool:
+    """Whether a job is due, by a read that takes no write lock."""
+    return (
+        db.scalar(
+            select(literal_column("1"))
+            .select_from(Job)
+            .where(
+                Job.status == JobStatus.queued,
+                Job.run_after <= RankingServices.utcnow(),
+            )
+            .limit(1)
+        )
+        is not None
+    )
+
+
+def claim_next_job(db: Session):
+    """Mark the job due the longest as running and return it, or None."""
+    now = RankingServices.utcnow()
+    due = (
+        select(Job.id)
+        .where(Job.status == JobStatus.queued, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    job = db.execute(
+        update(Job)
+        .where(Job.id == due, Job.status == JobStatus.queued)
+        .values(status=JobStatus.running, attempts=Job.attempts + 1, started_at=now)
+        .returning(
+            Job.id,
+            Job.kind,
+            Job.payload,
+            Job.attempts,
+            Job.max_attempts,
+            Job.run_after,
+        )
+    ).first()
+    db.commit()
+    if job is not None:
+        job_queue_seconds.labels(job.kind).observe(
+            max((now - job.run_after).total_seconds(), 0)
+        )
+    return job
+
+
+def _finish(db: Session, job, **values):
+    # Only while this run still holds the job: after a lost lease the state
+    # belongs to the run that took it over.
+    finished = db.execute(
+        update(Job)
+        .where(
+            Job.id == job.id,
+            Job.status == JobStatus.running,
+            Job.attempts == job.attempts,
+        )
+        .values(**values)
+    ).rowcount
+    db.commit()
+    if not finished:
+        logger.warning(
+            "Job %s (%s) was taken over, not recording its end", job.id, job.kind
+        )
+
+
+def run_job(job, db: Session, stop: Optional[threading.Event] = None):
+    """Run a claimed job and record how it ended."""
+    stop = stop or threading.Event()
+    started = time.perf_counter()
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise LookupError(f"Unknown job kind: {job.kind}")
+        result = handler(job.payload, db, JobLease(job, stop))
+    except JobInterrupted:
+        db.rollback()
+        _finish(db, job, status=JobStatus.queued, attempts=job.attempts - 1)
+        outcome = "interrupted"
+    except LeaseLost:
+        db.rollback()
+        logger.warning(
+            "Job %s (%s) outlived its lease and was queued again, stopping",
+            job.id,
+            job.kind,
+        )
+        outcome = "lost"
+    except Exception as exc:
+        db.rollback()
+        now = RankingServices.utcnow()
+        error = f"{type(exc).__name__}: {exc}"
+        if job.attempts < job.max_attempts:
+            delay = config.JOB_RETRY_BACKOFF_S * 2 ** (job.attempts - 1)
+            logger.warning(
+                "Job %s (%s) failed on attempt %s, retrying in %ss: %s",
+                job.id,
+                job.kind,
+                job.attempts,
+                delay,
+                error,
+            )
+            _finish(
+                db,
+                job,
+                status=JobStatus.queued,
+                run_after=now + timedelta(seconds=delay),
+                last_error=error,
+            )
+            outcome = "retried"
+        else:
+            logger.exception("Job %s (%s) failed for good", job.id, job.kind)
+            _finish(
+                db,
+                job,
+                status=JobStatus.failed,
+                finished_at=now,
+                last_error=error,
+            )
+            outcome = "failed"
+    else:
+        _finish(
+            db,
+            job,
+            status=JobStatus.succeeded,
+            finished_at=RankingServices.utcnow(),
+            result=result,
+        )
+        outcome = "succeeded"
+    jobs_finished.labels(job.kind, outcome).inc()
+    job_run_seconds.labels(job.kind).observe(time.perf_counter() - started)
+    return outcome
+
+
+def run_next_job(db: Session, stop: Optional[threading.Event] = None) -> bool:
+    """Run the job due the longest, if any. Returns whether one ran."""
+    job = claim_next_job(db)
+    jobs_backlog.set(count_due_jobs(db))
+    db.commit()
+    if job is None:
+        return False
+    run_job(job, db, stop)
+    return True
+
+
+def run_due_jobs(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """Run jobs until none is due. Returns how many ran."""
+    ran = 0
+    while (stop is None or not stop.is_set()) and run_next_job(db, stop):
+        ran += 1
+    return ran
+
+
+def requeue_expired_jobs(db: Session) -> int:
+    """Requeue the running jobs whose lease expired. Returns how many.
+
+    Jobs that were on their last attempt are marked failed instead.
+    """
+    now = RankingServices.utcnow()
+    expired = (Job.status == JobStatus.running) & (
+        Job.started_at < now - timedelta(seconds=config.JOB_LEASE_S)
+    )
+    error = "Lease expired: the worker running the job was lost"
+    failed = db.execute(
+        update(Job)
+        .where(expired, Job.attempts >= Job.max_attempts)
+        .values(status=JobStatus.failed, finished_at=now, last_error=error)
+    ).rowcount
+    requeued = db.execute(
+        update(Job)
+        .where(expired)
+        .values(status=JobStatus.queued, run_after=now, last_error=error)
+    ).rowcount
+    db.commit()
+    if failed or requeued:
+        logger.warning(
+            "Requeued %s job(s) and failed %s whose lease expired", requeued, failed
+        )
+    return failed + requeued
+
+
+def prune_finished_jobs(db: Session) -> int:
+    """Delete the jobs that finished more than JOB_RETENTION_HOURS ago."""
+    cutoff = RankingServices.utcnow() - timedelta(hours=config.JOB_RETENTION_HOURS)
+    pruned = db.execute(
+        delete(Job)
+        .where(Job.finished_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return pruned
+
+
+class JobRunner:
+    """Pool of ``workers`` threads running due jobs, one at a time each.
+
+    An idle worker first checks for a due job on a read-only connection and
+    only claims one, through the writer, when there is one. It waits
+    ``poll_interval_s`` between checks, doubling up to ``max_poll_interval_s``
+    while it finds nothing; ``notify`` wakes it at once and resets the wait.
+    The first worker also expires leases and prunes finished jobs.
+    """
+
+    def __init__(
+        self,
+        workers: int = config.JOB_WORKERS,
+        poll_interval_s: float = config.JOB_POLL_INTERVAL_S,
+        max_poll_interval_s: float = config.JOB_POLL_MAX_INTERVAL_S,
+    ):
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self.max_poll_interval_s = max(max_poll_interval_s, poll_interval_s)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._run, args=(i == 0,), name=f"job-worker-{i}", daemon=True
+            )
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def close(self):
+        """Stop the workers, letting them finish (or interrupt) their job."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self, maintains: bool):
+        maintained_at = None
+        wait_s = self.poll_interval_s
+        while not self._stop.is_set():
+            # Cleared before looking, so a notify during the run is not lost.
+            self._wake.clear()
+            try:
+                if maintains and (
+                    maintained_at is None
+                    or time.monotonic() - maintained_at >= MAINTENANCE_INTERVAL_S
+                ):
+                    maintained_at = time.monotonic()
+                    self._maintain()
+                ran = self._run_due_job()
+            except Exception:
+                logger.exception("Running background jobs failed")
+                ran = False
+            if ran:
+                wait_s = self.poll_interval_s
+                continue
+            if self._wake.wait(wait_s):
+                wait_s = self.poll_interval_s
+            else:
+                wait_s = min(wait_s * 2, self.max_poll_interval_s)
+
+    def _maintain(self):
+        db = SessionLocal()
+        try:
+            requeue_expired_jobs(db)
+            prune_finished_jobs(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run_due_job(self) -> bool:
+        read_db = ReadSessionLocal()
+        try:
+            due = has_due_job(read_db)
+        finally:
+            read_db.close()
+        if not due:
+            jobs_backlog.set(0)
+            return False
+        db = SessionLocal()
+        try:
+            return run_next_job(db, self._stop)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+job_runner = JobRunner()
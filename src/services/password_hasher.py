@@ -0,0 +1,177 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict
+
+from fastapi import HTTPException, status
+
+from src import config
+from src.utils import logger
+from src.utils.metrics import Counter, Gauge, Histogram
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+pool_workers = Gauge(
+    "password_hash_pool_workers", "Worker processes in the password hashing pool"
+)
+pool_in_flight = Gauge(
+    "password_hash_pool_in_flight", "Password hashes queued or running in the pool"
+)
+pool_utilization = Gauge(
+    "password_hash_pool_utilization", "Share of pool workers busy hashing (0-1)"
+)
+pool_rejected = Counter(
+    "password_hash_pool_rejected",
+    "Password hashes turned away because the pool queue was full",
+)
+pool_wait_seconds = Histogram(
+    "password_hash_pool_wait_seconds",
+    "Time a password hash waited for a free worker",
+    buckets=HASH_BUCKETS,
+)
+hash_seconds = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent inside bcrypt per operation",
+    ["operation"],
+    buckets=HASH_BUCKETS,
+)
+
+# One CryptContext per cost factor, built lazily inside each worker process.
+# Only the workers hash, so only they import passlib.
+_contexts: Dict[int, "CryptContext"] = {}
+
+
+def _context(rounds: int) -> "CryptContext":
+    context = _contexts.get(rounds)
+    if context is None:
+        from passlib.context import CryptContext
+
+        # Pinning min and max to the configured cost makes verify_and_update
+        # flag hashes made with any other cost for a rehash.
+        context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        _contexts[rounds] = context
+    return context
+
+
+def _hash(password: str, rounds: int):
+    started = time.monotonic()
+    hashed = _context(rounds).hash(password)
+    return started, time.monotonic(), hashed
+
+
+def _verify_and_update(plain_password: str, hashed_password: str, rounds: int):
+    started = time.monotonic()
+    result = _context(rounds).verify_and_update(plain_password, hashed_password)
+    return started, time.monotonic(), result
+
+
+class PasswordHasher:
+    """Bounded process pool that runs bcrypt off the request threads.
+
+    At most ``max_pending`` hashes may be queued or running at once; beyond
+    that new hashes fail fast with a 503 and a ``Retry-After`` header rather
+    than letting a login burst pile up behind the workers. The pool is started
+    on first use and can be restarted after ``close``.
+    """
+
+    def __init__(
+        self,
+        workers: int = config.HASH_POOL_WORKERS,
+        max_pending: int = config.HASH_POOL_MAX_PENDING,
+        rounds: int = config.BCRYPT_ROUNDS,
+    ):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = 0
+
+    def hash(self, password: str) -> Future:
+        """Future resolving to the bcrypt hash of ``password``."""
+        return self._submit("hash", _hash, password, self.rounds)
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> Future:
+        """Future resolving to ``(verified, new_hash)``.
+
+        ``new_hash`` is set when the password is correct but was hashed with a
+        different cost than the one configured, and should then be stored.
+        """
+        return self._submit(
+            "verify", _verify_and_update, plain_password, hashed_password, self.rounds
+        )
+
+    def close(self):
+        """Stop the worker processes once their current hashes finish."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _submit(self, operation: str, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                pool_rejected.inc()
+                logger.warning(
+                    "Password hash pool is full (%s pending), rejecting request",
+                    self._pending,
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent logins, try again shortly.",
+                    headers={"Retry-After": str(config.HASH_POOL_RETRY_AFTER_S)},
+                )
+            if self._pool is None:
+                # spawn: forking a process that runs server threads is unsafe.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                pool_workers.set(self.workers)
+                pool_utilization.set_function(self._utilization)
+            self._pending += 1
+            pool_in_flight.inc()
+            pool = self._pool
+
+        submitted = time.monotonic()
+        result = Future()
+        try:
+            task = pool.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        def done(task: Future):
+            self._release()
+            try:
+                started, finished, value = task.result()
+            except Exception as e:
+                result.set_exception(e)
+                return
+            pool_wait_seconds.observe(max(0.0, started - submitted))
+            hash_seconds.labels(operation).observe(finished - started)
+            result.set_result(value)
+
+        task.add_done_callback(done)
+        return result
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        pool_in_flight.dec()
+
+    def _utilization(self) -> float:
+        return min(self._pending, self.workers) / self.workers
+
+
+password_hasher = PasswordHasher()
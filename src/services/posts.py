@@ -1,50 +1,183 @@
-from typing import List, Optional
-from sqlalchemy import or_
+from concurrent.futures import Future, TimeoutError
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import case, func, or_, tuple_
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session, contains_eager
 
-from src.schemas import PostSchemas, VoteSchemas
-from src.models import User, Post, Vote
+from src import config
+from src.schemas import PostSchemas, SearchSchemas, UserSchemas, VoteSchemas
+from src.models import Post, User, Vote
 from src.utils import logger
+from . import RankingServices, SearchServices, VoteServices
+from .response_cache import POST, VOTES, response_cache
+from .rows import POST_ROW_COLUMNS, post_row
+from .vote_buffer import vote_buffer
+from src.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 
 
-def create_post(post_data: PostSchemas.PostCreate, user: User, db: Session) -> Post:
+def create_post(
+    post_data: PostSchemas.PostCreate, user: UserSchemas.Principal, db: Session
+) -> Post:
     logger.info(
-        f"Creating post titled '{post_data.title}' for user {user.username} (id {user.id})"
+        "Creating post titled '%s' for user %s (id %s)",
+        post_data.title,
+        user.username,
+        user.id,
     )
     new_post = Post(title=post_data.title, content=post_data.content, author_id=user.id)
     db.add(new_post)
     db.commit()
     db.refresh(new_post)
-    logger.info(f"Post created with id {new_post.id}")
+    logger.info("Post created with id %s", new_post.id)
     return new_post
 
 
-def get_all_posts(db: Session) -> list[Post]:
-    logger.debug("Fetching all posts ordered by creation date")
-    return db.query(Post).order_by(Post.created_at.desc()).all()
+# Sort key of every feed ordering, with the types its cursor decodes to.
+SORT_KEYS = {
+    PostSchemas.PostSort.new: ((Post.created_at, Post.id), (datetime, int)),
+    PostSchemas.PostSort.hot: ((Post.hot_score, Post.id), (float, int)),
+    PostSchemas.PostSort.top: ((Post.score, Post.id), (int, int)),
+}
+
+TOP_PERIODS = {
+    PostSchemas.TopPeriod.day: timedelta(days=1),
+    PostSchemas.TopPeriod.week: timedelta(weeks=1),
+}
+
+
+def paginate_posts(
+    q: Query,
+    limit: int,
+    cursor: Optional[str],
+    sort: PostSchemas.PostSort = PostSchemas.PostSort.new,
+) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of ``q`` in ``sort`` order and the cursor of the next one.
+
+    Keyset pagination on the sort key (``(created_at, id)`` for the newest
+    first): the cursor carries the key of the last row served and the next
+    page seeks past it through the index, so every page costs the same
+    regardless of depth. Ranked orders move as votes come in, so a post can
+    show up twice or be skipped when its score changes between two pages.
+
+    Posts come back as ``PostOut``-shaped dicts read in one statement with
+    their author (see ``rows``).
+    """
+    columns, types = SORT_KEYS[sort]
+    after = decode_cursor(cursor, *types)
+    if after:
+        q = q.filter(tuple_(*columns) < after)
+
+    rows = (
+        q.with_entities(*POST_ROW_COLUMNS, *columns)
+        .join(User, User.id == Post.author_id)
+        # Posts of deleted accounts stay until the purge reaches them.
+        .filter(User.deleted_at.is_(None))
+        .order_by(*(column.desc() for column in columns))
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*rows[-1][len(POST_ROW_COLUMNS) :])
+    return [post_row(row) for row in rows], next_cursor
+
+
+def get_all_posts(
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    sort: PostSchemas.PostSort = PostSchemas.PostSort.new,
+    period: PostSchemas.TopPeriod = PostSchemas.TopPeriod.all,
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of the feed: newest first, hot, or top over ``period``."""
+    logger.debug("Fetching a page of posts sorted by %s", sort.value)
+    q = db.query(Post)
+    if sort == PostSchemas.PostSort.top and period in TOP_PERIODS:
+        q = q.filter(Post.created_at >= RankingServices.utcnow() - TOP_PERIODS[period])
+    return paginate_posts(q, limit, cursor, sort)
 
 
-def get_post_by_id(post_id: int, db: Session) -> Post:
-    logger.debug(f"Fetching post by id {post_id}")
-    return db.query(Post).filter(Post.id == post_id).first()
+def live_posts(db: Session) -> Query:
+    """Posts whose author has not deleted their account.
 
+    The posts of a deleted account are gone for every endpoint, reads and
+    writes alike, before the purge job removes the rows.
+    """
+    return db.query(Post).join(Post.author).filter(User.deleted_at.is_(None))
 
-def delete_post_by_id(post_id: int, current_user: User, db: Session):
+
+def get_post_by_id(post_id: int, db: Session) -> Optional[Post]:
+    logger.debug("Fetching post by id %s", post_id)
+    return live_posts(db).filter(Post.id == post_id).first()
+
+
+def get_post_with_author(post_id: int, db: Session) -> Optional[Post]:
+    """Fetch a post and its author in one statement, ready for ``PostOut``."""
+    return (
+        live_posts(db)
+        .options(contains_eager(Post.author))
+        .filter(Post.id == post_id)
+        .first()
+    )
+
+
+def get_post_json(post_id: int, db: Session) -> Optional[bytes]:
+    """``PostOut`` of a post as JSON bytes, through the response cache."""
+    body = response_cache.get(POST, post_id)
+    return body if body is not None else load_post_json(post_id, db)
+
+
+def load_post_json(post_id: int, db: Session) -> Optional[bytes]:
+    """Serialize a post from the database and cache the result."""
+    token = response_cache.token(post_id)
+    post = get_post_with_author(post_id, db)
+    if not post:
+        return None
+    body = PostSchemas.PostOut.model_validate(post).model_dump_json().encode()
+    response_cache.put(POST, post_id, body, token, author_id=post.author_id)
+    return body
+
+
+def get_vote_counts_json(post_id: int, db: Session) -> bytes:
+    """``VoteCount`` of a post as JSON bytes, through the response cache."""
+    body = response_cache.get(VOTES, post_id)
+    return body if body is not None else load_vote_counts_json(post_id, db)
+
+
+def load_vote_counts_json(post_id: int, db: Session) -> bytes:
+    token = response_cache.token(post_id)
+    author_id, upvotes, downvotes = _vote_counts(post_id, db)
+    body = (
+        VoteSchemas.VoteCount(upvotes=upvotes, downvotes=downvotes)
+        .model_dump_json()
+        .encode()
+    )
+    response_cache.put(VOTES, post_id, body, token, author_id=author_id)
+    return body
+
+
+def delete_post_by_id(post_id: int, current_user: UserSchemas.Principal, db: Session):
     logger.info(
-        f"User {current_user.username} (id {current_user.id}) attempting to delete post {post_id}"
+        "User %s (id %s) attempting to delete post %s",
+        current_user.username,
+        current_user.id,
+        post_id,
     )
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = get_post_by_id(post_id, db)
 
     if not post:
-        logger.warning(f"Post {post_id} not found")
+        logger.warning("Post %s not found", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found."
         )
 
     if post.author_id != current_user.id:
         logger.warning(
-            f"User {current_user.id} not authorized to delete post {post_id}"
+            "User %s not authorized to delete post %s", current_user.id, post_id
         )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -53,43 +186,40 @@ def delete_post_by_id(post_id: int, current_user: User, db: Session):
 
     db.delete(post)
     db.commit()
-    logger.info(f"Post {post_id} deleted successfully")
+    response_cache.invalidate_post(post_id)
+    logger.info("Post %s deleted successfully", post_id)
 
 
-def get_vote_counts_for_post(post_id: int, db: Session) -> VoteSchemas.VoteCount:
-    logger.debug(f"Getting vote counts for post {post_id}")
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        logger.warning(f"Post {post_id} not found for vote count")
+def _vote_counts(post_id: int, db: Session) -> Tuple[int, int, int]:
+    """The author id and vote counters of a post, or a 404."""
+    row = (
+        live_posts(db)
+        .with_entities(Post.author_id, Post.upvote_count, Post.downvote_count)
+        .filter(Post.id == post_id)
+        .first()
+    )
+    if not row:
+        logger.warning("Post %s not found for vote count", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found."
         )
+    return tuple(row)
 
-    upvotes = (
-        db.query(Vote)
-        .filter(
-            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.upvote
-        )
-        .count()
-    )
-    downvotes = (
-        db.query(Vote)
-        .filter(
-            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.downvote
-        )
-        .count()
-    )
 
-    logger.debug(f"Post {post_id} has {upvotes} upvotes and {downvotes} downvotes")
+def get_vote_counts_for_post(post_id: int, db: Session) -> VoteSchemas.VoteCount:
+    logger.debug("Getting vote counts for post %s", post_id)
+    _, upvotes, downvotes = _vote_counts(post_id, db)
+
+    logger.debug("Post %s has %s upvotes and %s downvotes", post_id, upvotes, downvotes)
     return {"upvotes": upvotes, "downvotes": downvotes}
 
 
 def get_user_vote_on_post(post_id: int, user_id: int, db: Session):
-    logger.debug(f"Getting vote of user {user_id} on post {post_id}")
+    logger.debug("Getting vote of user %s on post %s", user_id, post_id)
     post = get_post_by_id(post_id, db)
 
     if not post:
-        logger.warning(f"Post {post_id} not found while fetching user vote")
+        logger.warning("Post %s not found while fetching user vote", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
@@ -100,83 +230,172 @@ def get_user_vote_on_post(post_id: int, user_id: int, db: Session):
 
 
 def vote_on_post_service(
-    post_id: int, vote: VoteSchemas.VoteTypeEnum, current_user: User, db: Session
+    post_id: int,
+    vote: VoteSchemas.VoteTypeEnum,
+    current_user: UserSchemas.Principal,
+    db: Session,
 ):
     logger.info(
-        f"User {current_user.username} (id {current_user.id}) voting '{vote.value}' on post {post_id}"
+        "User %s (id %s) voting '%s' on post %s",
+        current_user.username,
+        current_user.id,
+        vote.value,
+        post_id,
     )
-    post = get_post_by_id(post_id, db)
+    if config.VOTE_INGEST_MODE != "direct":
+        response, flushed = queue_vote(post_id, vote, current_user, db)
+        if config.VOTE_INGEST_MODE == "optimistic":
+            return response
+        wait_for_vote_flush(flushed, post_id)
+        post = get_post_with_author(post_id, db)
+        if not post:
+            logger.warning("Post %s deleted while voting", post_id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+            )
+        return PostSchemas.PostOut.model_validate(post)
+
+    # One upsert keyed on unique_vote replaces the read-then-write of the
+    # existing vote; RETURNING yields a row only if the vote was inserted or
+    # flipped. The vote triggers move the counters inside the same statement.
+    try:
+        changed = VoteServices.upsert_votes(
+            [{"user_id": current_user.id, "post_id": post_id, "vote_type": vote}],
+            db,
+        ).first()
+    except IntegrityError:
+        db.rollback()
+        changed, post = None, None
+    else:
+        post = get_post_with_author(post_id, db)
 
     if not post:
-        logger.warning(f"Post {post_id} not found for voting")
+        db.rollback()
+        logger.warning("Post %s not found for voting", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
-    existing_vote = get_user_vote_on_post(post_id, current_user.id, db)
-
-    if existing_vote:
-        if existing_vote.vote_type != vote:
-            logger.info(
-                f"Updating vote from '{existing_vote.vote_type.value}' to '{vote.value}' for user {current_user.id} on post {post_id}"
-            )
-            existing_vote.vote_type = vote
-            db.commit()
-        else:
-            logger.debug(
-                f"User {current_user.id} already voted '{vote.value}' on post {post_id}, no change"
-            )
-    else:
+    if changed:
         logger.info(
-            f"Adding new vote '{vote.value}' for user {current_user.id} on post {post_id}"
+            "Recorded vote '%s' for user %s on post %s",
+            vote.value,
+            current_user.id,
+            post_id,
         )
-        new_vote = Vote(post_id=post_id, user_id=current_user.id, vote_type=vote)
-        db.add(new_vote)
-        db.commit()
-
-    upvotes = (
-        db.query(Vote)
-        .filter(
-            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.upvote
+        # The score moved: re-rank the post in the hot feed right away.
+        hot = RankingServices.hot_score(
+            post.score, post.created_at, RankingServices.utcnow()
+        )
+        RankingServices.set_hot_scores({post_id: hot}, db)
+    else:
+        logger.debug(
+            "User %s already voted '%s' on post %s, no change",
+            current_user.id,
+            vote.value,
+            post_id,
         )
-        .count()
+
+    # Serialize before committing: the commit expires the post.
+    response = PostSchemas.PostOut.model_validate(post)
+    db.commit()
+    if changed:
+        response_cache.invalidate_post(post_id)
+    logger.debug(
+        "Post %s now has %s upvotes and %s downvotes",
+        post_id,
+        response.upvotes,
+        response.downvotes,
     )
-    downvotes = (
-        db.query(Vote)
-        .filter(
-            Vote.post_id == post_id, Vote.vote_type == VoteSchemas.VoteTypeEnum.downvote
+    return response
+
+
+def queue_vote(
+    post_id: int,
+    vote: VoteSchemas.VoteTypeEnum,
+    current_user: UserSchemas.Principal,
+    db: Session,
+) -> Tuple[PostSchemas.PostOut, Future]:
+    """Hand a vote to the write-behind buffer.
+
+    Returns the post with the totals the vote is expected to produce, and a
+    future that resolves once the vote is committed.
+    """
+    post = get_post_with_author(post_id, db)
+
+    if not post:
+        logger.warning("Post %s not found for voting", post_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
-        .count()
+
+    previous = (
+        db.query(Vote.vote_type)
+        .filter(Vote.post_id == post_id, Vote.user_id == current_user.id)
+        .scalar()
     )
+    response = PostSchemas.PostOut.model_validate(post)
+    if previous != vote:
+        if vote == VoteSchemas.VoteTypeEnum.upvote:
+            response.upvotes += 1
+            response.downvotes -= previous is not None
+        else:
+            response.downvotes += 1
+            response.upvotes -= previous is not None
 
-    logger.debug(f"Post {post_id} now has {upvotes} upvotes and {downvotes} downvotes")
+    # End the read transaction so the flusher can take the writer connection.
+    db.commit()
 
-    post_response = PostSchemas.PostOut(
-        id=post.id,
-        title=post.title,
-        content=post.content,
-        author=post.author,
-        upvotes=upvotes,
-        downvotes=downvotes,
-        created_at=post.created_at,
+    logger.debug(
+        "Queued vote '%s' of user %s on post %s", vote.value, current_user.id, post_id
+    )
+    return response, vote_buffer.submit(current_user.id, post_id, vote)
+
+
+def wait_for_vote_flush(flushed: Future, post_id: int):
+    try:
+        flushed.result(timeout=config.VOTE_ACK_TIMEOUT_S)
+    except TimeoutError:
+        logger.error("Timed out waiting for the vote buffer to flush")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vote not yet recorded, try again.",
+        )
+    except Exception as e:
+        raise vote_flush_error(e, post_id)
+
+
+def vote_flush_error(error: Exception, post_id: int) -> HTTPException:
+    """Map the error a buffered vote failed with to the response to send."""
+    if isinstance(error, IntegrityError):
+        # The post was deleted between queueing the vote and its flush.
+        logger.warning("Post %s not found for voting", post_id)
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+        )
+    logger.error("Buffered vote on post %s failed: %s", post_id, error)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Vote not recorded, try again.",
     )
-    return post_response
 
 
 def edit_post_by_id(
     post_id: int, post_data: PostSchemas.PostBase, current_user_id: int, db: Session
 ) -> Post:
-    logger.info(f"User {current_user_id} editing post {post_id}")
+    logger.info("User %s editing post %s", current_user_id, post_id)
     post = get_post_by_id(post_id, db)
 
     if not post:
-        logger.warning(f"Post {post_id} not found for editing")
+        logger.warning("Post %s not found for editing", post_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
     if post.author_id != current_user_id:
-        logger.warning(f"User {current_user_id} not authorized to edit post {post_id}")
+        logger.warning(
+            "User %s not authorized to edit post %s", current_user_id, post_id
+        )
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to edit this post",
@@ -186,35 +405,114 @@ def edit_post_by_id(
     post.content = post_data.content
 
     db.commit()
+    response_cache.invalidate_post(post_id)
     db.refresh(post)
 
-    logger.info(f"Post {post_id} edited successfully")
+    logger.info("Post %s edited successfully", post_id)
     return post
 
 
-def query_all_posts(q: str, db: Session) -> List[PostSchemas.PostOut]:
-    logger.debug(f"Querying all posts with search term '{q}'")
-    return (
-        db.query(Post)
-        .filter(
-            or_(
-                Post.title.ilike(f"%{q}%"),
-                Post.content.ilike(f"%{q}%"),
-            )
+def query_all_posts(
+    q: str,
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Substring search, newest first. Kept as the fallback to full-text search."""
+    logger.debug("Querying all posts with search term '%s'", q)
+    search = db.query(Post).filter(
+        or_(
+            Post.title.ilike(f"%{q}%"),
+            Post.content.ilike(f"%{q}%"),
         )
-        .all()
     )
+    return paginate_posts(search, limit, cursor)
 
 
 def query_user_posts(
-    user_id: int, db: Session, query: Optional[str] = None
-) -> List[Post]:
-    logger.debug(f"Querying posts for user {user_id} with search term '{query}'")
+    user_id: int,
+    db: Session,
+    query: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    mode: SearchSchemas.SearchMode = SearchSchemas.SearchMode.fts,
+) -> Tuple[List[dict], Optional[str]]:
+    logger.debug("Querying posts for user %s with search term '%s'", user_id, query)
     q = db.query(Post).filter(Post.author_id == user_id)
 
-    if query:
+    if query and mode == SearchSchemas.SearchMode.fts:
+        match = SearchServices.match_expression(query)
+        if match is None:
+            return [], None
+        q = q.filter(Post.id.in_(SearchServices.matching_post_ids(match)))
+    elif query:
         q = q.filter(
             or_(Post.title.ilike(f"%{query}%"), Post.content.ilike(f"%{query}%"))
         )
 
-    return q.order_by(Post.created_at.desc()).all()
+    return paginate_posts(q, limit, cursor)
+
+
+def reconcile_vote_counts(
+    db: Session, fix: bool = True
+) -> List[VoteSchemas.VoteCountDrift]:
+    """Recompute the stored vote counters from the votes table.
+
+    Returns every post whose stored counters disagree with its votes. When
+    ``fix`` is set the drifted counters are overwritten, and the hot scores of
+    those posts recomputed, in one transaction.
+    """
+    logger.info("Reconciling post vote counters against the votes table")
+    actual = (
+        db.query(
+            Vote.post_id.label("post_id"),
+            func.sum(
+                case((Vote.vote_type == VoteSchemas.VoteTypeEnum.upvote, 1), else_=0)
+            ).label("upvotes"),
+            func.sum(
+                case((Vote.vote_type == VoteSchemas.VoteTypeEnum.downvote, 1), else_=0)
+            ).label("downvotes"),
+        )
+        .group_by(Vote.post_id)
+        .subquery()
+    )
+    actual_up = func.coalesce(actual.c.upvotes, 0)
+    actual_down = func.coalesce(actual.c.downvotes, 0)
+    rows = (
+        db.query(
+            Post.id, Post.upvote_count, Post.downvote_count, actual_up, actual_down
+        )
+        .outerjoin(actual, actual.c.post_id == Post.id)
+        .filter(or_(Post.upvote_count != actual_up, Post.downvote_count != actual_down))
+        .all()
+    )
+
+    drift = [
+        VoteSchemas.VoteCountDrift(
+            post_id=post_id,
+            stored_upvotes=stored_up,
+            stored_downvotes=stored_down,
+            actual_upvotes=up,
+            actual_downvotes=down,
+        )
+        for post_id, stored_up, stored_down, up, down in rows
+    ]
+
+    if drift and fix:
+        for item in drift:
+            db.query(Post).filter(Post.id == item.post_id).update(
+                {
+                    Post.upvote_count: item.actual_upvotes,
+                    Post.downvote_count: item.actual_downvotes,
+                },
+                synchronize_session=False,
+            )
+        RankingServices.refresh_hot_scores([item.post_id for item in drift], db)
+        db.commit()
+        for item in drift:
+            response_cache.invalidate_post(item.post_id)
+        logger.warning("Fixed vote counter drift on %s posts", len(drift))
+    else:
+        logger.info("Found vote counter drift on %s posts", len(drift))
+
+    return drift
@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from src import config
+from src.schemas import UserSchemas
+from src.utils.metrics import Counter, Gauge
+
+cache_hits = Counter(
+    "auth_principal_cache_hits", "Authenticated requests served from cache"
+)
+cache_misses = Counter(
+    "auth_principal_cache_misses", "Authenticated requests that verified the token"
+)
+cache_evictions = Counter(
+    "auth_principal_cache_evictions",
+    "Cached principals dropped before expiry",
+    ["reason"],
+)
+cache_entries = Gauge("auth_principal_cache_entries", "Tokens currently cached")
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU cache of verified tokens and the user they belong to.
+
+    Entries are keyed by a SHA-256 of the token, so raw tokens are not kept in
+    memory, and expire after ``ttl_s`` or at the token's ``exp``, whichever is
+    sooner. ``evict_user`` drops every token of a user at once.
+
+    A lookup that misses takes a ``generation()`` before reading the user and
+    hands it back to ``put``; if an eviction happened in between, the possibly
+    stale principal is not cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.AUTH_CACHE_MAX_ENTRIES,
+        ttl_s: float = config.AUTH_CACHE_TTL_S,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Tuple[UserSchemas.Principal, float]]" = (
+            OrderedDict()
+        )
+        self._keys_by_user: Dict[int, Set[bytes]] = {}
+        self._generation = 0
+        cache_entries.set_function(lambda: len(self._entries))
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, token: str) -> Optional[UserSchemas.Principal]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    cache_hits.inc()
+                    return principal
+                self._remove(key)
+                cache_evictions.labels("expired").inc()
+        cache_misses.inc()
+        return None
+
+    def put(
+        self,
+        token: str,
+        principal: UserSchemas.Principal,
+        token_expires_at: Optional[float],
+        generation: int,
+    ):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl_s
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        key = self.key(token)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._remove(key)
+            self._entries[key] = (principal, expires_at)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                cache_evictions.labels("capacity").inc()
+
+    def evict_user(self, user_id: int):
+        """Forget every cached token of ``user_id``."""
+        with self._lock:
+            self._generation += 1
+            keys = self._keys_by_user.pop(user_id, ())
+            for key in keys:
+                self._entries.pop(key, None)
+        if keys:
+            cache_evictions.labels("user_changed").inc(len(keys))
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: bytes):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].id
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,141 @@
+"""Background purge of deleted user accounts.
+
+Deleting a user only sets ``users.deleted_at``, which hides the account from
+the API at once. The rows that belong to it are deleted here afterwards, in
+dependency order:
+
+1. the user's votes (the vote triggers move the counters of those posts,
+   whose hot scores are recomputed in the same transaction);
+2. the votes on the user's posts;
+3. the user's posts (SQLite cascades to any vote cast on them meanwhile);
+4. the user row.
+
+Every step runs in transactions of at most ``USER_PURGE_CHUNK_SIZE`` rows, so
+the writer lock is released between chunks however much the user had, and
+drops the cached responses of the posts each chunk touched. Deleting the
+account queues a ``purge_user`` job (see ``jobs``); ``purge_deleted_users``
+sweeps up every deleted account at once.
+
+Until the purge reaches them, the user's posts are hidden from the feeds,
+search and post pages, but their votes still count in the vote totals and
+their username and email stay taken.
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from src import config
+from src.models import Post, User, Vote
+from src.utils import logger
+from src.utils.metrics import Counter
+from . import RankingServices
+from .response_cache import response_cache
+
+purged_rows = Counter("user_purge_rows", "Rows deleted by the user purge", ["table"])
+
+
+# Each step deletes up to ``limit`` rows and returns, per row, the id of the
+# post it affected, whose cached responses are then out of date.
+
+
+def _delete_votes(user_id: int, db: Session, limit: int) -> List[int]:
+    ids = select(Vote.id).where(Vote.user_id == user_id).limit(limit)
+    post_ids = db.scalars(
+        delete(Vote)
+        .where(Vote.id.in_(ids))
+        .returning(Vote.post_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    # The scores of the posts the user voted on just moved.
+    RankingServices.refresh_hot_scores(post_ids, db)
+    return post_ids
+
+
+def _delete_votes_on_posts(user_id: int, db: Session, limit: int) -> List[int]:
+    ids = (
+        select(Vote.id)
+        .join(Post, Post.id == Vote.post_id)
+        .where(Post.author_id == user_id)
+        .limit(limit)
+    )
+    return db.scalars(
+        delete(Vote)
+        .where(Vote.id.in_(ids))
+        .returning(Vote.post_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _delete_posts(user_id: int, db: Session, limit: int) -> List[int]:
+    ids = select(Post.id).where(Post.author_id == user_id).limit(limit)
+    return db.scalars(
+        delete(Post)
+        .where(Post.id.in_(ids))
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+PURGE_STEPS = (
+    ("votes", _delete_votes),
+    ("votes", _delete_votes_on_posts),
+    ("posts", _delete_posts),
+)
+
+
+def purge_user(
+    user_id: int,
+    db: Session,
+    chunk_size: int = config.USER_PURGE_CHUNK_SIZE,
+    stop: Optional[threading.Event] = None,
+    on_chunk: Optional[Callable[[Session], None]] = None,
+) -> bool:
+    """Delete the rows of deleted user ``user_id``, one chunk per transaction.
+
+    ``on_chunk`` runs in the transaction of every chunk, right before it is
+    committed; the purge job renews its lease there.
+
+    Returns False if ``stop`` was set before the user row itself was deleted;
+    the next run resumes where this one stopped.
+    """
+    for table, step in PURGE_STEPS:
+        while True:
+            if stop is not None and stop.is_set():
+                return False
+            post_ids = step(user_id, db, chunk_size)
+            if on_chunk is not None:
+                on_chunk(db)
+            db.commit()
+            purged_rows.labels(table).inc(len(post_ids))
+            for post_id in set(post_ids):
+                response_cache.invalidate_post(post_id)
+            if len(post_ids) < chunk_size:
+                break
+            time.sleep(config.USER_PURGE_PAUSE_MS / 1000)
+
+    db.execute(
+        delete(User)
+        .where(User.id == user_id, User.deleted_at.isnot(None))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    purged_rows.labels("users").inc()
+    logger.info("Purged deleted user %s", user_id)
+    return True
+
+
+def purge_deleted_users(db: Session, stop: Optional[threading.Event] = None) -> int:
+    """Purge every deleted user, oldest deletion first. Returns how many."""
+    user_ids = db.scalars(
+        select(User.id).where(User.deleted_at.isnot(None)).order_by(User.deleted_at)
+    ).all()
+    purged = 0
+    for user_id in user_ids:
+        if not purge_user(user_id, db, stop=stop):
+            break
+        purged += 1
+    return purged
@@ -0,0 +1,146 @@
+"""Scores behind the "hot" and "top" post feeds.
+
+"top" orders by ``Post.score``, the net vote count SQLite derives from the
+counters. "hot" orders by ``Post.hot_score``, which decays with the age of
+the post::
+
+    hot = score / (age_hours + 2) ** HOT_GRAVITY
+
+and drops to 0 past ``HOT_HORIZON_HOURS``. It is written whenever a vote
+changes the score, and ``redecay_hot_scores`` recomputes it for every post
+inside the horizon so that posts nobody votes on still sink. Between two
+runs a post's hot score is at most one interval staler than its neighbours'.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from src import config
+from src.database import SessionLocal
+from src.models import Post
+from src.utils import logger
+from src.utils.metrics import Counter, Histogram
+
+redecay_runs = Counter("hot_redecay_runs", "Hot score recomputations", ["outcome"])
+redecay_seconds = Histogram(
+    "hot_redecay_duration_seconds",
+    "Time taken to recompute the hot scores",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+
+_posts = Post.__table__
+# Hot scores are ranking data, not content: writing them keeps updated_at
+# as it is so incremental exports do not pick the posts up again.
+_set_hot_score = (
+    update(_posts)
+    .where(_posts.c.id == bindparam("post_id"))
+    .values(hot_score=bindparam("hot"), updated_at=_posts.c.updated_at)
+)
+
+
+def utcnow() -> datetime:
+    # DateTime columns hold naive UTC on SQLite.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def hot_score(score: int, created_at: datetime, now: datetime) -> float:
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    if age_hours >= config.HOT_HORIZON_HOURS:
+        return 0.0
+    return score / (age_hours + 2) ** config.HOT_GRAVITY
+
+
+def set_hot_scores(scores: Dict[int, float], db: Session):
+    """Store hot scores by post id. Does not commit."""
+    if scores:
+        db.execute(
+            _set_hot_score,
+            [{"post_id": post_id, "hot": hot} for post_id, hot in scores.items()],
+        )
+
+
+def refresh_hot_scores(post_ids: Iterable[int], db: Session):
+    """Recompute the hot score of ``post_ids`` from their current score.
+
+    Called after votes are written, in the same transaction. Does not commit.
+    """
+    now = utcnow()
+    rows = db.execute(
+        select(Post.id, Post.score, Post.created_at).where(Post.id.in_(post_ids))
+    )
+    set_hot_scores(
+        {post_id: hot_score(score, created, now) for post_id, score, created in rows},
+        db,
+    )
+
+
+def redecay_hot_scores(db: Session, now: Optional[datetime] = None) -> int:
+    """Recompute every hot score for the passage of time, in one transaction.
+
+    Posts that aged past the horizon since the last run are reset to 0.
+    Returns the number of posts rewritten.
+    """
+    now = now or utcnow()
+    horizon = now - timedelta(hours=config.HOT_HORIZON_HOURS)
+    expired = db.execute(
+        update(_posts)
+        .where(_posts.c.created_at < horizon, _posts.c.hot_score != 0)
+        .values(hot_score=0, updated_at=_posts.c.updated_at)
+    ).rowcount
+    rows = db.execute(
+        select(Post.id, Post.score, Post.created_at).where(Post.created_at >= horizon)
+    ).all()
+    set_hot_scores(
+        {post_id: hot_score(score, created, now) for post_id, score, created in rows},
+        db,
+    )
+    db.commit()
+    logger.debug("Recomputed %s hot scores, reset %s expired ones", len(rows), expired)
+    return len(rows) + expired
+
+
+class HotScoreDecay:
+    """Background thread running ``redecay_hot_scores`` every ``interval_s``."""
+
+    def __init__(self, interval_s: float = config.HOT_REDECAY_INTERVAL_S):
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval_s <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="hot-redecay", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            started = time.perf_counter()
+            db = SessionLocal()
+            try:
+                redecay_hot_scores(db)
+                redecay_runs.labels("ok").inc()
+                redecay_seconds.observe(time.perf_counter() - started)
+            except Exception:
+                db.rollback()
+                redecay_runs.labels("error").inc()
+                logger.exception("Recomputing hot scores failed")
+            finally:
+                db.close()
+
+
+hot_score_decay = HotScoreDecay()
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from src import config
+from src.utils.metrics import Counter, Gauge
+
+# Views of a post that are cached. "post" embeds the author, "votes" does not.
+POST = "post"
+VOTES = "votes"
+
+# Invalidations bump one of these counters; a read-through remembers the
+# counter of its post before querying and only caches if it is unchanged.
+_STRIPES = 1024
+
+cache_hits = Counter(
+    "post_response_cache_hits", "Post reads served from cache", ["view"]
+)
+cache_misses = Counter(
+    "post_response_cache_misses", "Post reads that went to the database", ["view"]
+)
+cache_evictions = Counter(
+    "post_response_cache_evictions", "Cached post responses dropped", ["reason"]
+)
+cache_bytes = Gauge("post_response_cache_bytes", "Bytes of cached response bodies")
+cache_entries = Gauge("post_response_cache_entries", "Cached post responses")
+
+Key = Tuple[str, int]
+
+
+class ResponseCache:
+    """Size-bounded LRU of serialized post responses, keyed by view and post id.
+
+    Bodies are stored as the exact JSON bytes sent to clients, so a hit costs
+    no database access and no serialization. The total size of the bodies is
+    kept under ``max_bytes`` by evicting the least recently used entries, and
+    entries older than ``ttl_s`` are dropped, which bounds how long another
+    worker process can serve a response this one has invalidated.
+
+    Writers call ``invalidate_post`` / ``invalidate_author`` after committing.
+    Readers take a ``token`` before querying and pass it to ``put``, which
+    discards the body if the post was invalidated in between.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = config.RESPONSE_CACHE_MAX_BYTES,
+        ttl_s: float = config.RESPONSE_CACHE_TTL_S,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Key, Tuple[bytes, Optional[int], float]]" = (
+            OrderedDict()
+        )
+        self._keys_by_author: Dict[int, Set[Key]] = {}
+        self._size = 0
+        self._epoch = 0
+        self._stripes = [0] * _STRIPES
+        cache_bytes.set_function(lambda: self._size)
+        cache_entries.set_function(lambda: len(self._entries))
+
+    def token(self, post_id: int) -> Tuple[int, int]:
+        return self._epoch, self._stripes[post_id % _STRIPES]
+
+    def get(self, view: str, post_id: int) -> Optional[bytes]:
+        key = (view, post_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, _, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    cache_hits.labels(view).inc()
+                    return body
+                self._remove(key)
+                cache_evictions.labels("expired").inc()
+        cache_misses.labels(view).inc()
+        return None
+
+    def put(
+        self,
+        view: str,
+        post_id: int,
+        body: bytes,
+        token: Tuple[int, int],
+        author_id: Optional[int] = None,
+    ):
+        """Cache ``body`` unless the post changed since ``token`` was taken.
+
+        ``author_id`` registers the entry for ``invalidate_author``.
+        """
+        if len(body) > self.max_bytes:
+            return
+        key = (view, post_id)
+        with self._lock:
+            if token != self.token(post_id):
+                return
+            self._remove(key)
+            self._entries[key] = (body, author_id, time.monotonic() + self.ttl_s)
+            self._size += len(body)
+            if author_id is not None:
+                self._keys_by_author.setdefault(author_id, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                cache_evictions.labels("size").inc()
+
+    def invalidate_post(self, post_id: int):
+        with self._lock:
+            self._stripes[post_id % _STRIPES] += 1
+            removed = self._remove((POST, post_id)) + self._remove((VOTES, post_id))
+        if removed:
+            cache_evictions.labels("invalidated").inc(removed)
+
+    def invalidate_author(self, author_id: int):
+        """Drop the posts of ``author_id``, whose embedded profile changed."""
+        with self._lock:
+            # Uncached posts of the author may be mid read-through; the epoch
+            # keeps those from being cached with the old profile.
+            self._epoch += 1
+            keys = list(self._keys_by_author.get(author_id, ()))
+            for key in keys:
+                self._remove(key)
+        if keys:
+            cache_evictions.labels("invalidated").inc(len(keys))
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._keys_by_author.clear()
+            self._size = 0
+
+    def _remove(self, key: Key) -> int:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return 0
+        body, author_id, _ = entry
+        self._size -= len(body)
+        keys = self._keys_by_author.get(author_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_author[author_id]
+        return 1
+
+
+response_cache = ResponseCache()
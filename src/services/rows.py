@@ -0,0 +1,60 @@
+"""Row-tuple selects behind the list endpoints.
+
+Pages are read as plain column tuples and turned into dicts shaped like the
+response schemas: loading ORM entities, with their identity map and
+attribute instrumentation, costs more than the query itself on a full page.
+The dicts are validated by the precompiled page adapters of the schemas.
+"""
+
+from src.models import Post, User
+
+POST_ROW_COLUMNS = (
+    Post.id,
+    Post.title,
+    Post.content,
+    Post.created_at,
+    Post.upvote_count,
+    Post.downvote_count,
+    User.id.label("author_id"),
+    User.username,
+    User.first_name,
+    User.last_name,
+)
+
+USER_ROW_COLUMNS = (User.id, User.username, User.email, User.first_name, User.last_name)
+USER_ROW_KEYS = tuple(column.key for column in USER_ROW_COLUMNS)
+
+
+def post_row(row) -> dict:
+    """A ``PostOut``-shaped dict from a row starting with ``POST_ROW_COLUMNS``."""
+    (
+        post_id,
+        title,
+        content,
+        created_at,
+        upvotes,
+        downvotes,
+        author_id,
+        username,
+        first_name,
+        last_name,
+    ) = row[: len(POST_ROW_COLUMNS)]
+    return {
+        "id": post_id,
+        "title": title,
+        "content": content,
+        "created_at": created_at,
+        "upvotes": upvotes,
+        "downvotes": downvotes,
+        "author": {
+            "id": author_id,
+            "username": username,
+            "first_name": first_name,
+            "last_name": last_name,
+        },
+    }
+
+
+def user_row(row) -> dict:
+    """A ``UserOut``-shaped dict from a row starting with ``USER_ROW_COLUMNS``."""
+    return dict(zip(USER_ROW_KEYS, row))
@@ -0,0 +1,196 @@
+import html
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import case, func, literal_column, or_, text, tuple_
+from sqlalchemy.orm import Session
+
+from src.models import Post, User, posts_fts, users_fts
+from src.models.search import POSTS_FTS_DDL, USERS_FTS_DDL
+from src.utils import logger
+from src.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from .rows import POST_ROW_COLUMNS, USER_ROW_COLUMNS, post_row, user_row
+
+SNIPPET_TOKENS = 16
+# FTS5 wraps matches in these control characters, which HTML-escaping leaves
+# alone, so the rest of the snippet can be escaped before they become <mark>.
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+# Shortest query the trigram tokenizer can look up; anything shorter falls
+# back to a LIKE scan of the users table.
+TRIGRAM_MIN_LENGTH = 3
+
+_fts_table = literal_column("posts_fts")
+_bm25 = func.bm25(_fts_table)
+_users_fts_table = literal_column("users_fts")
+
+
+def match_expression(q: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so FTS5 operators in user input are treated as plain
+    text, and the last word matches as a prefix for search-as-you-type.
+    Returns None when the text contains no searchable words.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def snippet_html(snippet: Optional[str]) -> Optional[str]:
+    """Escape a raw FTS5 snippet and mark its matches with ``<mark>``."""
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+
+def matching_post_ids(match: str):
+    """Subquery of post ids whose title or content matches ``match``."""
+    return (
+        posts_fts.select()
+        .with_only_columns(posts_fts.c.rowid)
+        .where(_fts_table.op("MATCH")(match))
+    )
+
+
+def search_posts(
+    q: str,
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """BM25-ranked full-text search over post titles and content.
+
+    Pages are keyed on ``(score, id)`` so the cursor stays valid while the
+    ranking is stable.
+    """
+    logger.debug("Full-text searching posts for '%s'", q)
+    match = match_expression(q)
+    if match is None:
+        return [], None
+
+    snippet = func.snippet(
+        _fts_table, -1, _MATCH_START, _MATCH_END, "…", SNIPPET_TOKENS
+    )
+    search = (
+        db.query(*POST_ROW_COLUMNS, _bm25.label("score"), snippet.label("snippet"))
+        .select_from(Post)
+        .join(posts_fts, posts_fts.c.rowid == Post.id)
+        .join(User, User.id == Post.author_id)
+        .filter(_fts_table.op("MATCH")(match), User.deleted_at.is_(None))
+    )
+
+    after = decode_cursor(cursor, float, int)
+    if after:
+        search = search.filter(tuple_(_bm25, Post.id) > after)
+
+    rows = search.order_by(_bm25, Post.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+
+    hits = [
+        {**post_row(row), "score": row.score, "snippet": snippet_html(row.snippet)}
+        for row in rows
+    ]
+    return hits, next_cursor
+
+
+def rebuild_post_index(db: Session) -> int:
+    """(Re)create the posts full-text index and repopulate it from posts.
+
+    Safe to run on a database created before the index existed: the virtual
+    table and its sync triggers are created if missing.
+    """
+    logger.info("Rebuilding the posts full-text index")
+    for statement in POSTS_FTS_DDL:
+        db.execute(text(statement))
+    db.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+    db.commit()
+    indexed = db.query(func.count(Post.id)).scalar()
+    logger.info("Posts full-text index rebuilt over %s posts", indexed)
+    return indexed
+
+
+def search_users(
+    q: str,
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Case-insensitive substring search over username, email and names.
+
+    Queries of three or more characters go through the trigram index; shorter
+    ones cannot, and scan the users table with LIKE over the same columns
+    instead. Exact username hits rank first, then username prefixes, then
+    everything else, each tier in id order. Pages are keyed on ``(tier, id)``.
+    """
+    logger.debug("Indexed search of users for '%s'", q)
+    needle = q.lower()
+    username = func.lower(User.username)
+
+    search = db.query(*USER_ROW_COLUMNS).filter(User.deleted_at.is_(None))
+    if len(needle) >= TRIGRAM_MIN_LENGTH:
+        phrase = '"' + needle.replace('"', '""') + '"'
+        search = search.filter(
+            User.id.in_(
+                users_fts.select()
+                .with_only_columns(users_fts.c.rowid)
+                .where(_users_fts_table.op("MATCH")(phrase))
+            )
+        )
+    else:
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", needle) + "%"
+        search = search.filter(
+            or_(
+                *(
+                    column.ilike(pattern, escape="\\")
+                    for column in (
+                        User.username,
+                        User.email,
+                        User.first_name,
+                        User.last_name,
+                    )
+                )
+            )
+        )
+
+    tier = case(
+        (username == needle, 0),
+        (func.substr(username, 1, len(needle)) == needle, 1),
+        else_=2,
+    )
+
+    after = decode_cursor(cursor, int, int)
+    if after:
+        search = search.filter(tuple_(tier, User.id) > after)
+
+    rows = (
+        search.add_columns(tier.label("tier"))
+        .order_by(tier, User.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].tier, rows[-1].id)
+    return [user_row(row) for row in rows], next_cursor
+
+
+def rebuild_user_index(db: Session) -> int:
+    """(Re)create the users trigram index and repopulate it from users."""
+    logger.info("Rebuilding the users search index")
+    for statement in USERS_FTS_DDL:
+        db.execute(text(statement))
+    db.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+    db.commit()
+    indexed = db.query(func.count(User.id)).scalar()
+    logger.info("Users search index rebuilt over %s users", indexed)
+    return indexed
@@ -1,70 +1,148 @@
+from typing import List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
 
 from src.database import get_db
 from src.models import User
 from src.schemas import UserSchemas
 from src.utils import logger
-from . import AuthServices
+from src.utils.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from . import AuthServices, JobServices, RankingServices
+from .response_cache import response_cache
+from .rows import USER_ROW_COLUMNS, user_row
 
 
 def get_user_by_email(email: str, db: Session) -> User:
-    logger.debug(f"Fetching user by email: {email}")
+    logger.debug("Fetching user by email: %s", email)
     return db.query(User).filter(User.email == email).first()
 
 
 def get_user_by_username(username: str, db: Session) -> User:
-    logger.debug(f"Fetching user by username: {username}")
+    logger.debug("Fetching user by username: %s", username)
     return db.query(User).filter(User.username == username).first()
 
 
-def get_user_by_id(id: int, db: Session) -> User:
-    logger.debug(f"Fetching user by id: {id}")
-    return db.query(User).filter(User.id == id).first()
+def get_active_user_by_username(username: str, db: Session) -> Optional[User]:
+    """The user called ``username`` unless their account was deleted."""
+    logger.debug("Fetching active user by username: %s", username)
+    return (
+        db.query(User)
+        .filter(User.username == username, User.deleted_at.is_(None))
+        .first()
+    )
 
 
-def get_all_users(db: Session) -> list[User]:
-    logger.debug("Fetching all users")
-    return db.query(User).all()
+def get_user_by_id(id: int, db: Session) -> Optional[User]:
+    """The user with ``id`` unless their account was deleted."""
+    logger.debug("Fetching user by id: %s", id)
+    return db.query(User).filter(User.id == id, User.deleted_at.is_(None)).first()
 
 
-def query_users(q: str, db: Session) -> list[User]:
-    logger.debug(f"Querying users with search term: {q}")
-    return (
-        db.query(User)
-        .filter(
-            or_(
-                User.username.ilike(f"%{q}%"),
-                User.email.ilike(f"%{q}%"),
-                User.first_name.ilike(f"%{q}%"),
-                User.last_name.ilike(f"%{q}%"),
-            )
-        )
-        .all()
+def paginate_users(
+    q: Query, limit: int, cursor: Optional[str]
+) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of ``q`` in id order and the cursor of the next one.
+
+    Users come back as ``UserOut``-shaped dicts (see ``rows``).
+    """
+    after = decode_cursor(cursor, int)
+    if after:
+        q = q.filter(User.id > after[0])
+
+    rows = q.with_entities(*USER_ROW_COLUMNS).order_by(User.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return [user_row(row) for row in rows], next_cursor
+
+
+def get_all_users(
+    db: Session, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    logger.debug("Fetching a page of users")
+    return paginate_users(
+        db.query(User).filter(User.deleted_at.is_(None)), limit, cursor
+    )
+
+
+def query_users(
+    q: str,
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Unindexed substring search. Kept as the fallback to the search index."""
+    logger.debug("Querying users with search term: %s", q)
+    search = db.query(User).filter(
+        or_(
+            User.username.ilike(f"%{q}%"),
+            User.email.ilike(f"%{q}%"),
+            User.first_name.ilike(f"%{q}%"),
+            User.last_name.ilike(f"%{q}%"),
+        ),
+        User.deleted_at.is_(None),
     )
+    return paginate_users(search, limit, cursor)
 
 
 def delete_user_by_id(user_id: int, db: Session):
-    logger.info(f"Deleting user with id: {user_id}")
-    user = db.query(User).filter(User.id == user_id).first()
+    """Delete the account of ``user_id``.
+
+    Only marks the user as deleted, which hides them at once and takes one
+    indexed update however much they posted, and queues a job that purges
+    their votes, posts and row in the background (see ``purge``). The job id
+    is only logged: the user, the only one allowed to delete the account,
+    can no longer sign in to follow it.
+    """
+    logger.info("Deleting user with id: %s", user_id)
+    deleted = (
+        db.query(User)
+        .filter(User.id == user_id, User.deleted_at.is_(None))
+        .update({User.deleted_at: RankingServices.utcnow()}, synchronize_session=False)
+    )
 
-    if not user:
-        logger.warning(f"Delete failed: User with id {user_id} not found")
+    if not deleted:
+        db.rollback()
+        logger.warning("Delete failed: User with id %s not found", user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    db.delete(user)
+    job_id = JobServices.enqueue(
+        "purge_user",
+        db,
+        payload={"user_id": user_id},
+        idempotency_key=f"purge_user:{user_id}",
+    )
     db.commit()
-    logger.info(f"User with id {user_id} successfully deleted")
+    AuthServices.evict_principal(user_id)
+    # Their posts are hidden from now on, cached or not.
+    response_cache.invalidate_author(user_id)
+    JobServices.job_runner.notify()
+    logger.info("User with id %s marked as deleted, purge job %s", user_id, job_id)
 
 
-def create_user(user: UserSchemas.UserCreateRequest, db: Session):
+def create_user(
+    user: UserSchemas.UserCreateRequest,
+    db: Session,
+    hashed_password: Optional[str] = None,
+):
+    """Insert a new user.
+
+    ``hashed_password`` lets callers that must not block (the async services)
+    hash the password elsewhere first. Either way bcrypt runs before ``db``,
+    the writer session, takes its connection. The uniqueness checks are
+    left to the caller's read session; a registration that loses a race for
+    the same name or email still gets a 400 from the unique constraints.
+    """
     logger.info(
-        f"Creating new user with username: {user.username}, email: {user.email}"
+        "Creating new user with username: %s, email: %s", user.username, user.email
     )
-    hashed_pw = AuthServices.hash_password(user.password)
+    hashed_pw = hashed_password or AuthServices.hash_password(user.password)
     new_user = User(
         email=user.email,
         first_name=user.first_name,
@@ -73,45 +151,72 @@ def create_user(user: UserSchemas.UserCreateRequest, db: Session):
         hashed_password=hashed_pw,
     )
     db.add(new_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.warning("Username or email taken: '%s'", user.username)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already taken.",
+        )
     db.refresh(new_user)
-    logger.info(f"User created with id: {new_user.id}")
+    logger.info("User created with id: %s", new_user.id)
     return new_user
 
 
 def update_user_info(
-    user_new_data: UserSchemas.UserEditRequest, user_id: int, db: Session
+    user_new_data: UserSchemas.UserEditRequest,
+    user_id: int,
+    db: Session,
+    hashed_password: Optional[str] = None,
 ):
-    logger.info(f"Updating user info for user id: {user_id}")
-    user = db.query(User).filter(User.id == user_id).first()
+    logger.info("Updating user info for user id: %s", user_id)
+    if user_new_data.password is not None and hashed_password is None:
+        # Hashed before the first query, so the writer connection is not
+        # held for the whole of bcrypt.
+        hashed_password = AuthServices.hash_password(user_new_data.password)
+    user = get_user_by_id(user_id, db)
 
     if not user:
-        logger.warning(f"Update failed: User with id {user_id} not found")
+        logger.warning("Update failed: User with id %s not found", user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
     if user_new_data.username is not None:
-        logger.debug(f"Updating username to: {user_new_data.username}")
+        logger.debug("Updating username to: %s", user_new_data.username)
         user.username = user_new_data.username
 
     if user_new_data.email is not None:
-        logger.debug(f"Updating email to: {user_new_data.email}")
+        logger.debug("Updating email to: %s", user_new_data.email)
         user.email = user_new_data.email
 
     if user_new_data.first_name is not None:
-        logger.debug(f"Updating first name to: {user_new_data.first_name}")
+        logger.debug("Updating first name to: %s", user_new_data.first_name)
         user.first_name = user_new_data.first_name
 
     if user_new_data.last_name is not None:
-        logger.debug(f"Updating last name to: {user_new_data.last_name}")
+        logger.debug("Updating last name to: %s", user_new_data.last_name)
         user.last_name = user_new_data.last_name
 
     if user_new_data.password is not None:
-        logger.debug(f"Updating password for user id: {user_id}")
-        user.hashed_password = AuthServices.hash_password(user_new_data.password)
+        logger.debug("Updating password for user id: %s", user_id)
+        user.hashed_password = hashed_password
 
     db.commit()
+    AuthServices.evict_principal(user_id)
+    # PostOut embeds the author's profile.
+    response_cache.invalidate_author(user_id)
     db.refresh(user)
-    logger.info(f"User info updated successfully for user id: {user_id}")
+    logger.info("User info updated successfully for user id: %s", user_id)
     return user
+
+
+def update_password_hash(user_id: int, hashed_password: str, db: Session):
+    """Store a password rehashed at the current bcrypt cost."""
+    logger.info("Upgrading password hash for user id: %s", user_id)
+    db.query(User).filter(User.id == user_id).update(
+        {User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from src import config
+from src.database import SessionLocal
+from src.models.votes import VoteType
+from src.utils import logger
+from . import RankingServices, VoteServices
+from .response_cache import response_cache
+
+
+class VoteBuffer:
+    """Write-behind queue that group-commits votes.
+
+    Votes are collected in memory and written by a background thread in one
+    transaction per batch: as soon as ``max_batch`` distinct votes are
+    waiting, or ``max_delay_ms`` after the first vote of a batch arrived.
+    Within a batch only the latest vote of each (user, post) pair is written
+    (last write wins), and every submitter of that pair is resolved when the
+    batch commits.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_batch: int = config.VOTE_BATCH_MAX_SIZE,
+        max_delay_ms: float = config.VOTE_FLUSH_INTERVAL_MS,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._cond = threading.Condition()
+        self._pending: Dict[Tuple[int, int], Tuple[VoteType, List[Future]]] = {}
+        self._thread = None
+        self._closed = False
+
+    def submit(self, user_id: int, post_id: int, vote_type: VoteType) -> Future:
+        """Queue a vote. The future resolves once its batch is committed."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Vote buffer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="vote-buffer", daemon=True
+                )
+                self._thread.start()
+
+            key = (user_id, post_id)
+            _, waiters = self._pending.get(key, (None, []))
+            waiters.append(future)
+            self._pending[key] = (vote_type, waiters)
+            self._cond.notify()
+        return future
+
+    def close(self):
+        """Flush whatever is queued and stop the background thread.
+
+        A later ``submit`` starts a fresh thread.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            self._thread = None
+            self._closed = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+
+                # Group-commit window: let concurrent voters join this batch.
+                deadline = time.monotonic() + self.max_delay
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch, self._pending = self._pending, {}
+
+            self._write(batch)
+
+    def _write(self, batch: Dict[Tuple[int, int], Tuple[VoteType, List[Future]]]):
+        rows = [
+            {"user_id": user_id, "post_id": post_id, "vote_type": vote_type}
+            for (user_id, post_id), (vote_type, _) in batch.items()
+        ]
+        post_ids = {post_id for _, post_id in batch}
+        db = self.session_factory()
+        try:
+            try:
+                VoteServices.upsert_votes(rows, db)
+                RankingServices.refresh_hot_scores(post_ids, db)
+                db.commit()
+                logger.debug("Flushed a batch of %s votes", len(rows))
+                failures = {}
+            except Exception as e:
+                db.rollback()
+                logger.warning(
+                    "Vote batch of %s failed (%s), retrying one by one", len(rows), e
+                )
+                # The hot scores of these posts catch up at the next re-decay.
+                failures = self._write_one_by_one(rows, db)
+        finally:
+            db.close()
+
+        for post_id in post_ids:
+            response_cache.invalidate_post(post_id)
+
+        for row, (_, waiters) in zip(rows, batch.values()):
+            error = failures.get((row["user_id"], row["post_id"]))
+            for future in waiters:
+                if future.cancelled():
+                    # The caller stopped waiting; the vote is written regardless.
+                    continue
+                if error is None:
+                    future.set_result(True)
+                else:
+                    future.set_exception(error)
+
+    def _write_one_by_one(self, rows: List[dict], db: Session) -> dict:
+        """Isolate the votes that broke a batch; returns their errors by key."""
+        failures = {}
+        for row in rows:
+            try:
+                VoteServices.upsert_votes([row], db)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                failures[(row["user_id"], row["post_id"])] = e
+        return failures
+
+
+vote_buffer = VoteBuffer()
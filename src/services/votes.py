@@ -0,0 +1,24 @@
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from src.database import SQLITE_NOW
+from src.models import Vote
+
+
+def upsert_votes(votes: Iterable[dict], db: Session):
+    """Insert or flip votes in one statement, keyed on ``unique_vote``.
+
+    Each item holds ``user_id``, ``post_id`` and ``vote_type``. A repeat of
+    the stored vote is left untouched so the counter triggers do not fire
+    for it. Returns the id of every inserted or flipped vote. Does not commit.
+    """
+    stmt = insert(Vote).values(list(votes))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Vote.user_id, Vote.post_id],
+        set_={"vote_type": stmt.excluded.vote_type, "updated_at": text(SQLITE_NOW)},
+        where=Vote.vote_type != stmt.excluded.vote_type,
+    ).returning(Vote.id)
+    return db.execute(stmt)
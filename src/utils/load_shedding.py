@@ -0,0 +1,278 @@
+"""Adaptive concurrency limits and load shedding as a plain ASGI middleware.
+
+Every request belongs to a route class (see ``route_class``), and each class
+admits at most ``limit`` requests at a time. Requests over the limit wait in
+a bounded FIFO queue; when the queue is full, or a request has waited
+``queue_timeout_s``, it is answered at once with a 503 and ``Retry-After``
+instead of piling onto the threadpool and the SQLite writer.
+
+The limits adapt to the latency they produce (AIMD): a class that answers
+within its target while using its whole limit gets one more slot per
+``limit`` requests; a response slower than the target, or a 503 from further
+in (such as a full password hashing pool), cuts the limit by 10%, at most
+once per target interval. Latency is measured to the start of the response,
+so long streamed exports do not count as slow.
+
+``POST /users/login`` is also rate limited per client IP with a token
+bucket, so that one client cannot use up the bcrypt capacity.
+
+All state lives on the event loop, which is the only place it is touched.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from src import config
+from src.utils.metrics import Counter, Gauge, Histogram
+
+AUTH_PATHS = frozenset({"/users/login", "/users/register"})
+# Still answered when the app is overloaded.
+EXEMPT_PATHS = frozenset({"/metrics"})
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+LOGIN_PATH = "/users/login"
+
+# Share of the limit kept when latency goes over the target.
+DECREASE_FACTOR = 0.9
+
+shed_requests = Counter(
+    "load_shed_requests",
+    "Requests turned away before reaching their route",
+    ["route_class", "reason"],
+)
+queue_wait_seconds = Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    ["route_class"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+concurrency_limit = Gauge(
+    "concurrency_limit", "Current concurrency limit", ["route_class"]
+)
+concurrency_in_flight = Gauge(
+    "concurrency_in_flight", "Requests holding a concurrency slot", ["route_class"]
+)
+concurrency_queued = Gauge(
+    "concurrency_queued", "Requests waiting for a concurrency slot", ["route_class"]
+)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The class whose limit ``method`` ``path`` counts against, or None."""
+    path = path.rstrip("/") or "/"
+    if path in EXEMPT_PATHS:
+        return None
+    if method == "POST" and path in AUTH_PATHS:
+        return "auth"
+    return "read" if method in READ_METHODS else "write"
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adjusted by AIMD, with a bounded queue in front."""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        target_latency_s: float,
+        min_limit: int = config.CONCURRENCY_MIN_LIMIT,
+        max_limit: int = config.CONCURRENCY_MAX_LIMIT,
+        max_queue: int = config.CONCURRENCY_QUEUE_SIZE,
+        queue_timeout_s: float = config.CONCURRENCY_QUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.name = name
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.target_latency_s = target_latency_s
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+
+        concurrency_limit.labels(name).set_function(lambda: int(self.limit))
+        concurrency_in_flight.labels(name).set_function(lambda: self.in_flight)
+        concurrency_queued.labels(name).set_function(lambda: len(self._waiters))
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot, waiting in the queue if need be.
+
+        Returns None once the slot is held, or why the request is shed.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout_s)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended.
+                if isinstance(exc, asyncio.TimeoutError):
+                    return None
+                self.release()
+                raise
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            if isinstance(exc, asyncio.TimeoutError):
+                return "queue_timeout"
+            raise
+        queue_wait_seconds.labels(self.name).observe(time.perf_counter() - started)
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+        self._hand_over()
+
+    def observe(self, latency_s: float, overloaded: bool = False):
+        """Adapt the limit to the latency of a request that held a slot."""
+        if overloaded or latency_s > self.target_latency_s:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency_s:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+        elif self.in_flight >= int(self.limit):
+            # Only grow while the limit is what holds requests back.
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._hand_over()
+
+    def _hand_over(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class TokenBuckets:
+    """Token buckets by key, forgetting the least recently seen past ``max_keys``."""
+
+    def __init__(self, max_keys: int = config.LOGIN_RATE_LIMIT_MAX_CLIENTS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def take(self, key: str, per_second: float, burst: int) -> float:
+        """Take a token from ``key``'s bucket.
+
+        Returns 0 when there was one, else the seconds until there will be.
+        """
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / per_second
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+
+def default_limiters() -> Dict[str, AdaptiveLimiter]:
+    return {
+        "auth": AdaptiveLimiter(
+            "auth",
+            config.CONCURRENCY_AUTH_LIMIT,
+            config.CONCURRENCY_AUTH_TARGET_MS / 1000,
+        ),
+        "write": AdaptiveLimiter(
+            "write",
+            config.CONCURRENCY_WRITE_LIMIT,
+            config.CONCURRENCY_WRITE_TARGET_MS / 1000,
+        ),
+        "read": AdaptiveLimiter(
+            "read",
+            config.CONCURRENCY_READ_LIMIT,
+            config.CONCURRENCY_READ_TARGET_MS / 1000,
+        ),
+    }
+
+
+login_buckets = TokenBuckets()
+
+
+class LoadSheddingMiddleware:
+    def __init__(
+        self,
+        app,
+        limiters: Optional[Dict[str, AdaptiveLimiter]] = None,
+        buckets: Optional[TokenBuckets] = None,
+    ):
+        self.app = app
+        self.limiters = limiters if limiters is not None else default_limiters()
+        self.buckets = buckets if buckets is not None else login_buckets
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if name == "auth" and scope["path"].rstrip("/") == LOGIN_PATH:
+            wait = self._rate_limit(scope)
+            if wait:
+                shed_requests.labels(name, "rate_limited").inc()
+                await JSONResponse(
+                    {"detail": "Too many login attempts, retry later"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )(scope, receive, send)
+                return
+
+        reason = await limiter.acquire()
+        if reason is not None:
+            shed_requests.labels(name, reason).inc()
+            await JSONResponse(
+                {"detail": "Server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(config.LOAD_SHED_RETRY_AFTER_S)},
+            )(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        observed = False
+
+        async def send_observed(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                limiter.observe(
+                    time.perf_counter() - started, overloaded=message["status"] == 503
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_observed)
+        finally:
+            limiter.release()
+
+    def _rate_limit(self, scope) -> float:
+        per_minute = config.LOGIN_RATE_LIMIT_PER_MINUTE
+        if per_minute <= 0:
+            return 0.0
+        client = scope.get("client")
+        address = client[0] if client else "unknown"
+        return self.buckets.take(
+            address, per_minute / 60, max(config.LOGIN_RATE_LIMIT_BURST, 1)
+        )
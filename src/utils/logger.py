@@ -1,31 +1,129 @@
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
 
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
+from src import config
 
 logger = logging.getLogger("yaballe_app")
-logger.setLevel(logging.INFO)
+logger.setLevel(config.LOG_LEVEL)
+
+# High-volume INFO messages of the read endpoints go through this child so
+# they can be sampled on their own (see LOG_SAMPLE_RATES).
+read_logger = logger.getChild("reads")
+# Statements slower than DB_SLOW_QUERY_MS (see src/utils/query_profiler.py).
+slow_query_logger = logger.getChild("slow_queries")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a share of the INFO-and-below records of selected loggers.
+
+    ``rates`` maps logger names to the fraction of records to keep; warnings
+    and errors always pass.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self.rates.get(record.name)
+        return rate is None or random.random() < rate
+
+
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """Creates the log directory and file on the first record, not on import."""
+
+    def __init__(self, filename: str, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener's handlers.
+
+    ``QueueHandler.prepare`` runs the formatter (timestamp, JSON, traceback)
+    on the logging thread. Here only the message is merged with its
+    arguments, so that later changes to them cannot alter it; the records
+    stay in this process, so the rest can wait for the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_sample_rates(spec: str) -> dict:
+    """Parse ``"name=rate,name=rate"`` into a dict."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+# --- Formatter ---
+if config.LOG_FORMAT == "json":
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s")
 
 # --- Console Handler ---
 console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
+console_handler.setFormatter(formatter)
 
 # --- File Handler (optional) ---
-file_handler = RotatingFileHandler(
-    filename=os.path.join(LOG_DIR, "app.log"),
+# Off when several processes would write, and rotate, the same file (see
+# LOG_TO_FILE); they then log to the console only.
+file_handler = LazyRotatingFileHandler(
+    filename=os.path.join(config.LOG_DIR, "app.log"),
     maxBytes=1_000_000,  # 1MB per file
     backupCount=3,
 )
-file_handler.setLevel(logging.INFO)
-
-# --- Formatter ---
-formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(message)s")
-console_handler.setFormatter(formatter)
 file_handler.setFormatter(formatter)
 
+# --- Queue pipeline ---
+# Request threads only merge the message and enqueue the record; formatting,
+# writes and rotation happen on the listener's background thread.
+log_queue = queue.SimpleQueue()
+queue_handler = DeferredQueueHandler(log_queue)
+queue_handler.addFilter(SamplingFilter(parse_sample_rates(config.LOG_SAMPLE_RATES)))
+handlers = [console_handler, file_handler] if config.LOG_TO_FILE else [console_handler]
+listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
 # --- Add Handlers ---
 if not logger.hasHandlers():
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(queue_handler)
+    listener.start()
+    # Drain what is still queued when the interpreter exits.
+    atexit.register(listener.stop)
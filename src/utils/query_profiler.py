@@ -0,0 +1,211 @@
+"""Per-request SQL profile: statements issued, database time and rows fetched.
+
+``instrument(engine)`` hooks the cursor events of an engine. While a request
+runs under ``QueryProfilerMiddleware``, every statement it issues is counted
+in the request's ``QueryProfile``, which lives in a context variable and so
+follows the request onto the threadpool and into the async session's
+greenlets. The totals are sent back in a ``Server-Timing`` header, which
+browsers show next to the request timing.
+
+Statements slower than DB_SLOW_QUERY_MS are logged whether or not a request
+is being profiled.
+
+``forbid_repeated_statements`` fails a test when one statement shape runs
+more than ``max_repeats`` times within a request: the signature of an N+1
+lazy load.
+"""
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+from src import config
+from src.utils.logger import slow_query_logger
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists, "(?, ?, ?)", differ in length from one call to the next.
+_PLACEHOLDER_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def statement_shape(statement: str) -> str:
+    """``statement`` with its whitespace collapsed and IN lists folded."""
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryProfile:
+    """What the statements of one request cost."""
+
+    __slots__ = ("statements", "seconds", "rows", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, max_repeats: int) -> Dict[str, int]:
+        """Statement shapes that ran more than ``max_repeats`` times."""
+        return {shape: n for shape, n in self.shapes.items() if n > max_repeats}
+
+    def server_timing(self) -> str:
+        return (
+            f"db;dur={self.seconds * 1000:.3f};"
+            f'desc="{self.statements} statements, {self.rows} rows"'
+        )
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar(
+    "query_profile", default=None
+)
+
+# Called with the profile of every request that finishes; see
+# forbid_repeated_statements.
+_watchers: List[Callable[[QueryProfile], None]] = []
+
+
+class _RowCountingCursor:
+    """DBAPI cursor proxy counting the rows a result fetches through it."""
+
+    __slots__ = ("_cursor", "_profile")
+
+    def __init__(self, cursor, profile: QueryProfile):
+        self._cursor = cursor
+        self._profile = profile
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._profile.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._profile.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._profile.rows += len(rows)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, which goes away with the statement whether
+    # or not it raises: a statement that fails never reaches the after hook.
+    # The few run without a context overwrite a single slot on the connection.
+    started = time.perf_counter()
+    if context is not None:
+        context.query_started = started
+    else:
+        conn.info["query_started"] = started
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        started = context.query_started
+    else:
+        started = conn.info.pop("query_started")
+    elapsed = time.perf_counter() - started
+
+    profile = current_profile.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+        if context is not None and cursor.description is not None:
+            # The result is built from the context's cursor right after this
+            # event, so its fetches go through the proxy.
+            context.cursor = _RowCountingCursor(cursor, profile)
+
+    if config.DB_SLOW_QUERY_MS and elapsed * 1000 >= config.DB_SLOW_QUERY_MS:
+        # The shape only: parameters can hold personal data.
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s", elapsed * 1000, statement_shape(statement)
+        )
+
+
+def instrument(engine):
+    """Time every statement ``engine`` runs and count it in the request's profile."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class QueryProfilerMiddleware:
+    """Profiles each HTTP request and reports it in a ``Server-Timing`` header.
+
+    The header is sent with the response head, so the statements of a
+    streamed body (the exports) are not part of it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = current_profile.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            for watcher in tuple(_watchers):
+                watcher(profile)
+
+
+@contextmanager
+def forbid_repeated_statements(max_repeats: int = 1):
+    """Fail when a statement shape runs more than ``max_repeats`` times in a request.
+
+    Covers the requests that finish inside the block, and the statements run
+    directly in it (outside any request), which count as one more request.
+    """
+    offenders: List[Dict[str, int]] = []
+
+    def check(profile: QueryProfile):
+        repeated = profile.repeated(max_repeats)
+        if repeated:
+            offenders.append(repeated)
+
+    profile = QueryProfile()
+    token = current_profile.set(profile)
+    _watchers.append(check)
+    try:
+        yield profile
+    finally:
+        _watchers.remove(check)
+        current_profile.reset(token)
+    check(profile)
+
+    if offenders:
+        lines = [
+            f"  {count}x {shape}"
+            for repeated in offenders
+            for shape, count in repeated.items()
+        ]
+        raise AssertionError(
+            f"statements repeated more than {max_repeats} time(s) in one request "
+            "(N+1 query?):\n" + "\n".join(lines)
+        )
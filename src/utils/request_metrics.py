@@ -0,0 +1,101 @@
+"""Per-route request metrics as a plain ASGI middleware.
+
+Requests are labelled by route template (``/posts/{post_id}``), never by raw
+path, so the number of series stays bounded. Paths that match no route share
+the ``unmatched`` label.
+"""
+
+import time
+
+import anyio.to_thread
+
+from src.utils.metrics import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+requests_total = Counter(
+    "http_requests", "HTTP requests served", ["method", "route", "status"]
+)
+request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending its last byte",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+threadpool_size = Gauge(
+    "threadpool_tokens", "Worker threads available to sync endpoints"
+)
+threadpool_busy = Gauge("threadpool_busy", "Worker threads running sync endpoints")
+threadpool_queue_depth = Gauge(
+    "threadpool_queue_depth", "Sync endpoint calls waiting for a worker thread"
+)
+
+
+def _thread_limiter_statistics():
+    # The limiter belongs to the running event loop; the gauges are read from
+    # the /metrics endpoint, which runs on it.
+    try:
+        return anyio.to_thread.current_default_thread_limiter().statistics()
+    except Exception:
+        return None
+
+
+def _limiter_gauge(field):
+    def read():
+        statistics = _thread_limiter_statistics()
+        return getattr(statistics, field) if statistics else 0
+
+    return read
+
+
+threadpool_size.set_function(_limiter_gauge("total_tokens"))
+threadpool_busy.set_function(_limiter_gauge("borrowed_tokens"))
+threadpool_queue_depth.set_function(_limiter_gauge("tasks_waiting"))
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            # The router stores the matched route in the scope.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_seconds.labels(method, template).observe(
+                time.perf_counter() - started
+            )
+            requests_total.labels(method, template, status_code).inc()
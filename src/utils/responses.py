@@ -0,0 +1,29 @@
+from typing import Any, Optional
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from starlette.responses import Response
+
+
+class PydanticJSONResponse(Response):
+    """JSON response rendered by pydantic-core, in the manner of ORJSONResponse.
+
+    With an ``adapter`` the content is validated and dumped by that
+    precompiled ``TypeAdapter`` in one native pass, which is what FastAPI
+    does for a ``response_model`` minus the per-request field lookups.
+    Without one, any value pydantic-core can encode is dumped as is.
+
+    Routes keep ``response_model`` for the OpenAPI schema; returning a
+    response instance bypasses FastAPI's own serialization.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: Optional[TypeAdapter] = None, **kwargs):
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.adapter is None:
+            return to_json(content)
+        return self.adapter.dump_json(self.adapter.validate_python(content))
@@ -1,16 +1,30 @@
+import os
+
+# The profiler is off by default; the tests read its Server-Timing header and
+# check statement counts through it. src.main adds it at import.
+os.environ["DB_PROFILE"] = "1"
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from src.database import Base, get_db
+from src.database import Base, enforce_foreign_keys, get_db, get_read_db
 from fastapi.testclient import TestClient
+from src import config
 from src.main import app
+from src.services.principal_cache import principal_cache
+from src.services.response_cache import response_cache
+from src.utils.query_profiler import forbid_repeated_statements, instrument
 
 # Use an in-memory SQLite database for testing
 TEST_DATABASE_URL = (
     "sqlite:///./test.db"  # or use ":memory:" but beware of connection scoping
 )
 
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = instrument(
+    enforce_foreign_keys(
+        create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+    )
+)
 TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -24,6 +38,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -35,6 +50,59 @@ def setup_database():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Tables are recreated between modules, so user and post ids (and the
+    # tokens that carry them) repeat; start each test with empty caches.
+    principal_cache.clear()
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_login_rate_limit(monkeypatch):
+    # Every test logs in from the same test client address.
+    monkeypatch.setattr(config, "LOGIN_RATE_LIMIT_PER_MINUTE", 0)
+
+
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+@pytest.fixture
+def app_on_test_engine(monkeypatch):
+    # Other test modules install their own session overrides at import time;
+    # pin the ones of this engine for tests that watch its statements.
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, override_get_db)
+
+
+@pytest.fixture
+def no_repeated_statements(app_on_test_engine):
+    """Fail the test if a request runs the same statement shape twice (N+1)."""
+    with forbid_repeated_statements(max_repeats=1):
+        yield
+
+
+def register(client, username):
+    """Register ``username`` and return the headers that authenticate as them."""
+    client.post(
+        "/users/register",
+        json={
+            "username": username,
+            "email": f"{username}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+            "password": "secret123",
+        },
+    )
+    token = client.post(
+        "/users/login", json={"username": username, "password": "secret123"}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def create_post(client, headers, title):
+    return client.post(
+        "/posts/", json={"title": title, "content": "Test content"}, headers=headers
+    ).json()["id"]
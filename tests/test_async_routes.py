@@ -0,0 +1,118 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import enforce_foreign_keys, get_async_db, get_async_read_db
+from src.routes import AsyncPostRoutes, AsyncUserRoutes
+
+# Same file as the sync tests, through aiosqlite
+ASYNC_TEST_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+async_engine = create_async_engine(ASYNC_TEST_DATABASE_URL)
+enforce_foreign_keys(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+
+async_app = FastAPI()
+async_app.include_router(AsyncUserRoutes)
+async_app.include_router(AsyncPostRoutes)
+async_app.dependency_overrides[get_async_db] = override_get_async_db
+async_app.dependency_overrides[get_async_read_db] = override_get_async_db
+
+
+@pytest.fixture(scope="module")
+def async_client():
+    with TestClient(async_app) as client:
+        yield client
+
+
+def test_async_user_and_post_flow(async_client):
+    register = async_client.post(
+        "/users/register",
+        json={
+            "username": "asyncuser",
+            "email": "asyncuser@example.com",
+            "first_name": "Async",
+            "last_name": "User",
+            "password": "secret123",
+        },
+    )
+    assert register.status_code == 200
+
+    login = async_client.post(
+        "/users/login", json={"username": "asyncuser", "password": "secret123"}
+    )
+    assert login.status_code == 200
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    me = async_client.get("/users/me", headers=headers)
+    assert me.json()["username"] == "asyncuser"
+
+    created = async_client.post(
+        "/posts/",
+        json={"title": "Async Post", "content": "Served on the event loop"},
+        headers=headers,
+    )
+    assert created.status_code == 200
+    post = created.json()
+    assert post["author"]["username"] == "asyncuser"
+
+    voted = async_client.post(
+        f"/posts/{post['id']}/vote", json={"vote": "upvote"}, headers=headers
+    )
+    assert voted.json()["upvotes"] == 1
+
+    edited = async_client.put(
+        f"/posts/{post['id']}",
+        json={"title": "Async Post Edited", "content": "Still async"},
+        headers=headers,
+    )
+    assert edited.json()["title"] == "Async Post Edited"
+
+    page = async_client.get("/posts/", params={"limit": 1}).json()
+    assert len(page["items"]) == 1
+
+    found = async_client.get("/posts/search", params={"q": "edited"}).json()
+    assert [p["id"] for p in found["items"]] == [post["id"]]
+
+    mine = async_client.get(f"/users/{me.json()['id']}/posts").json()
+    assert [p["id"] for p in mine["items"]] == [post["id"]]
+
+    deleted = async_client.delete(f"/posts/{post['id']}", headers=headers)
+    assert deleted.status_code == 204
+    assert async_client.get(f"/posts/{post['id']}").status_code == 404
+
+
+def test_async_login_wrong_password(async_client):
+    response = async_client.post(
+        "/users/login", json={"username": "asyncuser", "password": "nope"}
+    )
+    assert response.status_code == 401
+
+
+def test_sync_mode_does_not_import_the_async_stack():
+    script = (
+        "import sys, src.main; "
+        "print(sorted(m for m in sys.modules "
+        "if m == 'aiosqlite' or m.startswith(('src.services.async', 'src.routes.async'))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "DB_MODE": "sync"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,40 @@
+from benchmarks.bench_startup import check_budget
+from benchmarks.loadtest.report import compare, percentile, summarize
+from benchmarks.loadtest.workload import build_operations, parse_mix
+from benchmarks.loadtest.seed import Dataset
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    samples = [("GET /posts/", 0.010, 200)] * 99 + [("GET /posts/", 0.5, 500)]
+    baseline = summarize(samples, wall_s=1.0)
+    assert baseline["endpoints"]["GET /posts/"]["errors"] == 1
+    assert compare(baseline, baseline, threshold=0.1) == []
+
+    slower = summarize([(e, s * 2, c) for e, s, c in samples], wall_s=2.0)
+    regressions = compare(slower, baseline, threshold=0.1)
+    assert any("GET /posts/ p50_ms" in line for line in regressions)
+    assert any("overall rps" in line for line in regressions)
+
+
+def test_workload_is_reproducible():
+    data = Dataset(users=10, posts=100, votes=0)
+    mix = parse_mix("feed=1,post=1,vote=1,search=1,login=1")
+    first = build_operations(200, mix, data, seed=7)
+    assert first == build_operations(200, mix, data, seed=7)
+    assert {op.endpoint.split()[0] for op in first} == {"GET", "POST"}
+
+
+def test_startup_budget_reports_overruns():
+    limits = {"import": 1500, "first_request": 3000}
+    assert check_budget({"import": 900, "first_request": 1200}, limits) == []
+    assert check_budget({"import": 1600, "first_request": 1200}, limits) == [
+        "import: 1600 ms > 1500 ms"
+    ]
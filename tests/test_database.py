@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from src import config
+from src.database import apply_engine_profile
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'profile.db'}"
+
+
+def test_writer_profile_pragmas(db_url):
+    engine = apply_engine_profile(create_engine(db_url))
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert (
+            conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            == config.SQLITE_BUSY_TIMEOUT_MS
+        )
+        assert conn.exec_driver_sql("PRAGMA temp_store").scalar() == 2  # MEMORY
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 0
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+    engine.dispose()
+
+
+def test_read_only_profile_rejects_writes(db_url):
+    writer = apply_engine_profile(create_engine(db_url))
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    reader = apply_engine_profile(create_engine(db_url), read_only=True)
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    reader.dispose()
+    writer.dispose()
@@ -0,0 +1,218 @@
+import time
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from src import config
+from src.models import Job, User
+from src.models.jobs import JobStatus
+from src.services import JobServices, RankingServices
+from tests.conftest import TestingSessionLocal, create_post, engine, register
+
+
+def test_deleting_a_user_queues_one_purge_job(client, app_on_test_engine):
+    leaver = register(client, "jobleaver")
+    watcher = register(client, "jobwatcher")
+    leaver_id = client.get("/users/me", headers=leaver).json()["id"]
+    create_post(client, leaver, "Queued")
+
+    assert client.delete(f"/users/{leaver_id}", headers=leaver).status_code == 204
+
+    db = TestingSessionLocal()
+    try:
+        key = f"purge_user:{leaver_id}"
+        job_id = db.query(Job.id).filter_by(idempotency_key=key).scalar()
+        # a pending key hands back the job it names
+        payload = {"user_id": leaver_id}
+        assert JobServices.enqueue("purge_user", db, payload, key) == job_id
+        db.commit()
+        job = client.get(f"/jobs/{job_id}", headers=watcher).json()
+        assert job["status"] == "queued"
+
+        JobServices.run_due_jobs(db)
+        assert db.get(User, leaver_id) is None
+    finally:
+        db.close()
+
+    job = client.get(f"/jobs/{job_id}", headers=watcher).json()
+    assert (job["status"], job["attempts"]) == ("succeeded", 1)
+    assert "result" not in job and "last_error" not in job
+    assert client.get("/jobs/999999", headers=watcher).status_code == 404
+    assert client.get(f"/jobs/{job_id}").status_code == 401
+
+
+def test_failing_job_is_retried_with_backoff_then_failed(monkeypatch):
+    calls = []
+
+    def flaky(payload, db, stop):
+        calls.append(payload)
+        raise RuntimeError("disk on fire")
+
+    monkeypatch.setitem(JobServices.HANDLERS, "flaky", flaky)
+    db = TestingSessionLocal()
+    try:
+        job_id = JobServices.enqueue("flaky", db, payload={"n": 1}, max_attempts=3)
+        db.commit()
+
+        before = RankingServices.utcnow()
+        assert JobServices.run_due_jobs(db) >= 1
+        job = db.get(Job, job_id)
+        assert (job.status, job.attempts) == (JobStatus.queued, 1)
+        assert job.run_after >= before + timedelta(seconds=config.JOB_RETRY_BACKOFF_S)
+        assert job.last_error == "RuntimeError: disk on fire"
+
+        # skip the wait
+        job.run_after = before
+        db.commit()
+        monkeypatch.setattr(config, "JOB_RETRY_BACKOFF_S", 0)
+        JobServices.run_due_jobs(db)
+        db.expire_all()
+        job = db.get(Job, job_id)
+        assert (job.status, job.attempts) == (JobStatus.failed, 3)
+        assert job.finished_at is not None
+        assert calls == [{"n": 1}] * 3
+    finally:
+        db.close()
+
+
+def test_interrupted_and_lost_jobs_run_again(monkeypatch):
+    def interrupted(payload, db, stop):
+        raise JobServices.JobInterrupted
+
+    monkeypatch.setitem(JobServices.HANDLERS, "interrupted", interrupted)
+    monkeypatch.setitem(JobServices.HANDLERS, "lost", lambda payload, db, stop: None)
+    db = TestingSessionLocal()
+    try:
+        job_id = JobServices.enqueue("interrupted", db)
+        db.commit()
+        JobServices.run_job(JobServices.claim_next_job(db), db)
+        job = db.get(Job, job_id)
+        # queued again, and the attempt does not count
+        assert (job.status, job.attempts) == (JobStatus.queued, 0)
+        db.delete(job)
+
+        # Workers that die leave their jobs running until the lease expires.
+        retried = JobServices.enqueue("lost", db, max_attempts=2)
+        given_up = JobServices.enqueue("lost", db, max_attempts=1)
+        db.commit()
+        claimed = {JobServices.claim_next_job(db).id for _ in range(2)}
+        assert claimed == {retried, given_up}
+        assert JobServices.requeue_expired_jobs(db) == 0
+
+        monkeypatch.setattr(config, "JOB_LEASE_S", 0)
+        assert JobServices.requeue_expired_jobs(db) == 2
+        db.expire_all()
+        assert db.get(Job, retried).status == JobStatus.queued
+        assert db.get(Job, given_up).status == JobStatus.failed
+        assert db.get(Job, given_up).last_error.startswith("Lease expired")
+    finally:
+        db.close()
+
+
+def test_idle_runner_backs_off_and_reads_before_it_claims(monkeypatch):
+    monkeypatch.setattr(JobServices, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(JobServices, "ReadSessionLocal", TestingSessionLocal)
+    ran = []
+    monkeypatch.setitem(
+        JobServices.HANDLERS, "noted", lambda payload, db, stop: ran.append(1)
+    )
+    db = TestingSessionLocal()
+    try:
+        db.query(Job).delete()
+        db.commit()
+    finally:
+        db.close()
+    statements = []
+    listener = lambda *args: statements.append(" ".join(args[2].split()))
+
+    runner = JobServices.JobRunner(
+        workers=1, poll_interval_s=0.01, max_poll_interval_s=0.08
+    )
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        runner.start()
+        time.sleep(0.4)
+        # Waits of 0.01, 0.02, 0.04 then 0.08s: a handful of checks, not 40,
+        # and no claim, which would take the writer, while nothing is due.
+        checks = [s for s in statements if s.startswith("SELECT 1 FROM jobs")]
+        assert 3 <= len(checks) <= 10
+        assert not [s for s in statements if "attempts=(jobs.attempts" in s]
+
+        db = TestingSessionLocal()
+        try:
+            job_id = JobServices.enqueue("noted", db)
+            db.commit()
+        finally:
+            db.close()
+        runner.notify()
+        deadline = time.monotonic() + 5
+        while not ran and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        runner.close()
+        event.remove(engine, "before_cursor_execute", listener)
+    assert ran == [1]
+
+    db = TestingSessionLocal()
+    try:
+        assert db.get(Job, job_id).status == JobStatus.succeeded
+    finally:
+        db.close()
+
+
+def test_jobs_renew_their_lease_and_stop_once_it_is_lost(monkeypatch):
+    requeued = []
+
+    def outlive_lease(job_id, other):
+        # as if the last transaction had run for longer than the lease
+        stale = RankingServices.utcnow() - timedelta(seconds=config.JOB_LEASE_S + 1)
+        other.query(Job).filter(Job.id == job_id).update({Job.started_at: stale})
+        other.commit()
+
+    def renewing(payload, db, lease):
+        other = TestingSessionLocal()
+        try:
+            for _ in range(2):
+                outlive_lease(lease.job.id, other)
+                lease.renew(db)
+                db.commit()
+                requeued.append(JobServices.requeue_expired_jobs(other))
+        finally:
+            other.close()
+        return {"chunks": 2}
+
+    def stalled(payload, db, lease):
+        other = TestingSessionLocal()
+        try:
+            outlive_lease(lease.job.id, other)
+            requeued.append(JobServices.requeue_expired_jobs(other))
+        finally:
+            other.close()
+        lease.renew(db)
+
+    monkeypatch.setitem(JobServices.HANDLERS, "renewing", renewing)
+    monkeypatch.setitem(JobServices.HANDLERS, "stalled", stalled)
+    db = TestingSessionLocal()
+    try:
+        db.query(Job).delete()
+        renewed = JobServices.enqueue("renewing", db)
+        db.commit()
+        assert JobServices.run_job(JobServices.claim_next_job(db), db) == "succeeded"
+        assert requeued == [0, 0]
+        job = db.get(Job, renewed)
+        assert (job.status, job.attempts) == (JobStatus.succeeded, 1)
+
+        # A run that missed its renewal stops at the next one, and leaves the
+        # job queued for the run that takes it over.
+        lost = JobServices.enqueue("stalled", db)
+        db.commit()
+        assert JobServices.run_job(JobServices.claim_next_job(db), db) == "lost"
+        assert requeued[-1] == 1
+        db.expire_all()
+        job = db.get(Job, lost)
+        assert (job.status, job.attempts) == (JobStatus.queued, 1)
+        assert job.finished_at is None
+        db.delete(job)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,108 @@
+import asyncio
+
+import httpx
+
+from src import config
+from src.utils.load_shedding import (
+    AdaptiveLimiter,
+    LoadSheddingMiddleware,
+    TokenBuckets,
+    route_class,
+    shed_requests,
+)
+
+
+def app_taking(seconds):
+    async def app(scope, receive, send):
+        await asyncio.sleep(seconds)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+def send_all(app, requests, client=("127.0.0.1", 123)):
+    """Send ``requests`` ((method, path) pairs) to ``app`` all at once."""
+
+    async def send():
+        transport = httpx.ASGITransport(app=app, client=client)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(*(c.request(m, p) for m, p in requests))
+
+    return asyncio.run(send())
+
+
+def test_route_classes():
+    assert route_class("POST", "/users/login") == "auth"
+    assert route_class("POST", "/users/register/") == "auth"
+    assert route_class("POST", "/posts/1/vote") == "write"
+    assert route_class("DELETE", "/users/3") == "write"
+    assert route_class("GET", "/posts/") == "read"
+    assert route_class("GET", "/metrics") is None
+
+
+def test_limit_grows_while_saturated_and_fast_and_shrinks_when_slow():
+    limiter = AdaptiveLimiter("test", 4, target_latency_s=0.1, max_limit=8)
+    limiter.in_flight = 4
+    for _ in range(4):
+        limiter.observe(0.01)
+    # about one slot per ``limit`` fast responses
+    assert 4.9 < limiter.limit < 5
+
+    limiter.in_flight = 1
+    grown = limiter.limit
+    limiter.observe(0.01)
+    assert limiter.limit == grown
+
+    limiter.observe(0.5)
+    assert limiter.limit == grown * 0.9
+    # one cut per target interval, however many slow responses are in flight
+    limiter.observe(0.5)
+    limiter.observe(0.01, overloaded=True)
+    assert limiter.limit == grown * 0.9
+
+
+def test_requests_over_the_limit_queue_then_get_a_fast_503():
+    full = shed_requests.labels("read", "queue_full")
+    timed_out = shed_requests.labels("read", "queue_timeout")
+    full_before, timed_out_before = full.value, timed_out.value
+
+    def run(queue_timeout_s):
+        limiter = AdaptiveLimiter(
+            "test", 1, target_latency_s=10, max_queue=1, queue_timeout_s=queue_timeout_s
+        )
+        app = LoadSheddingMiddleware(
+            app_taking(0.1), limiters={"read": limiter}, buckets=TokenBuckets()
+        )
+        responses = send_all(app, [("GET", "/posts/")] * 3)
+        assert (limiter.in_flight, len(limiter._waiters)) == (0, 0)
+        return sorted(responses, key=lambda r: r.status_code)
+
+    # The queued request gets the slot in time; the one past the queue does not.
+    responses = run(queue_timeout_s=1)
+    assert [r.status_code for r in responses] == [200, 200, 503]
+    assert responses[-1].headers["retry-after"] == str(config.LOAD_SHED_RETRY_AFTER_S)
+
+    # The queued request gives up before the slot is free.
+    assert [r.status_code for r in run(queue_timeout_s=0.01)] == [200, 503, 503]
+    assert (full.value - full_before, timed_out.value - timed_out_before) == (2, 1)
+
+
+def test_login_attempts_are_rate_limited_per_client_address(monkeypatch):
+    monkeypatch.setattr(config, "LOGIN_RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(config, "LOGIN_RATE_LIMIT_BURST", 2)
+    app = LoadSheddingMiddleware(
+        app_taking(0),
+        limiters={"auth": AdaptiveLimiter("test", 8, target_latency_s=10)},
+        buckets=TokenBuckets(),
+    )
+
+    logins = [("POST", "/users/login")] * 3
+    responses = sorted(send_all(app, logins), key=lambda r: r.status_code)
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[-1].headers["retry-after"] == "60"
+
+    # Other addresses have their own bucket; registration is not limited.
+    assert send_all(app, logins[:1], client=("10.0.0.2", 1))[0].status_code == 200
+    registrations = [("POST", "/users/register")] * 3
+    assert {r.status_code for r in send_all(app, registrations)} == {200}
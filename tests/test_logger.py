@@ -0,0 +1,78 @@
+import json
+import logging
+import queue
+
+from src.utils.logger import (
+    DeferredQueueHandler,
+    JsonFormatter,
+    LazyRotatingFileHandler,
+    SamplingFilter,
+    logger,
+    parse_sample_rates,
+    read_logger,
+)
+
+
+def make_record(name: str, level: int = logging.INFO, msg="Fetching post %s"):
+    return logging.LogRecord(name, level, __file__, 1, msg, (7,), None)
+
+
+def test_logger_only_enqueues():
+    assert [type(h) for h in logger.handlers] == [DeferredQueueHandler]
+    assert read_logger.parent is logger
+
+
+def test_queue_handler_leaves_formatting_to_the_listener():
+    class Unused(logging.Formatter):
+        def format(self, record):
+            raise AssertionError("formatted on the logging thread")
+
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.setFormatter(Unused())
+    args = [7]
+    record = make_record("yaballe_app", msg="Fetching post %s")
+    record.args = (args,)
+
+    handler.handle(record)
+    args.append(8)
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args) == ("Fetching post [7]", None)
+    assert JsonFormatter().format(queued).count("Fetching post [7]") == 1
+
+
+def test_sampling_filter_applies_per_logger(monkeypatch):
+    sampling = SamplingFilter({"yaballe_app.reads": 0.25})
+    monkeypatch.setattr("random.random", lambda: 0.5)
+
+    assert not sampling.filter(make_record("yaballe_app.reads"))
+    assert sampling.filter(make_record("yaballe_app.reads", logging.WARNING))
+    assert sampling.filter(make_record("yaballe_app"))
+
+    monkeypatch.setattr("random.random", lambda: 0.1)
+    assert sampling.filter(make_record("yaballe_app.reads"))
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("yaballe_app.reads=0.01, other=1") == {
+        "yaballe_app.reads": 0.01,
+        "other": 1.0,
+    }
+
+
+def test_json_formatter_formats_lazy_arguments():
+    line = JsonFormatter().format(make_record("yaballe_app.reads"))
+    entry = json.loads(line)
+    assert entry["message"] == "Fetching post 7"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "yaballe_app.reads"
+
+
+def test_file_handler_creates_its_directory_on_first_record(tmp_path):
+    path = tmp_path / "nested" / "app.log"
+    handler = LazyRotatingFileHandler(str(path))
+    assert not path.parent.exists()
+
+    handler.emit(make_record("yaballe_app"))
+    handler.close()
+    assert "Fetching post 7" in path.read_text()
@@ -1,7 +1,20 @@
+import json
+from datetime import timedelta
 import pytest
 from fastapi.testclient import TestClient
+from src.commands import build_openapi
 from src.main import app
 from src.database import Base, engine, SessionLocal
+from sqlalchemy import event
+from src import config
+from src.models import Post, User
+from src.models.votes import VoteType
+from src.schemas import PostSchemas
+from src.schemas.votes import VoteTypeEnum
+from src.services import PostServices, RankingServices, SearchServices
+from src.services.vote_buffer import VoteBuffer, vote_buffer
+from src.utils.responses import PydanticJSONResponse
+from tests.conftest import TestingSessionLocal, engine as engine_under_test
 
 client = TestClient(app)
 
@@ -64,13 +77,13 @@ def test_create_post(client, auth_token):
 def test_get_all_posts(client, auth_token):
     response = client.get("/posts/")
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
 
 
 def test_search_posts(client, auth_token):
     response = client.get("/posts/search?q=Test")
     assert response.status_code == 200
-    results = response.json()
+    results = response.json()["items"]
     assert isinstance(results, list)
     # optionally check if query matches in title or content
 
@@ -194,3 +207,672 @@ def test_vote_on_post(client, auth_token, another_auth_token):
     assert response.status_code == 200
     data = response.json()
     assert "downvotes" in data
+
+
+def test_vote_counters_follow_vote_flips(client, auth_token, another_auth_token):
+    create_resp = client.post(
+        "/posts/",
+        json={"title": "Counter Post", "content": "Count me"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    post_id = create_resp.json()["id"]
+
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert response.json()["upvotes"] == 1
+    assert response.json()["downvotes"] == 0
+
+    # flipping the same user's vote moves the counters instead of adding one
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "downvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert response.json()["upvotes"] == 0
+    assert response.json()["downvotes"] == 1
+
+    response = client.get(f"/posts/{post_id}/votes")
+    assert response.json() == {"upvotes": 0, "downvotes": 1}
+
+
+def test_reconcile_vote_counts(client, auth_token):
+    create_resp = client.post(
+        "/posts/",
+        json={"title": "Drifted Post", "content": "Counters out of sync"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    post_id = create_resp.json()["id"]
+
+    db = TestingSessionLocal()
+    try:
+        db.query(Post).filter(Post.id == post_id).update(
+            {Post.upvote_count: 7, Post.hot_score: 3.5}
+        )
+        db.commit()
+
+        drift = PostServices.reconcile_vote_counts(db)
+        assert [d.post_id for d in drift] == [post_id]
+        assert drift[0].stored_upvotes == 7
+        assert drift[0].actual_upvotes == 0
+        # the hot score follows the corrected counters
+        assert db.get(Post, post_id).hot_score == 0
+
+        assert PostServices.reconcile_vote_counts(db) == []
+    finally:
+        db.close()
+
+    response = client.get(f"/posts/{post_id}/votes")
+    assert response.json() == {"upvotes": 0, "downvotes": 0}
+
+
+def test_get_all_posts_keyset_pagination(client, auth_token):
+    for i in range(5):
+        client.post(
+            "/posts/",
+            json={"title": f"Paged Post {i}", "content": "Page through me"},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/posts/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(p["id"] for p in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_get_all_posts_invalid_cursor(client):
+    response = client.get("/posts/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+    response = client.get("/posts/", params={"limit": 1000})
+    assert response.status_code == 422
+
+
+def test_post_list_pages_use_constant_queries(client, auth_token, another_auth_token):
+    for i in range(3):
+        client.post(
+            "/posts/",
+            json={"title": f"N+1 Post {i}", "content": "Author and votes"},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+        client.post(
+            "/posts/",
+            json={"title": f"N+1 Other {i}", "content": "Author and votes"},
+            headers={"Authorization": f"Bearer {another_auth_token}"},
+        )
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = TestingSessionLocal()
+    event.listen(engine_under_test, "before_cursor_execute", count_statement)
+    try:
+        for page_size in (1, 6):
+            statements.clear()
+            posts, _ = PostServices.get_all_posts(db, limit=page_size)
+            [PostSchemas.PostOut.model_validate(p) for p in posts]
+            assert len(posts) == page_size
+            assert len(statements) == 1
+
+            statements.clear()
+            posts, _ = PostServices.query_all_posts("Author", db, limit=page_size)
+            [PostSchemas.PostOut.model_validate(p) for p in posts]
+            assert len(statements) == 1
+            db.expunge_all()
+    finally:
+        event.remove(engine_under_test, "before_cursor_execute", count_statement)
+        db.close()
+
+
+def test_full_text_search_ranks_and_snippets(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    strong = client.post(
+        "/posts/",
+        json={"title": "Zeppelin zeppelin", "content": "All about the zeppelin"},
+        headers=headers,
+    ).json()["id"]
+    weak = client.post(
+        "/posts/",
+        json={
+            "title": "Airships",
+            "content": "One mention of a zeppelin among many other words here",
+        },
+        headers=headers,
+    ).json()["id"]
+
+    response = client.get("/posts/search", params={"q": "zeppelin"})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [p["id"] for p in items] == [strong, weak]
+    assert "<mark>" in items[0]["snippet"]
+
+    first = client.get("/posts/search", params={"q": "zeppelin", "limit": 1}).json()
+    second = client.get(
+        "/posts/search",
+        params={"q": "zeppelin", "limit": 1, "cursor": first["next_cursor"]},
+    ).json()
+    assert [p["id"] for p in first["items"] + second["items"]] == [strong, weak]
+
+    # prefix match on the last word
+    response = client.get("/posts/search", params={"q": "zepp"})
+    assert {p["id"] for p in response.json()["items"]} == {strong, weak}
+
+    # FTS5 syntax in user input is treated as plain text
+    response = client.get("/posts/search", params={"q": 'zeppelin" OR "*'})
+    assert response.status_code == 200
+
+    # substring mode keeps the old ILIKE semantics
+    response = client.get("/posts/search", params={"q": "eppeli", "mode": "substring"})
+    assert {p["id"] for p in response.json()["items"]} == {strong, weak}
+    response = client.get("/posts/search", params={"q": "eppeli"})
+    assert response.json()["items"] == []
+
+    # post content around the matches is escaped
+    client.post(
+        "/posts/",
+        json={"title": "Markup", "content": "<script>alert(1)</script> quagga"},
+        headers=headers,
+    )
+    items = client.get("/posts/search", params={"q": "alert quagga"}).json()["items"]
+    assert items[0]["snippet"] == (
+        "&lt;script&gt;<mark>alert</mark>(1)&lt;/script&gt; <mark>quagga</mark>"
+    )
+
+
+def test_full_text_index_follows_edits_and_deletes(client, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Marmalade", "content": "Orange preserve"},
+        headers=headers,
+    ).json()["id"]
+
+    client.put(
+        f"/posts/{post_id}",
+        json={"title": "Chutney", "content": "Spiced preserve"},
+        headers=headers,
+    )
+    assert client.get("/posts/search", params={"q": "marmalade"}).json()["items"] == []
+    found = client.get("/posts/search", params={"q": "chutney"}).json()["items"]
+    assert [p["id"] for p in found] == [post_id]
+
+    client.delete(f"/posts/{post_id}", headers=headers)
+    assert client.get("/posts/search", params={"q": "chutney"}).json()["items"] == []
+
+    db = TestingSessionLocal()
+    try:
+        SearchServices.rebuild_post_index(db)
+    finally:
+        db.close()
+    assert client.get("/posts/search", params={"q": "chutney"}).json()["items"] == []
+    assert client.get("/posts/search", params={"q": "preserve"}).json()["items"] == []
+
+
+@pytest.fixture
+def buffered_votes(monkeypatch):
+    def enable(mode):
+        monkeypatch.setattr(config, "VOTE_INGEST_MODE", mode)
+
+    monkeypatch.setattr(vote_buffer, "session_factory", TestingSessionLocal)
+    yield enable
+    vote_buffer.close()
+
+
+def test_vote_buffer_ack_mode(client, auth_token, another_auth_token, buffered_votes):
+    buffered_votes("ack")
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Buffered Post", "content": "Group committed"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert response.status_code == 200
+    assert (response.json()["upvotes"], response.json()["downvotes"]) == (1, 0)
+
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "downvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert (response.json()["upvotes"], response.json()["downvotes"]) == (0, 1)
+
+    response = client.post(
+        "/posts/999999/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert response.status_code == 404
+
+
+def test_vote_buffer_ack_mode_post_deleted_before_flush(
+    client, auth_token, another_auth_token, buffered_votes, monkeypatch
+):
+    buffered_votes("ack")
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Doomed Post", "content": "Deleted mid-vote"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+
+    submit = vote_buffer.submit
+
+    def delete_then_submit(user_id, post_id, vote_type):
+        db = TestingSessionLocal()
+        try:
+            db.query(Post).filter(Post.id == post_id).delete()
+            db.commit()
+        finally:
+            db.close()
+        return submit(user_id, post_id, vote_type)
+
+    monkeypatch.setattr(vote_buffer, "submit", delete_then_submit)
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Post not found"
+
+
+def test_vote_buffer_optimistic_mode(
+    client, auth_token, another_auth_token, buffered_votes
+):
+    buffered_votes("optimistic")
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Optimistic Post", "content": "Answered before commit"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+
+    response = client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "downvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    assert (response.json()["upvotes"], response.json()["downvotes"]) == (0, 1)
+
+    vote_buffer.close()
+    response = client.get(f"/posts/{post_id}/votes")
+    assert response.json() == {"upvotes": 0, "downvotes": 1}
+
+
+def test_vote_buffer_last_write_wins_in_one_batch(client, auth_token):
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Batch Post", "content": "Many votes"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+    voter_ids = [
+        client.get(
+            "/users/me",
+            headers={
+                "Authorization": "Bearer "
+                + create_and_login_user(f"voter{i}", f"voter{i}@example.com", "pw")
+            },
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    buffer = VoteBuffer(TestingSessionLocal, max_batch=100, max_delay_ms=200)
+    event.listen(engine_under_test, "before_cursor_execute", count_statement)
+    try:
+        futures = [buffer.submit(voter_ids[0], post_id, VoteType.upvote)]
+        futures += [buffer.submit(uid, post_id, VoteType.upvote) for uid in voter_ids]
+        futures.append(buffer.submit(voter_ids[0], post_id, VoteType.downvote))
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        buffer.close()
+        event.remove(engine_under_test, "before_cursor_execute", count_statement)
+
+    assert len([s for s in statements if s.startswith("INSERT INTO votes")]) == 1
+    response = client.get(f"/posts/{post_id}/votes")
+    assert response.json() == {"upvotes": 2, "downvotes": 1}
+
+
+def test_vote_path_statement_count(client, auth_token, another_auth_token):
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Upsert Post", "content": "Few statements per vote"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+    voter = client.get(
+        "/users/me", headers={"Authorization": f"Bearer {another_auth_token}"}
+    ).json()
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Authentication loads the user through the read pool, not the writer
+    # session the vote runs in.
+    read_db = TestingSessionLocal()
+    current_user = read_db.get(User, voter["id"])
+    read_db.close()
+
+    db = TestingSessionLocal()
+    event.listen(engine_under_test, "before_cursor_execute", count_statement)
+    try:
+        # upsert and read back, plus the hot score write when the vote changed
+        for vote, expected, statement_count in [
+            (VoteTypeEnum.upvote, (1, 0), 3),
+            (VoteTypeEnum.upvote, (1, 0), 2),
+            (VoteTypeEnum.downvote, (0, 1), 3),
+        ]:
+            statements.clear()
+            response = PostServices.vote_on_post_service(
+                post_id, vote, current_user, db
+            )
+            assert (response.upvotes, response.downvotes) == expected
+            assert len(statements) == statement_count
+    finally:
+        event.remove(engine_under_test, "before_cursor_execute", count_statement)
+        db.close()
+
+
+def test_post_reads_are_cached_and_invalidated(client, auth_token, another_auth_token):
+    author = {"Authorization": f"Bearer {auth_token}"}
+    voter = {"Authorization": f"Bearer {another_auth_token}"}
+    post_id = client.post(
+        "/posts/", json={"title": "Cached Post", "content": "Hot read"}, headers=author
+    ).json()["id"]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    first = client.get(f"/posts/{post_id}")
+    client.get(f"/posts/{post_id}/votes")
+    event.listen(engine_under_test, "before_cursor_execute", count_statement)
+    try:
+        second = client.get(f"/posts/{post_id}")
+        votes = client.get(f"/posts/{post_id}/votes")
+    finally:
+        event.remove(engine_under_test, "before_cursor_execute", count_statement)
+    assert statements == []
+    assert second.json() == first.json()
+    assert votes.json() == {"upvotes": 0, "downvotes": 0}
+
+    client.post(f"/posts/{post_id}/vote", json={"vote": "upvote"}, headers=voter)
+    assert client.get(f"/posts/{post_id}").json()["upvotes"] == 1
+    assert client.get(f"/posts/{post_id}/votes").json()["upvotes"] == 1
+
+    client.put(
+        f"/posts/{post_id}", json={"title": "Edited", "content": "Hot"}, headers=author
+    )
+    assert client.get(f"/posts/{post_id}").json()["title"] == "Edited"
+
+    client.put("/users/me", json={"first_name": "Renamed"}, headers=author)
+    assert client.get(f"/posts/{post_id}").json()["author"]["first_name"] == "Renamed"
+
+    client.delete(f"/posts/{post_id}", headers=author)
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.get(f"/posts/{post_id}/votes").status_code == 404
+
+
+def test_response_cache_is_bounded_by_size():
+    from src.services.response_cache import POST, ResponseCache
+
+    cache = ResponseCache(max_bytes=10, ttl_s=60)
+    cache.put(POST, 1, b"12345", cache.token(1), author_id=7)
+    cache.put(POST, 2, b"12345", cache.token(2), author_id=7)
+    assert cache.get(POST, 1) == b"12345"  # 2 is now least recently used
+    cache.put(POST, 3, b"123", cache.token(3))
+    assert cache.get(POST, 2) is None
+    assert cache.get(POST, 1) is not None and cache.get(POST, 3) is not None
+
+    cache.put(POST, 4, b"x" * 11, cache.token(4))
+    assert cache.get(POST, 4) is None
+
+    # a read-through that raced an invalidation does not cache its result
+    token = cache.token(5)
+    cache.invalidate_post(5)
+    cache.put(POST, 5, b"stale", token)
+    assert cache.get(POST, 5) is None
+
+    cache.invalidate_author(7)
+    assert cache.get(POST, 1) is None and cache.get(POST, 3) == b"123"
+
+
+def test_metrics_label_requests_by_route_template(client, auth_token):
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Measured Post", "content": "Latency"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+    client.get(f"/posts/{post_id}")
+    client.get("/posts/999999")
+    client.get("/no/such/path")
+
+    body = client.get("/metrics").text
+    assert 'method="GET",route="/posts/{post_id}",status="200"' in body
+    assert 'method="GET",route="/posts/{post_id}",status="404"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert f'/posts/{post_id}"' not in body
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/posts/{post_id}",le="+Inf"}'
+        in body
+    )
+    assert "http_requests_in_flight" in body
+    assert "threadpool_queue_depth" in body
+
+
+@pytest.fixture
+def exporter(auth_token, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_USERS", frozenset({"testuser"}))
+    return {"Authorization": f"Bearer {auth_token}"}
+
+
+def export_lines(client, path, headers, **params):
+    response = client.get(path, params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_export_posts_streams_ndjson_in_batches(
+    client, auth_token, another_auth_token, exporter, monkeypatch
+):
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 2)
+    for i in range(5):
+        client.post(
+            "/posts/",
+            json={"title": f"Export Post {i}", "content": "Ship me"},
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    rows = export_lines(client, "/posts/export", exporter)
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(ids)
+    assert len(ids) == len(set(ids))
+    assert {"title", "author_id", "updated_at", "upvotes"} <= rows[0].keys()
+
+    # every vote's user id is in the exports: only the EXPORT_USERS get them
+    other = {"Authorization": f"Bearer {another_auth_token}"}
+    for path in ("/posts/export", "/votes/export"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=other).status_code == 403
+
+    # append-only consumers resume from the last id they saw
+    assert [
+        r["id"]
+        for r in export_lines(client, "/posts/export", exporter, after_id=ids[2])
+    ] == (ids[3:])
+
+
+def test_export_resumes_from_updated_since(
+    client, auth_token, another_auth_token, exporter
+):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    post_id = client.post(
+        "/posts/", json={"title": "Tracked", "content": "Watch me"}, headers=headers
+    ).json()["id"]
+    client.post("/posts/", json={"title": "Untouched", "content": "-"}, headers=headers)
+
+    last = export_lines(client, "/posts/export", exporter)[-1]
+    checkpoint = {"updated_since": last["updated_at"], "after_id": last["id"]}
+    assert export_lines(client, "/posts/export", exporter, **checkpoint) == []
+
+    # a vote changes the post's counters, so the post is exported again
+    client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    changed = export_lines(client, "/posts/export", exporter, **checkpoint)
+    assert [(r["id"], r["upvotes"]) for r in changed] == [(post_id, 1)]
+
+    votes = export_lines(
+        client, "/votes/export", exporter, updated_since=last["updated_at"]
+    )
+    assert [(v["post_id"], v["vote_type"]) for v in votes] == [(post_id, "upvote")]
+
+    # a flip re-exports the vote with its new type
+    vote_checkpoint = {
+        "updated_since": votes[0]["updated_at"],
+        "after_id": votes[0]["id"],
+    }
+    client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "downvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+    flipped = export_lines(client, "/votes/export", exporter, **vote_checkpoint)
+    assert [(v["id"], v["vote_type"]) for v in flipped] == [
+        (votes[0]["id"], "downvote")
+    ]
+
+
+def test_ranked_feeds(client, auth_token, another_auth_token):
+    author = {"Authorization": f"Bearer {auth_token}"}
+    voter = {"Authorization": f"Bearer {another_auth_token}"}
+    liked, plain, disliked = (
+        client.post(
+            "/posts/", json={"title": f"Ranked {name}", "content": "-"}, headers=author
+        ).json()["id"]
+        for name in ("liked", "plain", "disliked")
+    )
+    client.post(f"/posts/{liked}/vote", json={"vote": "upvote"}, headers=voter)
+    client.post(f"/posts/{disliked}/vote", json={"vote": "downvote"}, headers=voter)
+
+    def feed(**params):
+        ids, cursor = [], None
+        while True:
+            page = client.get(
+                "/posts/",
+                params={"limit": 2, **params, **({"cursor": cursor} if cursor else {})},
+            )
+            assert page.status_code == 200
+            ids.extend(p["id"] for p in page.json()["items"])
+            cursor = page.json()["next_cursor"]
+            if cursor is None:
+                return [i for i in ids if i in (liked, plain, disliked)]
+
+    assert feed(sort="top") == [liked, plain, disliked]
+    assert feed(sort="hot") == [liked, plain, disliked]
+    assert feed(sort="new") == [disliked, plain, liked]
+
+    db = TestingSessionLocal()
+    try:
+        db.query(Post).filter(Post.id == liked).update(
+            {Post.created_at: RankingServices.utcnow() - timedelta(days=2)}
+        )
+        db.commit()
+    finally:
+        db.close()
+    assert feed(sort="top", period="day") == [plain, disliked]
+    assert feed(sort="top", period="week") == [liked, plain, disliked]
+
+
+def test_redecay_hot_scores(client, auth_token, another_auth_token):
+    post_id = client.post(
+        "/posts/",
+        json={"title": "Decaying", "content": "-"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()["id"]
+    client.post(
+        f"/posts/{post_id}/vote",
+        json={"vote": "upvote"},
+        headers={"Authorization": f"Bearer {another_auth_token}"},
+    )
+
+    db = TestingSessionLocal()
+    try:
+        post = db.get(Post, post_id)
+        fresh, updated_at = post.hot_score, post.updated_at
+        assert fresh == pytest.approx(1 / 2**config.HOT_GRAVITY, rel=0.01)
+
+        now = RankingServices.utcnow()
+        RankingServices.redecay_hot_scores(db, now=now + timedelta(hours=10))
+        db.refresh(post)
+        assert post.hot_score == pytest.approx(1 / 12**config.HOT_GRAVITY, rel=0.01)
+        # re-ranking is not an update of the post itself
+        assert post.updated_at == updated_at
+
+        later = now + timedelta(hours=config.HOT_HORIZON_HOURS + 1)
+        RankingServices.redecay_hot_scores(db, now=later)
+        db.refresh(post)
+        assert post.hot_score == 0
+    finally:
+        db.close()
+
+
+def test_list_pages_render_like_the_response_model(client, auth_token):
+    client.post(
+        "/posts/",
+        json={"title": "Rendered", "content": "Byte for byte"},
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    db = TestingSessionLocal()
+    try:
+        posts, next_cursor = PostServices.get_all_posts(db, limit=5)
+    finally:
+        db.close()
+
+    page = {"items": posts, "next_cursor": next_cursor}
+    expected = PostSchemas.PostPage.model_validate(page).model_dump_json().encode()
+    assert PydanticJSONResponse(page, adapter=PostSchemas.POST_PAGE).body == expected
+    assert client.get("/posts/", params={"limit": 5}).content == expected
+
+
+def test_openapi_is_served_from_the_prebuilt_document(client, tmp_path, monkeypatch):
+    path = tmp_path / "openapi.json"
+    build_openapi.main(["--output", str(path)])
+    prebuilt = json.loads(path.read_text())
+    assert "/posts/export" in prebuilt["paths"]
+
+    prebuilt["info"]["title"] = "Loaded from disk"
+    path.write_text(json.dumps(prebuilt))
+    monkeypatch.setattr(config, "OPENAPI_SCHEMA_PATH", str(path))
+    monkeypatch.setattr(app, "openapi_schema", None)
+    assert client.get("/openapi.json").json()["info"]["title"] == "Loaded from disk"
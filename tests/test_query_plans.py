@@ -0,0 +1,197 @@
+"""Query-plan regression tests.
+
+Every statement the API and the maintenance services issue while running a
+workload that touches each endpoint is recorded, then replayed through
+``EXPLAIN QUERY PLAN`` with its parameters. A plan step that scans a table,
+in rowid order or along one of its indexes, rather than searching it, fails
+the test unless the statement is listed in ``EXPECTED_SCANS``: either it reads
+the whole table by design, or it walks an index in the order it returns rows
+and stops at the page size.
+"""
+
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src import config
+from src.database import Base
+from src.services import JobServices, PostServices, PurgeServices, RankingServices
+from tests.conftest import TestingSessionLocal, engine as engine_under_test, register
+
+DML = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$")
+
+# (table, fragment of the statement) of the scans that are intended, with why.
+EXPECTED_SCANS = {
+    # Substring search cannot use an index: that is what the fts mode is for.
+    # User queries too short for the trigram index fall back to the same scan.
+    ("posts", "lower(posts.title) LIKE lower("),
+    ("users", "lower(users.username) LIKE lower("),
+    # The first page of users walks the primary key and stops at the limit
+    # (SQLite reports walking the rowid order as a scan too).
+    ("users", "FROM users WHERE users.deleted_at IS NULL ORDER BY users.id LIMIT"),
+    # A full export reads every row, in primary key order.
+    ("posts", "FROM posts ORDER BY posts.id"),
+    ("votes", "FROM votes ORDER BY votes.id"),
+    # Reconciliation compares the counters of every post with every vote.
+    ("posts", "LEFT OUTER JOIN (SELECT votes.post_id"),
+    ("votes", "LEFT OUTER JOIN (SELECT votes.post_id"),
+    # Feed pages walk the index of their order and stop at the limit. A top
+    # page limited to a period skips the older posts it meets on the way.
+    ("posts", "ORDER BY posts.created_at DESC, posts.id DESC LIMIT"),
+    ("posts", "ORDER BY posts.hot_score DESC, posts.id DESC LIMIT"),
+    ("posts", "ORDER BY posts.score DESC, posts.id DESC LIMIT"),
+}
+
+
+@contextmanager
+def recorded_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if DML.match(statement):
+            # One parameter set is enough to plan an executemany.
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine_under_test, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine_under_test, "before_cursor_execute", record)
+
+
+def full_scans(statement, parameters):
+    """Tables ``statement`` scans rather than searches, per SQLite's planner."""
+    tables = Base.metadata.tables
+    connection = engine_under_test.raw_connection()
+    try:
+        cursor = connection.cursor()
+        plan = cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        connection.close()
+    scans = set()
+    for _, _, _, detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and match.group(1) in tables:
+            scans.add(match.group(1))
+    return scans
+
+
+def unexpected_scans(statements):
+    found = {}
+    for statement, parameters in statements:
+        sql = " ".join(statement.split())
+        for table in full_scans(statement, parameters):
+            if not any(
+                table == expected and fragment in sql
+                for expected, fragment in EXPECTED_SCANS
+            ):
+                found.setdefault(table, set()).add(sql)
+    return found
+
+
+def run_workload(client):
+    author = register(client, "planauthor")
+    voter = register(client, "planvoter")
+    author_id = client.get("/users/me", headers=author).json()["id"]
+
+    post_ids = [
+        client.post(
+            "/posts/",
+            json={"title": f"Plan post {i}", "content": "Indexed reads only"},
+            headers=author,
+        ).json()["id"]
+        for i in range(3)
+    ]
+    post_id = post_ids[0]
+    client.post(f"/posts/{post_id}/vote", json={"vote": "upvote"}, headers=voter)
+    client.post(f"/posts/{post_id}/vote", json={"vote": "downvote"}, headers=voter)
+    client.put(
+        f"/posts/{post_id}",
+        json={"title": "Plan post edited", "content": "Still indexed"},
+        headers=author,
+    )
+
+    for sort in ("new", "hot", "top"):
+        page = client.get("/posts/", params={"sort": sort, "limit": 2}).json()
+        client.get(
+            "/posts/",
+            params={"sort": sort, "limit": 2, "cursor": page["next_cursor"]},
+        )
+    client.get("/posts/", params={"sort": "top", "period": "day"})
+    client.get(f"/posts/{post_id}")
+    client.get(f"/posts/{post_id}/votes")
+    client.get("/posts/search", params={"q": "plan"})
+    client.get("/posts/search", params={"q": "plan", "mode": "substring"})
+    client.get("/posts/export", headers=author)
+    client.get("/posts/export", params={"after_id": post_id}, headers=author)
+    client.get(
+        "/posts/export",
+        params={"updated_since": "2000-01-01T00:00:00"},
+        headers=author,
+    )
+    client.get(
+        "/posts/export",
+        params={"updated_since": "2000-01-01T00:00:00", "after_id": post_id},
+        headers=author,
+    )
+    client.get("/votes/export", headers=author)
+    client.get(
+        "/votes/export",
+        params={"updated_since": "2000-01-01T00:00:00"},
+        headers=author,
+    )
+
+    page = client.get("/users/", params={"limit": 1}).json()
+    client.get("/users/", params={"limit": 1, "cursor": page["next_cursor"]})
+    client.get(f"/users/{author_id}")
+    client.get("/users/search", params={"q": "planauthor"})
+    client.get("/users/search", params={"q": "pl"})
+    client.get("/users/search", params={"q": "plan", "mode": "substring"})
+    client.get(f"/users/{author_id}/posts")
+    client.get(f"/users/{author_id}/posts", params={"q": "plan"})
+    client.put(
+        "/users/me",
+        json={"first_name": "Planned", "last_name": "User"},
+        headers=author,
+    )
+
+    db = TestingSessionLocal()
+    try:
+        RankingServices.refresh_hot_scores(post_ids, db)
+        db.commit()
+        RankingServices.redecay_hot_scores(db)
+        PostServices.reconcile_vote_counts(db)
+        for _ in range(2):
+            job_id = JobServices.enqueue(
+                "reconcile_vote_counts", db, idempotency_key="plan-reconcile"
+            )
+        db.commit()
+    finally:
+        db.close()
+    client.get(f"/jobs/{job_id}", headers=author)
+
+    client.delete(f"/posts/{post_ids[1]}", headers=author)
+    voter_id = client.get("/users/me", headers=voter).json()["id"]
+    client.delete(f"/users/{voter_id}", headers=voter)
+    client.delete(f"/users/{author_id}", headers=author)
+
+    db = TestingSessionLocal()
+    try:
+        JobServices.has_due_job(db)
+        JobServices.run_due_jobs(db)
+        JobServices.requeue_expired_jobs(db)
+        JobServices.prune_finished_jobs(db)
+        PurgeServices.purge_deleted_users(db)
+    finally:
+        db.close()
+
+
+def test_no_query_scans_a_whole_table(client, app_on_test_engine, monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_USERS", frozenset({"planauthor"}))
+    with recorded_statements() as statements:
+        run_workload(client)
+
+    assert len(statements) > 50
+    assert unexpected_scans(statements) == {}
@@ -0,0 +1,85 @@
+import logging
+import re
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from src import config
+from src.models import Post
+from src.utils.query_profiler import forbid_repeated_statements, statement_shape
+from tests.conftest import TestingSessionLocal, create_post, register
+
+SERVER_TIMING = re.compile(r'^db;dur=[\d.]+;desc="(\d+) statements, (\d+) rows"$')
+
+
+def test_statement_shape_folds_in_lists():
+    assert statement_shape("SELECT *\n  FROM posts WHERE id IN (?, ?, ?)") == (
+        "SELECT * FROM posts WHERE id IN (?)"
+    )
+
+
+def test_failed_statements_leave_nothing_on_the_connection():
+    db = TestingSessionLocal()
+    try:
+        connection = db.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.exec_driver_sql("SELECT * FROM no_such_table")
+        assert "query_started" not in connection.info
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+    finally:
+        db.close()
+
+
+def test_server_timing_reports_statements_and_rows(client, app_on_test_engine):
+    headers = register(client, "timed")
+    for i in range(3):
+        create_post(client, headers, f"Timed post {i}")
+
+    response = client.get("/posts/", params={"limit": 2})
+    statements, rows = SERVER_TIMING.match(response.headers["server-timing"]).groups()
+    # one page query, fetching one row past the page for the next cursor
+    assert (int(statements), int(rows)) == (1, 3)
+
+
+def test_slow_queries_are_logged(client, app_on_test_engine, monkeypatch, caplog):
+    monkeypatch.setattr(config, "DB_SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="yaballe_app.slow_queries"):
+        client.get("/posts/", params={"limit": 1})
+    assert any(
+        record.getMessage().startswith("Slow query")
+        and "FROM posts" in record.getMessage()
+        for record in caplog.records
+    )
+
+
+def test_repeated_statements_are_reported(client, app_on_test_engine):
+    for name in ("lazyone", "lazytwo", "lazythree"):
+        create_post(client, register(client, name), f"Post of {name}")
+
+    db = TestingSessionLocal()
+    try:
+        with pytest.raises(AssertionError, match="3x SELECT users"):
+            with forbid_repeated_statements():
+                posts = db.scalars(select(Post).where(Post.title.like("Post of %")))
+                # Each author is lazy-loaded on its own: the N+1.
+                [post.author.username for post in posts]
+    finally:
+        db.close()
+
+
+def test_read_and_vote_paths_run_no_repeated_statements(client, no_repeated_statements):
+    author = register(client, "guarded")
+    voter = register(client, "guardvoter")
+    author_id = client.get("/users/me", headers=author).json()["id"]
+    post_ids = [create_post(client, author, f"Guarded post {i}") for i in range(3)]
+
+    client.post(f"/posts/{post_ids[0]}/vote", json={"vote": "upvote"}, headers=voter)
+    for sort in ("new", "hot", "top"):
+        client.get("/posts/", params={"sort": sort})
+    client.get(f"/posts/{post_ids[0]}")
+    client.get("/posts/search", params={"q": "guarded"})
+    client.get(f"/users/{author_id}/posts")
+    client.get("/users/search", params={"q": "guard"})
+    client.delete(f"/posts/{post_ids[0]}", headers=author)
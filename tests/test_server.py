@@ -0,0 +1,53 @@
+import os
+
+from src import server
+
+
+def test_uvicorn_options_prefer_uvloop_and_httptools(monkeypatch):
+    monkeypatch.setattr(server, "find_spec", lambda name: object())
+    options = server.uvicorn_options("127.0.0.1", 8080, 4)
+    assert options["workers"] == 4
+    assert (options["loop"], options["http"]) == ("uvloop", "httptools")
+
+    monkeypatch.setattr(server, "find_spec", lambda name: None)
+    options = server.uvicorn_options("127.0.0.1", 8080, 4)
+    assert (options["loop"], options["http"]) == ("asyncio", "h11")
+
+
+def test_schema_is_created_by_the_parent_only(monkeypatch):
+    calls = []
+    monkeypatch.setattr(server.config, "DB_INIT_SCHEMA", True)
+    monkeypatch.setattr("src.database.init_db", lambda: calls.append("init_db"))
+    monkeypatch.setenv("DB_INIT_SCHEMA", "1")
+
+    server.prepare_schema()
+    assert calls == ["init_db"]
+    assert os.environ["DB_INIT_SCHEMA"] == "0"
+
+
+def test_several_workers_do_not_share_the_log_file(monkeypatch):
+    monkeypatch.setenv("LOG_TO_FILE", "1")
+    server.prepare_logging(1)
+    assert os.environ["LOG_TO_FILE"] == "1"
+
+    server.prepare_logging(4)
+    assert os.environ["LOG_TO_FILE"] == "0"
+
+
+def test_background_tasks_run_in_the_supervisor_only(monkeypatch):
+    from src.services.jobs import job_runner
+    from src.services.ranking import hot_score_decay
+
+    started = []
+    monkeypatch.setattr(server.config, "BACKGROUND_TASKS", True)
+    monkeypatch.setenv("BACKGROUND_TASKS", "1")
+    monkeypatch.setattr(job_runner, "start", lambda: started.append("jobs"))
+    monkeypatch.setattr(hot_score_decay, "start", lambda: started.append("decay"))
+
+    # A single worker is served in-process and starts them from its lifespan.
+    assert server.start_background_tasks(1) == []
+    assert os.environ["BACKGROUND_TASKS"] == "1"
+
+    assert server.start_background_tasks(4) == [hot_score_decay, job_runner]
+    assert started == ["decay", "jobs"]
+    assert os.environ["BACKGROUND_TASKS"] == "0"
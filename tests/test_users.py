@@ -1,7 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from src.main import app
-from src.database import get_db
+from src.database import enforce_foreign_keys, get_db, get_read_db
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -10,8 +10,8 @@ from src.database import Base
 # Setup test DB (sqlite memory for example)
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine = enforce_foreign_keys(
+    create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -26,6 +26,7 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 client = TestClient(app)
 
@@ -179,7 +180,7 @@ def test_edit_user():
 def test_get_all_users():
     response = client.get("/users/")
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert isinstance(data, list)
     assert any(u["username"] == "loginuser" for u in data)
 
@@ -187,14 +188,14 @@ def test_get_all_users():
 def test_search_users():
     response = client.get("/users/search?q=login")
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["items"]
     assert any("login" in u["username"] for u in data)
 
 
 def test_get_user_by_id():
     # Get user id from known username
     response = client.get("/users/")
-    users = response.json()
+    users = response.json()["items"]
     user_id = next(u["id"] for u in users if u["username"] == "loginuser")
 
     response = client.get(f"/users/{user_id}")
@@ -232,4 +233,384 @@ def test_get_my_posts():
         "/users/1/posts", headers={"Authorization": f"Bearer {token}"}
     )
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    assert isinstance(response.json()["items"], list)
+
+
+def test_get_all_users_keyset_pagination():
+    first = client.get("/users/", params={"limit": 1}).json()
+    assert len(first["items"]) == 1
+    assert first["next_cursor"] is not None
+
+    second = client.get(
+        "/users/", params={"limit": 1, "cursor": first["next_cursor"]}
+    ).json()
+    assert second["items"][0]["id"] > first["items"][0]["id"]
+
+
+def register_user(username: str, email: str, first_name="Search", last_name="Me"):
+    return client.post(
+        "/users/register",
+        json={
+            "username": username,
+            "email": email,
+            "first_name": first_name,
+            "last_name": last_name,
+            "password": "secret123",
+        },
+    ).json()
+
+
+def test_search_users_ranks_exact_username_first():
+    register_user("qqfinder_extra", "qq1@example.com")
+    register_user("the_qqfinder", "qq2@example.com")
+    exact = register_user("qqfinder", "qq+3@example.com")
+
+    response = client.get("/users/search", params={"q": "QQFinder"})
+    assert response.status_code == 200
+    usernames = [u["username"] for u in response.json()["items"]]
+    assert usernames == ["qqfinder", "qqfinder_extra", "the_qqfinder"]
+    assert response.json()["items"][0]["id"] == exact["id"]
+
+    # infix match on email, name fields
+    response = client.get("/users/search", params={"q": "qq2@exam"})
+    assert [u["username"] for u in response.json()["items"]] == ["the_qqfinder"]
+
+    # queries too short for the index still match anywhere in every field
+    response = client.get("/users/search", params={"q": "qq"})
+    assert [u["username"] for u in response.json()["items"]] == [
+        "qqfinder_extra",
+        "qqfinder",
+        "the_qqfinder",
+    ]
+    response = client.get("/users/search", params={"q": "+3"})
+    assert [u["username"] for u in response.json()["items"]] == ["qqfinder"]
+
+    # substring mode keeps the unindexed behaviour
+    response = client.get("/users/search", params={"q": "qq", "mode": "substring"})
+    assert len(response.json()["items"]) == 3
+
+
+def test_search_users_follows_profile_changes():
+    register_user("zzrenamer", "zzrenamer@example.com")
+    token = client.post(
+        "/users/login", json={"username": "zzrenamer", "password": "secret123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    client.put("/users/me", json={"last_name": "Quixotic"}, headers=headers)
+    response = client.get("/users/search", params={"q": "quixot"})
+    assert [u["username"] for u in response.json()["items"]] == ["zzrenamer"]
+
+    me = client.get("/users/me", headers=headers).json()
+    client.delete(f"/users/{me['id']}", headers=headers)
+    response = client.get("/users/search", params={"q": "quixot"})
+    assert response.json()["items"] == []
+
+
+def test_login_rehashes_password_when_bcrypt_cost_changes(monkeypatch):
+    from src.models import User
+    from src.services.password_hasher import password_hasher
+
+    register_user("rehash_me", "rehash_me@example.com")
+    db = TestingSessionLocal()
+    old_hash = db.query(User).filter(User.username == "rehash_me").one().hashed_password
+    db.close()
+    assert old_hash.startswith("$2b$12$")
+
+    monkeypatch.setattr(password_hasher, "rounds", 4)
+    credentials = {"username": "rehash_me", "password": "secret123"}
+    assert client.post("/users/login", json=credentials).status_code == 200
+
+    db = TestingSessionLocal()
+    new_hash = db.query(User).filter(User.username == "rehash_me").one().hashed_password
+    db.close()
+    assert new_hash.startswith("$2b$04$")
+    assert client.post("/users/login", json=credentials).status_code == 200
+
+
+def test_password_is_hashed_before_the_writer_connection_is_taken(monkeypatch):
+    from fastapi import HTTPException
+    from src.schemas import UserSchemas
+    from src.services import AuthServices, UserServices
+
+    writers = []
+
+    def tracked_get_db():
+        db = TestingSessionLocal()
+        writers.append(db)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    hash_password = AuthServices.hash_password
+
+    def checked_hash_password(password):
+        assert not any(db.in_transaction() for db in writers)
+        return hash_password(password)
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, tracked_get_db)
+    monkeypatch.setattr(AuthServices, "hash_password", checked_hash_password)
+
+    register_user("early_hasher", "early_hasher@example.com")
+    token = client.post(
+        "/users/login", json={"username": "early_hasher", "password": "secret123"}
+    ).json()["access_token"]
+    response = client.put(
+        "/users/me",
+        json={"password": "secret456"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200
+    assert len(writers) == 3
+
+    # A registration that loses the race past the lookups is still a 400.
+    db = TestingSessionLocal()
+    try:
+        again = UserSchemas.UserCreateRequest(
+            username="early_hasher",
+            email="other@example.com",
+            first_name="A",
+            last_name="B",
+            password="secret123",
+        )
+        with pytest.raises(HTTPException) as exc_info:
+            UserServices.create_user(again, db)
+        assert exc_info.value.status_code == 400
+    finally:
+        db.close()
+
+
+def test_password_pool_rejects_when_full():
+    from fastapi import HTTPException
+    from src.services.password_hasher import PasswordHasher, pool_rejected
+
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+    rejected = pool_rejected.value
+    try:
+        first = hasher.hash("secret123")
+        with pytest.raises(HTTPException) as exc_info:
+            hasher.hash("secret456")
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+        assert pool_rejected.value == rejected + 1
+
+        assert first.result().startswith("$2b$04$")
+        # the slot is free again once the first hash is done
+        assert hasher.hash("secret456").result().startswith("$2b$04$")
+    finally:
+        hasher.close()
+
+
+def test_saturated_password_pool_frees_request_threads_at_once():
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi import HTTPException
+    from src import config
+    from src.services.password_hasher import PasswordHasher
+
+    # Waiting callers each hold a request thread; the default cap leaves most
+    # of the threadpool to other routes.
+    assert config.HASH_POOL_MAX_PENDING <= config.REQUEST_THREADS // 2
+
+    hasher = PasswordHasher(workers=1, max_pending=2, rounds=12)
+    start = threading.Barrier(8)
+
+    def login():
+        start.wait()
+        try:
+            hasher.hash("secret123").result()
+            outcome = 200
+        except HTTPException as exc:
+            outcome = exc.status_code
+        return outcome, time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(8) as threads:
+            results = [f.result() for f in [threads.submit(login) for _ in range(8)]]
+    finally:
+        hasher.close()
+
+    assert sorted(outcome for outcome, _ in results) == [200] * 2 + [503] * 6
+    # The callers past the cap gave their threads back before any hash ended.
+    last_rejected = max(at for outcome, at in results if outcome == 503)
+    first_hashed = min(at for outcome, at in results if outcome == 200)
+    assert last_rejected < first_hashed
+
+
+def test_metrics_export_password_pool():
+    client.post("/users/login", json={"username": "nobody", "password": "x"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE password_hash_pool_wait_seconds histogram" in body
+    assert 'password_hash_duration_seconds_count{operation="hash"}' in body
+    assert "password_hash_pool_utilization" in body
+
+
+def test_current_user_is_cached_until_profile_changes():
+    from sqlalchemy import event
+    from src.services.principal_cache import cache_hits
+
+    register_user("cached_principal", "cached_principal@example.com")
+    token = client.post(
+        "/users/login", json={"username": "cached_principal", "password": "secret123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    assert client.get("/users/me", headers=headers).json()["first_name"] == "Search"
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        hits = cache_hits.value
+        assert client.get("/users/me", headers=headers).status_code == 200
+        assert cache_hits.value == hits + 1
+        assert statements == []
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    client.put("/users/me", json={"first_name": "Renamed"}, headers=headers)
+    assert client.get("/users/me", headers=headers).json()["first_name"] == "Renamed"
+
+    me = client.get("/users/me", headers=headers).json()
+    client.delete(f"/users/{me['id']}", headers=headers)
+    assert client.get("/users/me", headers=headers).status_code == 401
+
+
+def test_principal_cache_honours_expiry_and_capacity():
+    import time
+    from src.schemas import UserSchemas
+    from src.services.principal_cache import PrincipalCache
+
+    def principal(user_id):
+        return UserSchemas.Principal(
+            id=user_id,
+            username=f"u{user_id}",
+            email="u@x.io",
+            first_name="U",
+            last_name="U",
+        )
+
+    cache = PrincipalCache(max_entries=2, ttl_s=60)
+    cache.put("expired", principal(1), time.time() - 1, cache.generation())
+    assert cache.get("expired") is None
+
+    cache.put("a", principal(1), None, cache.generation())
+    cache.put("b", principal(2), None, cache.generation())
+    assert cache.get("a").id == 1  # "b" is now least recently used
+    cache.put("c", principal(3), None, cache.generation())
+    assert cache.get("b") is None
+    assert cache.get("c").id == 3
+
+    # an eviction racing with a lookup keeps the stale principal out
+    generation = cache.generation()
+    cache.evict_user(3)
+    cache.put("c", principal(3), None, generation)
+    assert cache.get("c") is None
+
+
+def test_deleted_user_is_hidden_at_once_and_purged_in_chunks():
+    from sqlalchemy import event
+    from src.models import Post, User, Vote
+    from src.services import PurgeServices
+
+    def login(username):
+        token = client.post(
+            "/users/login", json={"username": username, "password": "secret123"}
+        ).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    leaver = register_user("zzleaver", "zzleaver@example.com")
+    stayer = register_user("zzstayer", "zzstayer@example.com")
+    leaver_auth, stayer_auth = login("zzleaver"), login("zzstayer")
+
+    leaver_posts = [
+        client.post(
+            "/posts/",
+            json={"title": f"Leaving {i}", "content": "x"},
+            headers=leaver_auth,
+        ).json()["id"]
+        for i in range(3)
+    ]
+    stayer_post, untouched_post = (
+        client.post(
+            "/posts/", json={"title": title, "content": "x"}, headers=stayer_auth
+        ).json()["id"]
+        for title in ("Staying", "Untouched")
+    )
+    for post_id in leaver_posts:
+        client.post(
+            f"/posts/{post_id}/vote", json={"vote": "upvote"}, headers=stayer_auth
+        )
+    client.post(
+        f"/posts/{stayer_post}/vote", json={"vote": "upvote"}, headers=leaver_auth
+    )
+
+    # cached, and dropped with the account
+    assert client.get(f"/posts/{leaver_posts[0]}/votes").status_code == 200
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.delete(f"/users/{leaver['id']}", headers=leaver_auth)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 204
+    # one update and the purge job's insert, however much the user posted
+    assert len(statements) == 2
+
+    assert client.get(f"/users/{leaver['id']}").status_code == 404
+    assert client.get("/users/me", headers=leaver_auth).status_code == 401
+    assert (
+        client.post(
+            "/users/login", json={"username": "zzleaver", "password": "secret123"}
+        ).status_code
+        == 401
+    )
+    assert client.get("/users/search", params={"q": "zzleaver"}).json()["items"] == []
+    assert (
+        client.delete(f"/users/{leaver['id']}", headers=leaver_auth).status_code == 401
+    )
+    # their posts are hidden before the purge reaches them
+    assert client.get(f"/posts/{leaver_posts[0]}").status_code == 404
+    feed = client.get("/posts/", params={"limit": 100}).json()["items"]
+    assert not {p["id"] for p in feed} & set(leaver_posts)
+    assert client.get("/posts/search", params={"q": "leaving"}).json()["items"] == []
+    # and cannot be voted on, edited or deleted
+    path = f"/posts/{leaver_posts[0]}"
+    vote = client.post(f"{path}/vote", json={"vote": "downvote"}, headers=stayer_auth)
+    assert vote.status_code == 404
+    edit = client.put(path, json={"title": "Mine", "content": "y"}, headers=stayer_auth)
+    assert edit.status_code == 404
+    assert client.delete(path, headers=stayer_auth).status_code == 404
+    assert client.get(f"{path}/votes").status_code == 404
+
+    # the purge only drops the cached responses of the posts it touched
+    from src.services.response_cache import POST, VOTES, response_cache
+
+    client.get(f"/posts/{stayer_post}/votes")
+    client.get(f"/posts/{untouched_post}")
+    db = TestingSessionLocal()
+    try:
+        assert PurgeServices.purge_user(leaver["id"], db, chunk_size=1)
+        assert response_cache.get(VOTES, stayer_post) is None
+        assert response_cache.get(POST, untouched_post) is not None
+        assert db.get(User, leaver["id"]) is None
+        assert db.query(Post).filter(Post.id.in_(leaver_posts)).count() == 0
+        assert db.query(Vote).filter(Vote.post_id.in_(leaver_posts)).count() == 0
+        assert db.query(Vote).filter(Vote.user_id == leaver["id"]).count() == 0
+    finally:
+        db.close()
+
+    votes = client.get(f"/posts/{stayer_post}/votes").json()
+    assert votes == {"upvotes": 0, "downvotes": 0}
+    # the username is free again
+    assert register_user("zzleaver", "zzleaver@example.com")["username"] == "zzleaver"